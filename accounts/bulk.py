@@ -0,0 +1,270 @@
+"""
+Bulk creation and moves of account trees.
+
+Creating accounts one at a time (`AccountFactory`) validates each of them with
+a few queries and makes mptt shift `lft`/`rght` of the whole tree on each
+insert. Here a whole tree of new accounts is validated in memory, inserted with
+`bulk_create` (which skips the mptt updates) and the mptt fields of the tree
+are rebuilt once at the end. Likewise, many accounts are moved to new parents
+by only changing their parents and rebuilding the tree once, instead of an mptt
+move (which rewrites large parts of the tree) per account.
+
+The rebuild reads the whole tree in one query and writes only the accounts
+whose mptt fields changed, while mptt's `partial_rebuild` makes two queries
+per account.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Iterator, List, NoReturn, Optional, Tuple
+
+import attr
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections, router
+from django.db.models import Max
+from django.db.transaction import atomic
+from rest_framework.exceptions import ValidationError
+
+from accounts.models import (
+    Account,
+    AccountType,
+    AccTypeEnum,
+    clear_descendants_ids_cache,
+)
+
+
+@attr.s(frozen=True)
+class AccountSpec:
+    """A new account, and the new accounts under it."""
+
+    name: str = attr.ib()
+    acc_type: AccTypeEnum = attr.ib()
+    children: List[AccountSpec] = attr.ib(factory=list)
+
+
+def _iter_specs(
+    specs: List[AccountSpec], parent: Optional[AccountSpec] = None
+) -> Iterator[Tuple[AccountSpec, Optional[AccountSpec]]]:
+    """Yields (spec, parent spec) for all specs of a tree, parents first."""
+    for spec in specs:
+        yield spec, parent
+        yield from _iter_specs(spec.children, spec)
+
+
+def rebuild_tree(tree_id: int) -> None:
+    """Sets `lft`, `rght` and `level` of the accounts of a tree from their
+    parents, like mptt's `partial_rebuild` (siblings are ordered by `lft`)."""
+    rows = Account.objects.filter(tree_id=tree_id).values_list(
+        "pk", "parent_id", "lft", "rght", "level"
+    )
+    children: Dict[Optional[int], List[int]] = defaultdict(list)
+    current: Dict[int, Tuple[int, int, int]] = {}
+    for pk, parent_id, lft, rght, level in rows.order_by("lft", "pk"):
+        children[parent_id].append(pk)
+        current[pk] = (lft, rght, level)
+    if len(children[None]) != 1:
+        raise RuntimeError(f"Tree {tree_id} does not have exactly one root")
+
+    # Depth first, numbering each account when entering and leaving it
+    rebuilt: Dict[int, Tuple[int, int, int]] = {}
+    lfts: Dict[int, Tuple[int, int]] = {}
+    counter = 1
+    root_pk = children[None][0]
+    lfts[root_pk] = (counter, 0)
+    stack = [(root_pk, iter(children[root_pk]))]
+    while stack:
+        pk, pending_children = stack[-1]
+        child_pk = next(pending_children, None)
+        counter += 1
+        if child_pk is None:
+            stack.pop()
+            lft, level = lfts[pk]
+            rebuilt[pk] = (lft, counter, level)
+        else:
+            lfts[child_pk] = (counter, lfts[pk][1] + 1)
+            stack.append((child_pk, iter(children[child_pk])))
+
+    changed = [
+        (lft, rght, level, pk)
+        for pk, (lft, rght, level) in rebuilt.items()
+        if current[pk] != (lft, rght, level)
+    ]
+    _update_accounts("lft = %s, rght = %s, level = %s", changed)
+
+
+def _update_accounts(set_sql: str, rows: List[Tuple]) -> None:
+    """Updates many accounts with one `executemany`. Each row has the params
+    of `set_sql` and then the pk. `bulk_update` builds a CASE per field and
+    row, which takes seconds for thousands of rows."""
+    if not rows:
+        return
+    table = Account._meta.db_table
+    with connections[router.db_for_write(Account)].cursor() as cursor:
+        cursor.executemany(f"UPDATE {table} SET {set_sql} WHERE id = %s", rows)
+
+
+def _bump_ledger_version() -> None:
+    # Bulk writes send no post_save signals
+    from movements.models import LedgerVersion
+
+    LedgerVersion.objects.bump()
+
+
+@attr.s()
+class AccountTreeCreator:
+    """Encapsulates the creation of a tree of new accounts under an existing
+    parent."""
+
+    ERR_MSGS = {
+        "PARENT_CHILD_NOT_ALLOWED": "Account {} does not allow children.",
+        "ACC_TYPE_NEW_ACCOUNTS_NOT_ALLOWED": 'Account type "{}" does not allow new accounts',
+        "REPEATED_NAME": "Account name {} is repeated.",
+        "EXISTING_NAME": "An account named {} already exists.",
+    }
+
+    @classmethod
+    def fail(cls, err_code: str, *args) -> NoReturn:
+        raise ValidationError(cls.ERR_MSGS[err_code].format(*args), err_code)
+
+    @atomic
+    def __call__(self, parent: Account, specs: List[AccountSpec]) -> List[Account]:
+        """Creates the accounts of `specs` (and of their children) under
+        `parent`, returning them in tree order."""
+        acc_types = AccountType.objects.in_bulk(field_name="name")
+        accounts = self._build_accounts(parent, specs, acc_types)
+        if not accounts:
+            return []
+        self._validate_names(accounts)
+        Account.objects.bulk_create(accounts)
+        rebuild_tree(parent.tree_id)
+        parent.refresh_from_db()
+        clear_descendants_ids_cache(parent.get_ancestors(include_self=True))
+        _bump_ledger_version()
+        created = Account.objects.filter(pk__gte=accounts[0].pk, pk__lte=accounts[-1].pk)
+        return list(created.order_by("lft"))
+
+    def _build_accounts(
+        self, parent: Account, specs: List[AccountSpec], acc_types: Dict[str, AccountType]
+    ) -> List[Account]:
+        """Returns the (validated and unsaved) accounts of the tree. Their pks
+        are set, so that children can point to their parents, and their mptt
+        fields are placeholders until the tree is rebuilt. The placeholder
+        `lft` is `parent.rght` plus the index of the account in tree order, so
+        it is greater than the `lft`s of the existing children of `parent`
+        and grows in the order of the specs. The rebuild (which orders siblings
+        by `lft`) thus puts the new accounts after the existing children, in
+        the order of the specs. Other existing accounts may have the same
+        `lft`s, but they are never siblings of the new ones."""
+        if specs and not parent.allows_children():
+            self.fail("PARENT_CHILD_NOT_ALLOWED", parent.name)
+        next_pk = (Account.objects.aggregate(x=Max("pk"))["x"] or 0) + 1
+        accounts: List[Account] = []
+        account_per_spec: Dict[int, Account] = {}
+        for i, (spec, parent_spec) in enumerate(_iter_specs(specs)):
+            acc_type = acc_types[spec.acc_type.value]
+            if not acc_type.new_accounts_allowed:
+                self.fail("ACC_TYPE_NEW_ACCOUNTS_NOT_ALLOWED", acc_type.name)
+            if spec.children and not acc_type.children_allowed:
+                self.fail("PARENT_CHILD_NOT_ALLOWED", spec.name)
+            account_parent = parent if parent_spec is None else account_per_spec[id(parent_spec)]
+            account = Account(
+                pk=next_pk + i,
+                name=spec.name,
+                acc_type=acc_type,
+                parent=account_parent,
+                tree_id=parent.tree_id,
+                level=account_parent.level + 1,
+                lft=parent.rght + i,
+                rght=parent.rght + i,
+            )
+            try:
+                # The parent and account type are known to exist
+                account.clean_fields(exclude=["parent", "acc_type"])
+            except DjangoValidationError as e:
+                raise ValidationError({spec.name: e.messages})
+            account_per_spec[id(spec)] = account
+            accounts.append(account)
+        return accounts
+
+    def _validate_names(self, accounts: List[Account]) -> None:
+        """Names are unique. Checks them all at once, instead of letting
+        `full_clean` query the db for each account."""
+        names = set()
+        for account in accounts:
+            if account.name in names:
+                self.fail("REPEATED_NAME", account.name)
+            names.add(account.name)
+        for name in Account.objects.values_list("name", flat=True):
+            if name in names:
+                self.fail("EXISTING_NAME", name)
+
+
+@attr.s(frozen=True)
+class AccountMove:
+    account: Account = attr.ib()
+    parent: Account = attr.ib()
+
+
+@attr.s()
+class AccountTreeMover:
+    """Encapsulates moving many accounts (with their subtrees) to new
+    parents at once."""
+
+    ERR_MSGS = {
+        "PARENT_CHILD_NOT_ALLOWED": "Account {} does not allow children.",
+        "ROOT_MOVE": "Account {} has no parent and can not be moved.",
+        "OTHER_TREE": "Account {} can not be moved to another tree.",
+        "REPEATED_ACCOUNT": "Account {} is moved more than once.",
+        "CYCLE": "Account {} would be a descendant of itself.",
+    }
+
+    @classmethod
+    def fail(cls, err_code: str, *args) -> NoReturn:
+        raise ValidationError(cls.ERR_MSGS[err_code].format(*args), err_code)
+
+    @atomic
+    def __call__(self, moves: List[AccountMove]) -> None:
+        if not moves:
+            return
+        tree_id = moves[0].account.tree_id
+        self._validate(moves, tree_id)
+        # As last children of their new parents, like mptt moves them
+        last_rght = Account.objects.filter(tree_id=tree_id).aggregate(x=Max("rght"))["x"]
+        _update_accounts(
+            "parent_id = %s, lft = %s, rght = %s",
+            [
+                (move.parent.pk, last_rght + i, last_rght + i, move.account.pk)
+                for i, move in enumerate(moves, 1)
+            ],
+        )
+        rebuild_tree(tree_id)
+        # The descendants of all ancestors, old and new, changed
+        clear_descendants_ids_cache(Account.objects.filter(tree_id=tree_id).only("pk"))
+        _bump_ledger_version()
+
+    def _validate(self, moves: List[AccountMove], tree_id: int) -> None:
+        parent_ids = dict(
+            Account.objects.filter(tree_id=tree_id).values_list("pk", "parent_id")
+        )
+        for move in moves:
+            account, parent = move.account, move.parent
+            if account.tree_id != tree_id or parent.tree_id != tree_id:
+                self.fail("OTHER_TREE", account.name)
+            if parent_ids[account.pk] is None:
+                self.fail("ROOT_MOVE", account.name)
+            if not parent.allows_children():
+                self.fail("PARENT_CHILD_NOT_ALLOWED", parent.name)
+        moved_pks = [x.account.pk for x in moves]
+        if len(set(moved_pks)) != len(moved_pks):
+            repeated = next(x.account for x in moves if moved_pks.count(x.account.pk) > 1)
+            self.fail("REPEATED_ACCOUNT", repeated.name)
+        parent_ids.update({x.account.pk: x.parent.pk for x in moves})
+        for move in moves:
+            # Any cycle has a moved account, and is found walking up from it
+            ancestor_pk = parent_ids[move.account.pk]
+            for _ in range(len(parent_ids)):
+                if ancestor_pk is None:
+                    break
+                if ancestor_pk == move.account.pk:
+                    self.fail("CYCLE", move.account.name)
+                ancestor_pk = parent_ids[ancestor_pk]
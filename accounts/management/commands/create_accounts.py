@@ -0,0 +1,37 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from accounts.models import Account, get_root_acc
+from accounts.serializers import AccountTreeCreationSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates a tree of accounts from a json file with a list of"
+        ' {"name": ..., "acc_type": ..., "children": [...]}'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="The json file with the accounts")
+        parser.add_argument("--parent", help="Name of the parent account (default: the root)")
+
+    def handle(self, *args, **options):
+        with open(options["file"]) as f:
+            accounts_data = json.load(f)
+        if options["parent"] is None:
+            parent = get_root_acc()
+        else:
+            parent = Account.objects.filter(name=options["parent"]).first()
+            if parent is None:
+                raise CommandError(f"Unknown account {options['parent']}")
+        serializer = AccountTreeCreationSerializer(
+            data={"parent": parent.pk, "accounts": accounts_data}
+        )
+        try:
+            serializer.is_valid(True)
+            accounts = serializer.save()
+        except ValidationError as e:
+            raise CommandError(json.dumps(e.detail))
+        self.stdout.write(f"Created {len(accounts)} accounts under {parent.name}")
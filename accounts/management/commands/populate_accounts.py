@@ -26,8 +26,8 @@ ACCOUNT_TYPE_DATA = [
 
 
 account_type_populator = TablePopulator(
-    lambda x: AccountType.objects.create(**x),
-    lambda x: AccountType.objects.filter(name=x["name"]).exists(),
+    lambda xs: AccountType.objects.bulk_create(AccountType(**x) for x in xs),
+    lambda: set(AccountType.objects.values_list("name", flat=True)),
     ACCOUNT_TYPE_DATA,
 )
 
@@ -46,8 +46,16 @@ def _populate_account(data):
     return Account.objects.create(**data)
 
 
+def _get_existing_account_names():
+    accounts = Account.objects.filter(name__in=[x["name"] for x in ACCOUNT_DATA])
+    return set(accounts.values_list("name", flat=True))
+
+
 account_populator = TablePopulator(
-    _populate_account, lambda x: Account.objects.filter(name=x["name"]).exists(), ACCOUNT_DATA
+    # One at a time, as mptt places each account under its (maybe new) parent
+    lambda xs: [_populate_account(x) for x in xs],
+    _get_existing_account_names,
+    ACCOUNT_DATA,
 )
 
 
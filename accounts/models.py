@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import TYPE_CHECKING, Dict, List, NoReturn
+from typing import TYPE_CHECKING, Dict, Iterable, List, NoReturn
 
 import attr
 import django.db.models as m
@@ -95,7 +95,7 @@ class Account(MPTTModel):
     #
     def get_descendants_ids(self, include_self: bool, use_cache: bool = False) -> List[int]:
         """Returns the descendants ids, cached to avoid multiple queries"""
-        cache_key = f"account_get_descendants_ids_pk={self.pk}_include_self={include_self}"
+        cache_key = _get_descendants_ids_cache_key(self.pk, include_self)
         if use_cache is False or cache.get(cache_key) is None:
             qset = self.get_descendants(include_self).values_list("pk", flat=True)
             cache.set(cache_key, [x for x in qset])
@@ -119,8 +119,11 @@ class Account(MPTTModel):
         if not parent.allows_children():
             msg = self.ERR_MSGS["PARENT_CHILD_NOT_ALLOWED"]
             raise ValidationError({"parent": msg.format(parent)})
+        # The descendants of the ancestors, before and after, change
+        old_ancestors = [] if self.pk is None else list(self.get_ancestors())
         self.parent = parent
         full_clean_and_save(self)
+        clear_descendants_ids_cache(old_ancestors + list(self.get_ancestors()))
 
     def get_acc_type(self) -> AccTypeEnum:
         """Getter for acc_type. Notice that instead of returning an
@@ -163,6 +166,17 @@ class AccountType(m.Model):
 
 # ------------------------------------------------------------------------------
 # Services
+def _get_descendants_ids_cache_key(pk: int, include_self: bool) -> str:
+    return f"account_get_descendants_ids_pk={pk}_include_self={include_self}"
+
+
+def clear_descendants_ids_cache(accounts: Iterable[Account]) -> None:
+    """Forgets the cached descendants ids of accounts whose subtrees changed."""
+    cache.delete_many(
+        [_get_descendants_ids_cache_key(x.pk, y) for x in accounts for y in (True, False)]
+    )
+
+
 def get_root_acc() -> Account:
     """Returns the root account"""
     return Account.objects.get(name="Root Account")
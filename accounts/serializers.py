@@ -1,14 +1,24 @@
+from typing import List
+
 from rest_framework.exceptions import ValidationError
 from rest_framework.serializers import (
+    CharField,
+    DateField,
+    DictField,
     Field,
+    IntegerField,
+    ListField,
     ModelSerializer,
     PrimaryKeyRelatedField,
     Serializer,
+    SerializerMethodField,
 )
 
+from common.models import NameField
 from currencies.serializers import BalanceSerializer
 from movements.serializers import TransactionSerializer
 
+from .bulk import AccountMove, AccountSpec, AccountTreeCreator, AccountTreeMover
 from .models import Account, AccountFactory, AccTypeEnum
 
 
@@ -53,6 +63,66 @@ class AccountSerializer(ModelSerializer):
         return instance
 
 
+class AccountSpecSerializer(Serializer):
+    """Serializes a new account of a tree, with the new accounts under it."""
+
+    name = CharField(max_length=NameField.MAX_LENGTH)
+    acc_type = AccTypeField()
+    children = ListField(child=DictField(), default=list)
+
+    def validate_children(self, children):
+        serializer = AccountSpecSerializer(data=children, many=True)
+        serializer.is_valid(True)
+        return serializer.validated_data
+
+
+def _to_account_specs(data) -> List[AccountSpec]:
+    return [
+        AccountSpec(x["name"], x["acc_type"], _to_account_specs(x["children"])) for x in data
+    ]
+
+
+class AccountTreeCreationSerializer(Serializer):
+    """Serializes a tree of new accounts to create under `parent`."""
+
+    parent = PrimaryKeyRelatedField(queryset=Account.objects.all())
+    accounts = AccountSpecSerializer(many=True)
+
+    def create(self, validated_data):
+        specs = _to_account_specs(validated_data["accounts"])
+        return AccountTreeCreator()(validated_data["parent"], specs)
+
+
+class AccountMoveSerializer(Serializer):
+    """Serializes the move of an account to a new parent, by their pks."""
+
+    account = IntegerField()
+    parent = IntegerField()
+
+
+class AccountTreeMovesSerializer(Serializer):
+    """Serializes many moves of accounts, to be done at once. The accounts
+    are fetched with one query, and not one per field of each move."""
+
+    moves = AccountMoveSerializer(many=True)
+
+    def validate_moves(self, moves):
+        pks = set(x["account"] for x in moves) | set(x["parent"] for x in moves)
+        accounts = Account.objects.select_related("acc_type").in_bulk(pks)
+        unknown_pks = sorted(pks - set(accounts))
+        if unknown_pks:
+            raise ValidationError(f"Unknown accounts: {unknown_pks}")
+        return [AccountMove(accounts[x["account"]], accounts[x["parent"]]) for x in moves]
+
+    def create(self, validated_data):
+        moves = validated_data["moves"]
+        AccountTreeMover()(moves)
+        accounts = Account.objects.select_related("acc_type").in_bulk(
+            [x.account.pk for x in moves]
+        )
+        return [accounts[x.account.pk] for x in moves]
+
+
 class JournalSerializer(Serializer):
     """Serializes a Journal."""
 
@@ -60,3 +130,33 @@ class JournalSerializer(Serializer):
     initial_balance = BalanceSerializer()
     transactions = TransactionSerializer(many=True)
     balances = BalanceSerializer(many=True, source="get_balances")
+
+
+class JournalInputsSerializer(Serializer):
+    """Serializes the query params of the journal: the (inclusive) dates
+    of its first and last transactions, if any."""
+
+    start = DateField(default=None)
+    end = DateField(default=None)
+
+    def validate(self, data):
+        if data["start"] is not None and data["end"] is not None and data["start"] > data["end"]:
+            raise ValidationError("start must not be after end")
+        return data
+
+
+class AccountTreeInputsSerializer(Serializer):
+    """Serializes the query params of the account tree."""
+
+    date = DateField(default=None)
+
+
+class AccountTreeNodeSerializer(Serializer):
+    """Serializes an AccountTreeNode, with all of its descendants."""
+
+    account = AccountSerializer()
+    balance = BalanceSerializer()
+    children = SerializerMethodField()
+
+    def get_children(self, node):
+        return AccountTreeNodeSerializer(node.children, many=True).data
@@ -0,0 +1,249 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from accounts.bulk import (
+    AccountMove,
+    AccountSpec,
+    AccountTreeCreator,
+    AccountTreeMover,
+    rebuild_tree,
+)
+from accounts.models import Account, AccountFactory, AccTypeEnum, get_root_acc
+from accounts.tests.factories import AccountTestFactory
+from common.testutils import PacsTestCase
+from movements.models import get_ledger_version
+
+BRANCH, LEAF = AccTypeEnum.BRANCH, AccTypeEnum.LEAF
+
+
+class TestAccountTreeCreator(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.root = get_root_acc()
+
+    def get_specs(self):
+        return [
+            AccountSpec(
+                "Expenses",
+                BRANCH,
+                [
+                    AccountSpec("Food", LEAF),
+                    AccountSpec("House", BRANCH, [AccountSpec("Rent", LEAF)]),
+                ],
+            ),
+            AccountSpec("Current", LEAF),
+        ]
+
+    def test_creates_tree(self):
+        existing = AccountTestFactory(acc_type=BRANCH)
+        accounts = AccountTreeCreator()(self.root, self.get_specs())
+        assert [x.name for x in accounts] == [
+            "Expenses",
+            "Food",
+            "House",
+            "Rent",
+            "Current",
+        ]
+        expenses, food, house, rent, current_account = accounts
+        assert [x.parent for x in accounts] == [self.root, expenses, expenses, house, self.root]
+        assert rent.get_acc_type() == LEAF
+        assert list(house.get_children()) == [rent]
+        # The new accounts come after the existing ones
+        assert list(self.root.get_children()) == [existing, expenses, current_account]
+
+    @staticmethod
+    def get_tree(parent):
+        """The descendants of parent, relative to it."""
+        parent.refresh_from_db()
+        return [
+            (
+                x.name.split(" ", 1)[-1],
+                x.level,
+                x.lft - parent.lft,
+                x.rght - parent.lft,
+                None if x.parent == parent else x.parent.name.split(" ", 1)[-1],
+            )
+            for x in parent.get_descendants()
+        ]
+
+    def test_tree_is_the_same_as_creating_one_by_one(self):
+        parents = AccountTestFactory.create_batch(2, acc_type=BRANCH)
+        AccountFactory()("A Leaf", LEAF, parents[0])
+        AccountFactory()("Other Leaf", LEAF, parents[1])
+        AccountTreeCreator()(parents[0], self.get_specs())
+        factory = AccountFactory()
+        expenses = factory("Other Expenses", BRANCH, parents[1])
+        factory("Other Food", LEAF, expenses)
+        house = factory("Other House", BRANCH, expenses)
+        factory("Other Rent", LEAF, house)
+        factory("Other Current", LEAF, parents[1])
+        assert self.get_tree(parents[0]) == self.get_tree(parents[1])
+
+    def test_queries_do_not_depend_on_the_number_of_accounts(self):
+        def count_queries(n):
+            specs = [
+                AccountSpec(f"Branch {n} {i}", BRANCH, [AccountSpec(f"Leaf {n} {i}", LEAF)])
+                for i in range(n)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                AccountTreeCreator()(get_root_acc(), specs)
+            return len(queries)
+
+        assert count_queries(3) == count_queries(30)
+
+    def test_invalidates_cached_descendants(self):
+        parent = AccountTestFactory(acc_type=BRANCH)
+        assert parent.get_descendants_ids(True, use_cache=True) == [parent.pk]
+        accounts = AccountTreeCreator()(parent, [AccountSpec("Food", LEAF)])
+        assert parent.get_descendants_ids(True, use_cache=True) == [parent.pk, accounts[0].pk]
+
+    def test_bumps_ledger_version(self):
+        version = get_ledger_version()
+        AccountTreeCreator()(self.root, self.get_specs())
+        assert get_ledger_version() > version
+
+    def test_empty(self):
+        assert AccountTreeCreator()(self.root, []) == []
+
+    def assert_fails(self, parent, specs, err_code):
+        n_accounts = Account.objects.count()
+        with pytest.raises(ValidationError) as e:
+            AccountTreeCreator()(parent, specs)
+        assert e.value.get_codes() == [err_code]
+        assert Account.objects.count() == n_accounts
+
+    def test_fails_for_leaf_parent(self):
+        parent = AccountTestFactory(acc_type=LEAF)
+        self.assert_fails(parent, [AccountSpec("Food", LEAF)], "PARENT_CHILD_NOT_ALLOWED")
+
+    def test_fails_for_children_of_leaf(self):
+        specs = [AccountSpec("Food", LEAF, [AccountSpec("Bread", LEAF)])]
+        self.assert_fails(self.root, specs, "PARENT_CHILD_NOT_ALLOWED")
+
+    def test_fails_for_root_acc_type(self):
+        specs = [AccountSpec("Other Root", AccTypeEnum.ROOT)]
+        self.assert_fails(self.root, specs, "ACC_TYPE_NEW_ACCOUNTS_NOT_ALLOWED")
+
+    def test_fails_for_repeated_names(self):
+        specs = [AccountSpec("Food", BRANCH, [AccountSpec("Food", LEAF)])]
+        self.assert_fails(self.root, specs, "REPEATED_NAME")
+
+    def test_fails_for_existing_names(self):
+        self.assert_fails(self.root, [AccountSpec(self.root.name, LEAF)], "EXISTING_NAME")
+
+    def test_fails_for_invalid_names(self):
+        with pytest.raises(ValidationError):
+            AccountTreeCreator()(self.root, [AccountSpec("", LEAF)])
+        assert not Account.objects.filter(name="").exists()
+
+
+class TestRebuildTree(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        parents = AccountTestFactory.create_batch(3, acc_type=BRANCH)
+        for parent in parents:
+            AccountTestFactory.create_batch(2, acc_type=LEAF, parent=parent)
+        AccountTestFactory(acc_type=BRANCH, parent=parents[0])
+
+    @staticmethod
+    def get_mptt_fields():
+        return list(Account.objects.order_by("pk").values_list("lft", "rght", "level"))
+
+    def test_rebuilds_like_mptt(self):
+        tree_id = get_root_acc().tree_id
+        Account.objects.partial_rebuild(tree_id)
+        expected = self.get_mptt_fields()
+        Account.objects.exclude(parent=None).update(lft=0, rght=0, level=0)
+        rebuild_tree(tree_id)
+        assert self.get_mptt_fields() == expected
+
+    def test_writes_nothing_if_unchanged(self):
+        tree_id = get_root_acc().tree_id
+        with self.assertNumQueries(1):
+            rebuild_tree(tree_id)
+
+
+class TestAccountTreeMover(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.branches = AccountTestFactory.create_batch(3, acc_type=BRANCH)
+        self.leaves = [
+            AccountTestFactory.create_batch(2, acc_type=LEAF, parent=x) for x in self.branches
+        ]
+
+    @staticmethod
+    def get_tree():
+        return list(Account.objects.order_by("pk").values_list("parent", "lft", "rght", "level"))
+
+    def test_moves_like_mptt(self):
+        moves = [
+            AccountMove(self.leaves[0][0], self.branches[1]),
+            AccountMove(self.branches[2], self.branches[0]),
+            AccountMove(self.leaves[1][1], self.branches[2]),
+        ]
+        with transaction.atomic():
+            for move in moves:
+                # mptt moves using the mptt fields of the (fresh) parent
+                parent = Account.objects.get(pk=move.parent.pk)
+                Account.objects.get(pk=move.account.pk).set_parent(parent)
+            expected = self.get_tree()
+            transaction.set_rollback(True)
+        AccountTreeMover()(moves)
+        assert self.get_tree() == expected
+
+    def test_queries_do_not_depend_on_the_number_of_moves(self):
+        def count_queries(moves):
+            with CaptureQueriesContext(connection) as queries:
+                AccountTreeMover()(moves)
+            return len(queries)
+
+        one_move = [AccountMove(self.leaves[0][0], self.branches[1])]
+        many_moves = [AccountMove(x, self.branches[2]) for x in self.leaves[0] + self.leaves[1]]
+        assert count_queries(one_move) == count_queries(many_moves)
+
+    def test_invalidates_cached_descendants(self):
+        old_parent, new_parent = self.branches[:2]
+        account = self.leaves[0][0]
+        assert account.pk in old_parent.get_descendants_ids(False, use_cache=True)
+        assert account.pk not in new_parent.get_descendants_ids(False, use_cache=True)
+        AccountTreeMover()([AccountMove(account, new_parent)])
+        assert account.pk not in old_parent.get_descendants_ids(False, use_cache=True)
+        assert account.pk in new_parent.get_descendants_ids(False, use_cache=True)
+
+    def test_bumps_ledger_version(self):
+        version = get_ledger_version()
+        AccountTreeMover()([AccountMove(self.leaves[0][0], self.branches[1])])
+        assert get_ledger_version() > version
+
+    def assert_fails(self, moves, err_code):
+        tree = self.get_tree()
+        with pytest.raises(ValidationError) as e:
+            AccountTreeMover()(moves)
+        assert e.value.get_codes() == [err_code]
+        assert self.get_tree() == tree
+
+    def test_fails_for_leaf_parent(self):
+        moves = [AccountMove(self.leaves[0][0], self.leaves[1][0])]
+        self.assert_fails(moves, "PARENT_CHILD_NOT_ALLOWED")
+
+    def test_fails_for_root(self):
+        self.assert_fails([AccountMove(get_root_acc(), self.branches[0])], "ROOT_MOVE")
+
+    def test_fails_for_repeated_accounts(self):
+        moves = [AccountMove(self.leaves[0][0], x) for x in self.branches[1:]]
+        self.assert_fails(moves, "REPEATED_ACCOUNT")
+
+    def test_fails_for_cycles(self):
+        child = AccountTestFactory(acc_type=BRANCH, parent=self.branches[0])
+        self.assert_fails([AccountMove(self.branches[0], child)], "CYCLE")
+        moves = [
+            AccountMove(self.branches[0], self.branches[1]),
+            AccountMove(self.branches[1], self.branches[2]),
+            AccountMove(self.branches[2], child),
+        ]
+        self.assert_fails(moves, "CYCLE")
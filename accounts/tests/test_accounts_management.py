@@ -1,10 +1,15 @@
+import io
+import json
+import tempfile
+
 from attr import evolve
+from django.core.management import CommandError, call_command
 
 from accounts.management.commands.populate_accounts import (
     account_populator,
     account_type_populator,
 )
-from accounts.models import AccountType
+from accounts.models import Account, AccountType, get_root_acc
 from common.testutils import PacsTestCase
 
 
@@ -41,3 +46,30 @@ class PopulateAccountTestCase(PacsTestCase):
         assert acc.name == self.acc_data[0]["name"]
         assert acc.parent is None
         assert acc.acc_type == AccountType.objects.get(name=self.acc_data[0]["acc_type_name"])
+
+
+class CreateAccountsTestCase(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+
+    def call_command(self, accounts_data, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as f:
+            json.dump(accounts_data, f)
+            f.flush()
+            call_command("create_accounts", f.name, *args, stdout=io.StringIO())
+
+    def test_creates_accounts(self):
+        food_data = {"name": "Food", "acc_type": "Leaf"}
+        accounts_data = [{"name": "Expenses", "acc_type": "Branch", "children": [food_data]}]
+        self.call_command(accounts_data)
+        assert Account.objects.get(name="Expenses").parent == get_root_acc()
+        assert Account.objects.get(name="Food").parent.name == "Expenses"
+        self.call_command([{"name": "Bread", "acc_type": "Leaf"}], "--parent", "Expenses")
+        assert Account.objects.get(name="Bread").parent.name == "Expenses"
+
+    def test_fails_for_invalid_accounts(self):
+        with self.assertRaises(CommandError):
+            self.call_command([{"name": "Food", "acc_type": "Root"}])
+        with self.assertRaises(CommandError):
+            self.call_command([{"name": "Food", "acc_type": "Leaf"}], "--parent", "Unknown")
@@ -124,6 +124,20 @@ class TestAccount(AccountsModelTestCase):
         with self.assertNumQueries(1):
             acc.get_descendants_ids(True, use_cache=False)
 
+    def test_set_parent_clears_cached_descendants_ids(self):
+        self.populate_accounts()
+        old_parent, new_parent = AccountTestFactory.create_batch(2, acc_type=AccTypeEnum.BRANCH)
+        acc = AccountTestFactory(parent=old_parent)
+        assert old_parent.get_descendants_ids(False, use_cache=True) == [acc.pk]
+        assert new_parent.get_descendants_ids(False, use_cache=True) == []
+        # mptt moves using the (otherwise stale) mptt fields of the parent
+        new_parent.refresh_from_db()
+        acc.set_parent(new_parent)
+        old_parent.refresh_from_db()
+        new_parent.refresh_from_db()
+        assert old_parent.get_descendants_ids(False, use_cache=True) == []
+        assert new_parent.get_descendants_ids(False, use_cache=True) == [acc.pk]
+
     def test_cant_delete_if_has_movement(self):
         mov = MovementTestFactory()
         acc = mov.account
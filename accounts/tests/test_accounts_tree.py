@@ -0,0 +1,80 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import AccTypeEnum, get_root_acc
+from accounts.tests.factories import AccountTestFactory
+from accounts.tree import get_account_tree
+from common.testutils import PacsTestCase
+from currencies.money import Balance, Money
+from currencies.tests.factories import CurrencyTestFactory
+from movements.tests.factories import TransactionTestFactory
+
+
+class TestGetAccountTree(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.currencies = CurrencyTestFactory.create_batch(2)
+        self.branch = AccountTestFactory(acc_type=AccTypeEnum.BRANCH)
+        self.sub_branch = AccountTestFactory(acc_type=AccTypeEnum.BRANCH, parent=self.branch)
+        self.leaves = [
+            AccountTestFactory(parent=self.branch),
+            AccountTestFactory(parent=self.sub_branch),
+            AccountTestFactory(parent=self.sub_branch),
+        ]
+        self.other = AccountTestFactory()
+
+    def make_transaction(self, date_, account, other, quantity, currency):
+        TransactionTestFactory(
+            date_=date_,
+            movements_specs__0__account=account,
+            movements_specs__0__money=Money(quantity, currency),
+            movements_specs__1__account=other,
+            movements_specs__1__money=Money(-quantity, currency),
+        )
+
+    def test_structure(self):
+        tree = get_account_tree(self.branch)
+        assert tree.account == self.branch
+        assert [x.account for x in tree.children] == [self.sub_branch, self.leaves[0]]
+        assert [x.account for x in tree.children[0].children] == self.leaves[1:]
+        assert tree.children[1].children == []
+
+    def test_rolls_up_balances(self):
+        eur, usd = self.currencies
+        self.make_transaction(date(2020, 1, 1), self.leaves[0], self.other, Decimal(1), eur)
+        self.make_transaction(date(2020, 1, 2), self.leaves[1], self.other, Decimal(2), eur)
+        self.make_transaction(date(2020, 1, 3), self.leaves[2], self.other, Decimal(3), usd)
+        # Inside the subtree, so it sums to zero
+        self.make_transaction(date(2020, 1, 4), self.leaves[1], self.leaves[2], Decimal(5), usd)
+
+        tree = get_account_tree(self.branch)
+        sub_branch, leaf = tree.children
+        assert tree.balance == Balance([Money(Decimal(3), eur), Money(Decimal(3), usd)])
+        assert sub_branch.balance == Balance([Money(Decimal(2), eur), Money(Decimal(3), usd)])
+        assert leaf.balance == Balance([Money(Decimal(1), eur)])
+        assert sub_branch.children[0].balance == Balance(
+            [Money(Decimal(2), eur), Money(Decimal(5), usd)]
+        )
+        assert sub_branch.children[1].balance == Balance([Money(Decimal(-2), usd)])
+
+    def test_at_date(self):
+        eur = self.currencies[0]
+        self.make_transaction(date(2020, 1, 1), self.leaves[0], self.other, Decimal(1), eur)
+        self.make_transaction(date(2020, 1, 2), self.leaves[1], self.other, Decimal(2), eur)
+        assert get_account_tree(self.branch, date(2020, 1, 1)).balance == Balance(
+            [Money(Decimal(1), eur)]
+        )
+        assert get_account_tree(self.branch, date(2019, 12, 31)).balance == Balance([])
+
+    def test_number_of_queries_does_not_depend_on_size(self):
+        root = get_root_acc()
+        with CaptureQueriesContext(connection) as small:
+            get_account_tree(self.branch)
+        with CaptureQueriesContext(connection) as big:
+            tree = get_account_tree(root)
+        assert len(tree.children) > 1
+        assert len(big.captured_queries) == len(small.captured_queries) == 3
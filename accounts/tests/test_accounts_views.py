@@ -1,3 +1,4 @@
+from datetime import date
 from decimal import Decimal
 from unittest.mock import patch
 
@@ -188,6 +189,25 @@ class TestAccountViewset(AccountViewTestCase):
             == movements_specs[0].money.quantity
         )
 
+    def test_get_journal_not_modified(self):
+        self.setup_data_for_pagination()
+        url = f"/accounts/{self.accs[0].pk}/journal/"
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 304
+        # Other pages have other ETags
+        assert self.client.get(f"{url}?page_size=1", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_get_journal_modified_after_new_transaction(self):
+        self.setup_data_for_pagination()
+        url = f"/accounts/{self.accs[0].pk}/journal/"
+        etag = self.client.get(url)["ETag"]
+        TransactionTestFactory(movements_specs=self.movements_specs[0])
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 200
+        assert len(resp.json()["transactions"]) == 3
+
     def test_get_journal_paginated_second_page(self):
         self.setup_data_for_pagination()
         page, page_size = 1, 1
@@ -214,3 +234,138 @@ class TestAccountViewset(AccountViewTestCase):
             + self.transactions[1].get_balance_for_account(self.accs[0])
         )
         assert resp.json()["journal"]["balances"][0] == BalanceSerializer(exp_balance).data
+
+    def test_get_journal_with_start_and_end(self):
+        self.populate_accounts()
+        accs = AccountTestFactory.create_batch(2)
+        transactions = [
+            TransactionTestFactory(
+                date_=date(2020, 1, day),
+                movements_specs=[
+                    MovementSpec(accs[0], MoneyTestFactory()),
+                    MovementSpec(accs[1], MoneyTestFactory()),
+                ],
+            )
+            for day in [1, 2, 3, 4]
+        ]
+        resp = self.client.get(
+            f"/accounts/{accs[0].pk}/journal/", {"start": "2020-01-02", "end": "2020-01-03"}
+        )
+        assert resp.status_code == 200
+        assert [x["pk"] for x in resp.json()["transactions"]] == [
+            transactions[1].pk,
+            transactions[2].pk,
+        ]
+        initial_balance = transactions[0].get_balance_for_account(accs[0])
+        assert resp.json()["initial_balance"] == BalanceSerializer(initial_balance).data
+        exp_balances = [
+            initial_balance + transactions[1].get_balance_for_account(accs[0]),
+            initial_balance
+            + transactions[1].get_balance_for_account(accs[0])
+            + transactions[2].get_balance_for_account(accs[0]),
+        ]
+        assert resp.json()["balances"] == BalanceSerializer(exp_balances, many=True).data
+
+    def test_get_journal_paginated_with_start(self):
+        self.setup_data_for_pagination()
+        start = max(x.date for x in self.transactions)
+        resp = self.client.get(
+            f"/accounts/{self.accs[0].pk}/journal/", {"start": start.isoformat(), "page_size": 2}
+        )
+        assert resp.json()["count"] == len([x for x in self.transactions if x.date >= start])
+        last_transaction = max(self.transactions, key=lambda x: (x.date, x.pk))
+        assert resp.json()["journal"]["transactions"][-1]["pk"] == last_transaction.pk
+        exp_balance = Balance([])
+        for transaction in self.transactions:
+            exp_balance += transaction.get_balance_for_account(self.accs[0])
+        assert resp.json()["journal"]["balances"][-1] == BalanceSerializer(exp_balance).data
+
+    def test_get_journal_start_after_end_returns_400(self):
+        self.populate_accounts()
+        account = AccountTestFactory()
+        resp = self.client.get(
+            f"/accounts/{account.pk}/journal/", {"start": "2020-01-02", "end": "2020-01-01"}
+        )
+        assert resp.status_code == 400
+
+    def test_post_bulk(self):
+        self.populate_accounts()
+        root = get_root_acc()
+        data = {
+            "parent": root.pk,
+            "accounts": [
+                {
+                    "name": "Expenses",
+                    "acc_type": "Branch",
+                    "children": [{"name": "Food", "acc_type": "leaf"}],
+                }
+            ],
+        }
+        resp = self.client.post("/accounts/bulk/", data, format="json")
+        assert resp.status_code == 201, resp.json()
+        expenses, food = Account.objects.get(name="Expenses"), Account.objects.get(name="Food")
+        assert resp.json() == AccountSerializer([expenses, food], many=True).data
+        assert food.parent == expenses
+        assert expenses.parent == root
+
+    def test_post_bulk_with_invalid_tree(self):
+        self.populate_accounts()
+        data = {
+            "parent": get_root_acc().pk,
+            "accounts": [
+                {"name": "Food", "acc_type": "Leaf", "children": [{"name": "Bread"}]},
+            ],
+        }
+        resp = self.client.post("/accounts/bulk/", data, format="json")
+        assert resp.status_code == 400
+        assert resp.json() == {
+            "accounts": [{"children": [{"acc_type": ["This field is required."]}]}]
+        }
+        data["accounts"][0]["children"][0]["acc_type"] = "Leaf"
+        resp = self.client.post("/accounts/bulk/", data, format="json")
+        assert resp.status_code == 400
+        assert not Account.objects.filter(name="Food").exists()
+
+    def test_post_move(self):
+        self.populate_accounts()
+        branches = AccountTestFactory.create_batch(2, acc_type=AccTypeEnum.BRANCH)
+        leaves = AccountTestFactory.create_batch(2, acc_type=AccTypeEnum.LEAF, parent=branches[0])
+        data = {"moves": [{"account": x.pk, "parent": branches[1].pk} for x in leaves]}
+        resp = self.client.post("/accounts/move/", data, format="json")
+        assert resp.status_code == 200, resp.json()
+        assert [x["parent"] for x in resp.json()] == [branches[1].pk, branches[1].pk]
+        branches[1].refresh_from_db()
+        assert list(branches[1].get_children()) == leaves
+
+    def test_post_move_with_unknown_accounts(self):
+        self.populate_accounts()
+        account = AccountTestFactory()
+        data = {"moves": [{"account": account.pk, "parent": 999}]}
+        resp = self.client.post("/accounts/move/", data, format="json")
+        assert resp.status_code == 400
+        assert resp.json() == {"moves": ["Unknown accounts: [999]"]}
+
+    def test_get_tree(self):
+        self.setup_data_for_pagination()
+        resp = self.client.get(f"/accounts/{self.accs[0].parent.pk}/tree/")
+        assert resp.status_code == 200
+        assert resp.json()["account"] == AccountSerializer(self.accs[0].parent).data
+        child = next(x for x in resp.json()["children"] if x["account"]["pk"] == self.accs[0].pk)
+        exp_balance = sum(
+            (x.get_balance_for_account(self.accs[0]) for x in self.transactions), Balance([])
+        )
+        assert child["balance"] == BalanceSerializer(exp_balance).data
+        assert child["children"] == []
+
+    def test_get_tree_at_date(self):
+        self.setup_data_for_pagination()
+        resp = self.client.get(f"/accounts/{self.accs[0].pk}/tree/?date=1900-01-01")
+        assert resp.status_code == 200
+        assert resp.json()["balance"] == []
+        assert self.client.get(f"/accounts/{self.accs[0].pk}/tree/?date=foo").status_code == 400
+
+    def test_get_tree_not_modified(self):
+        self.setup_data_for_pagination()
+        url = f"/accounts/{self.accs[0].pk}/tree/"
+        etag = self.client.get(url)["ETag"]
+        assert self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import attr
+from django.db.models import Sum
+
+from common.utils import from_minor_units
+from currencies.models import Currency
+from currencies.money import Balance, Money
+
+if TYPE_CHECKING:
+    from accounts.models import Account
+
+
+@attr.s(frozen=True)
+class AccountTreeNode:
+    """An account with the balance of its subtree and its children."""
+
+    account: Account = attr.ib()
+    balance: Balance = attr.ib()
+    children: List[AccountTreeNode] = attr.ib(factory=list)
+
+
+def _get_quantities_per_account(root: Account, at: Optional[date]) -> Dict[int, Dict[int, int]]:
+    """Returns {account_id: {currency_id: quantity in minor units}} with the
+    sum of the movements of each account of the subtree of `root` up to
+    `at`."""
+    from movements.models import Movement
+
+    movements = Movement.objects.filter(
+        account__tree_id=root.tree_id,
+        account__lft__gte=root.lft,
+        account__rght__lte=root.rght,
+    )
+    if at is not None:
+        movements = movements.filter(transaction__date__lte=at)
+    rows = (
+        movements.order_by()
+        .values_list("account_id", "currency_id")
+        .annotate(quantity_minor=Sum("quantity_minor"))
+    )
+    out: Dict[int, Dict[int, int]] = defaultdict(dict)
+    for account_id, currency_id, quantity_minor in rows:
+        out[account_id][currency_id] = quantity_minor
+    return out
+
+
+def get_account_tree(root: Account, at: Optional[date] = None) -> AccountTreeNode:
+    """Returns the tree of accounts under `root` with their balances at `at`
+    (or with all movements if `at` is None). Movements are summed per account
+    in one query and rolled up in memory, so this is linear on the number of
+    accounts."""
+    descendants = root.get_descendants(include_self=True)
+    accounts = list(descendants.select_related("acc_type").order_by("lft"))
+    quantities_per_account = _get_quantities_per_account(root, at)
+    currencies = Currency.objects.in_bulk()
+
+    # In `lft` order, the parent of an account is the last open account
+    parents: Dict[int, Optional[int]] = {}
+    children: Dict[Optional[int], List[int]] = defaultdict(list)
+    open_accounts: List[Account] = []
+    for account in accounts:
+        while open_accounts and open_accounts[-1].rght < account.lft:
+            open_accounts.pop()
+        parent_pk = open_accounts[-1].pk if open_accounts else None
+        parents[account.pk] = parent_pk
+        children[parent_pk].append(account.pk)
+        open_accounts.append(account)
+
+    # In reverse `lft` order, all children come before their parent
+    nodes: Dict[int, AccountTreeNode] = {}
+    for account in reversed(accounts):
+        quantities = quantities_per_account[account.pk]
+        parent_quantities = quantities_per_account[parents[account.pk]]
+        for currency_id, quantity in quantities.items():
+            parent_quantities[currency_id] = parent_quantities.get(currency_id, 0) + quantity
+        balance = Balance(
+            [
+                Money.trusted(from_minor_units(q), currencies[c])
+                for c, q in sorted(quantities.items())
+            ]
+        )
+        child_nodes = [nodes.pop(x) for x in children[account.pk]]
+        nodes[account.pk] = AccountTreeNode(account, balance, child_nodes)
+    return nodes[root.pk]
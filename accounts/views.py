@@ -1,3 +1,7 @@
+from datetime import date
+from typing import Optional
+
+from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
@@ -5,9 +9,25 @@ from rest_framework.viewsets import ModelViewSet
 from accounts.journal import Journal
 from accounts.models import Account, AccountDestroyer
 from accounts.paginators import get_journal_paginator
-from accounts.serializers import AccountSerializer
+from accounts.serializers import (
+    AccountSerializer,
+    AccountTreeCreationSerializer,
+    AccountTreeInputsSerializer,
+    AccountTreeMovesSerializer,
+    AccountTreeNodeSerializer,
+    JournalInputsSerializer,
+)
+from accounts.tree import get_account_tree
+from common.etags import version_etag
 from currencies.money import Balance
-from movements.models import Transaction
+from movements.models import Transaction, get_ledger_version
+from pacs.db.routers import use_reports_db
+
+
+def _get_reports_db_version():
+    # Journals and trees are read from the reports db, so is their version
+    with use_reports_db():
+        return get_ledger_version()
 
 
 class AccountViewSet(ModelViewSet):
@@ -15,20 +35,69 @@ class AccountViewSet(ModelViewSet):
     serializer_class = AccountSerializer
 
     @action(["get"], True)
+    @version_etag(_get_reports_db_version)
     def journal(self, request, pk=None):
+        """The journal of the account, with the transactions from the `start`
+        to the `end` query params (or with all of them if missing)."""
         # If 'reverse' was parsed as a query param, reverse is True
         reverse = "reverse" in request.query_params
+        serializer = JournalInputsSerializer(data=request.query_params)
+        serializer.is_valid(True)
         account = self.get_object()
-        journal = Journal(account, Balance([]), _get_all_transactions())
-        paginator = get_journal_paginator(request, journal)
-        data = paginator.get_data(reverse)
+        with use_reports_db():
+            journal = _get_journal(account, **serializer.validated_data)
+            paginator = get_journal_paginator(request, journal)
+            data = paginator.get_data(reverse)
         return Response(data)
 
+    @action(["get"], True)
+    @version_etag(_get_reports_db_version)
+    def tree(self, request, pk=None):
+        """The subtree of the account, with the balance of each account at
+        the `date` query param (or with all movements if missing)."""
+        serializer = AccountTreeInputsSerializer(data=request.query_params)
+        serializer.is_valid(True)
+        account = self.get_object()
+        with use_reports_db():
+            tree = get_account_tree(account, serializer.validated_data["date"])
+            data = AccountTreeNodeSerializer(tree).data
+        return Response(data)
+
+    @action(["post"], False)
+    def bulk(self, request):
+        """Creates a tree of accounts at once (see accounts.bulk)."""
+        serializer = AccountTreeCreationSerializer(data=request.data)
+        serializer.is_valid(True)
+        accounts = serializer.save()
+        return Response(AccountSerializer(accounts, many=True).data, status.HTTP_201_CREATED)
+
+    @action(["post"], False)
+    def move(self, request):
+        """Moves many accounts to new parents at once (see accounts.bulk)."""
+        serializer = AccountTreeMovesSerializer(data=request.data)
+        serializer.is_valid(True)
+        accounts = serializer.save()
+        return Response(AccountSerializer(accounts, many=True).data)
+
     # Overrides parent to validate before destruction
     def perform_destroy(self, instance):
         AccountDestroyer()(instance)
 
 
+def _get_journal(account: Account, start: Optional[date], end: Optional[date]) -> Journal:
+    """Returns the journal of an account with only the transactions from
+    `start` to `end`. The balance before `start` is summed in the db, so the
+    transactions before it are never fetched."""
+    transactions = _get_all_transactions()
+    initial_balance = Balance([])
+    if start is not None:
+        initial_balance = transactions.filter(date__lt=start).get_balance_for_account(account)
+        transactions = transactions.filter(date__gte=start)
+    if end is not None:
+        transactions = transactions.filter(date__lte=end)
+    return Journal(account, initial_balance, transactions)
+
+
 def _get_all_transactions():
     """Return all transactions. Separated maily to facilitate test mock."""
     return Transaction.objects.all()
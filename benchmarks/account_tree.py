@@ -0,0 +1,108 @@
+"""
+Times creating a chart of accounts against the db at `PACS_DB_FILE`, one
+account at a time (`AccountFactory`) and at once (`AccountTreeCreator`). The
+tree has `branching` branches under the root, each with `branching` leaves.
+Then times moving `moves` of the leaves to other branches, one at a time
+(`set_parent`) and at once (`AccountTreeMover`). Everything is rolled back, so
+the db is left as it was:
+
+    PACS_DB_FILE=/tmp/bench.sqlite3 python -m benchmarks.account_tree --branching 100
+"""
+import argparse
+import time
+
+from benchmarks.utils import setup_django
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _timed_and_rolled_back(fn) -> float:
+    from django.db.transaction import atomic
+
+    start = time.perf_counter()
+    try:
+        with atomic():
+            fn()
+            elapsed = time.perf_counter() - start
+            raise _Rollback()
+    except _Rollback:
+        return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--branching", type=int, default=44)
+    parser.add_argument("--moves", type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from accounts.bulk import (
+        AccountMove,
+        AccountSpec,
+        AccountTreeCreator,
+        AccountTreeMover,
+    )
+    from accounts.models import Account, AccountFactory, AccTypeEnum, get_root_acc
+
+    n = args.branching
+    specs = [
+        AccountSpec(
+            f"Tree {i}",
+            AccTypeEnum.BRANCH,
+            [AccountSpec(f"Tree {i}.{j}", AccTypeEnum.LEAF) for j in range(n)],
+        )
+        for i in range(n)
+    ]
+
+    def one_by_one():
+        factory = AccountFactory()
+        for spec in specs:
+            branch = factory(spec.name, spec.acc_type, get_root_acc())
+            for child in spec.children:
+                factory(child.name, child.acc_type, branch)
+
+    def at_once():
+        AccountTreeCreator()(get_root_acc(), specs)
+
+    print(f"{n + n * n} accounts:")
+    print(f"  one by one: {_timed_and_rolled_back(one_by_one) * 1000:9.1f}ms")
+    print(f"     at once: {_timed_and_rolled_back(at_once) * 1000:9.1f}ms")
+
+    def timed_move(fn) -> float:
+        """Times `fn(moves)` in a tree with the accounts of the specs."""
+        elapsed = 0.0
+
+        def create_and_move():
+            nonlocal elapsed
+            root = get_root_acc()
+            created = AccountTreeCreator()(root, specs)
+            branches = [x for x in created if x.parent_id == root.pk]
+            next_branch = {x.pk: branches[(i + 1) % n] for i, x in enumerate(branches)}
+            leaves = [x for x in created if x.parent_id != root.pk]
+            # Leaves spread over the tree, each to the branch after its own
+            step = max(len(leaves) // args.moves, 1)
+            moves = [AccountMove(x, next_branch[x.parent_id]) for x in leaves[::step][: args.moves]]
+            start = time.perf_counter()
+            fn(moves)
+            elapsed = time.perf_counter() - start
+
+        _timed_and_rolled_back(create_and_move)
+        return elapsed
+
+    def moved_one_by_one(moves):
+        for x in moves:
+            # mptt moves using the mptt fields of the parent, so they must be fresh
+            Account.objects.get(pk=x.account.pk).set_parent(Account.objects.get(pk=x.parent.pk))
+
+    def moved_at_once(moves):
+        AccountTreeMover()(moves)
+
+    print(f"{args.moves} moves in a tree with {Account.objects.count() + n + n * n} accounts:")
+    print(f"  one by one: {timed_move(moved_one_by_one) * 1000:9.1f}ms")
+    print(f"     at once: {timed_move(moved_at_once) * 1000:9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
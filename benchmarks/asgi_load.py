@@ -0,0 +1,106 @@
+"""
+Load test for a running pacs server.
+
+Runs concurrent "dashboard" clients (posting balance-evolution reports) next to
+"crud" clients (listing currencies) and prints the throughput and latency of
+each group. Use it to compare `pacs.wsgi` and `pacs.asgi` under concurrency:
+
+    gunicorn -w 1 --threads 8 pacs.wsgi:application
+    gunicorn -w 1 -k uvicorn.workers.UvicornWorker pacs.asgi:application
+    python -m benchmarks.asgi_load --url http://127.0.0.1:8000 --dashboards 16 --crud 2
+"""
+import argparse
+import statistics
+import threading
+import time
+from datetime import date
+
+import requests
+
+
+def _month_ends(n):
+    out = []
+    year, month = 2015, 1
+    for _ in range(n):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        out.append(date.fromordinal(date(year, month, 1).toordinal() - 1).isoformat())
+    return out
+
+
+class Client(threading.Thread):
+    """A client making the same request in a loop until `stop_at`."""
+
+    def __init__(self, name, session, request_fn, stop_at):
+        super().__init__(name=name, daemon=True)
+        self.session = session
+        self.request_fn = request_fn
+        self.stop_at = stop_at
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        while time.monotonic() < self.stop_at:
+            start = time.monotonic()
+            resp = self.request_fn(self.session)
+            if resp.status_code >= 400:
+                self.errors += 1
+            self.latencies.append(time.monotonic() - start)
+
+
+def _summary(name, clients, duration):
+    latencies = sorted(x for c in clients for x in c.latencies)
+    errors = sum(c.errors for c in clients)
+    if not latencies:
+        return f"{name:>10}: no requests completed"
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    return (
+        f"{name:>10}: {len(clients):3d} clients {len(latencies):6d} reqs"
+        f" {len(latencies) / duration:8.1f} req/s"
+        f"  p50={statistics.median(latencies) * 1000:8.1f}ms  p95={p95 * 1000:8.1f}ms"
+        f"  errors={errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", default="valid_token")
+    parser.add_argument("--dashboards", type=int, default=16, help="Report clients")
+    parser.add_argument("--crud", type=int, default=2, help="CRUD clients")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds")
+    parser.add_argument("--dates", type=int, default=24, help="Dates per report")
+    args = parser.parse_args()
+
+    headers = {"authorization": f"TOKEN {args.token}"}
+    accounts = requests.get(f"{args.url}/accounts/", headers=headers).json()
+    report_data = {"accounts": [x["pk"] for x in accounts], "dates": _month_ends(args.dates)}
+
+    def post_report(session):
+        return session.post(f"{args.url}/reports/balance-evolution/", json=report_data)
+
+    def list_currencies(session):
+        return session.get(f"{args.url}/currencies/")
+
+    def new_session():
+        session = requests.Session()
+        session.headers.update(headers)
+        return session
+
+    stop_at = time.monotonic() + args.duration
+    dashboards = [
+        Client(f"dashboard-{i}", new_session(), post_report, stop_at)
+        for i in range(args.dashboards)
+    ]
+    cruds = [Client(f"crud-{i}", new_session(), list_currencies, stop_at) for i in range(args.crud)]
+    for client in dashboards + cruds:
+        client.start()
+    for client in dashboards + cruds:
+        client.join()
+
+    print(f"{args.url} during {args.duration}s, {len(accounts)} accounts x {args.dates} dates")
+    print(_summary("dashboard", dashboards, args.duration))
+    print(_summary("crud", cruds, args.duration))
+
+
+if __name__ == "__main__":
+    main()
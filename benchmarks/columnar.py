@@ -0,0 +1,66 @@
+"""
+Compares the reports engines (see `reports.columnar`).
+
+Times BalanceEvolutionQuery and FlowEvolutionQuery over all accounts of the db
+at `PACS_DB_FILE` with the sql and the columnar engines, checking that both
+give the same reports, and times loading the columnar ledger and applying a
+write to it:
+
+    PACS_DB_FILE=/path/to/big.sqlite3 python -m benchmarks.columnar
+"""
+import argparse
+import time
+
+from benchmarks.utils import best_of, month_ends, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Max, Min
+    from django.test.utils import override_settings
+
+    from accounts.models import Account
+    from movements.models import Movement, Transaction
+    from reports import columnar
+    from reports.reports import BalanceEvolutionQuery, FlowEvolutionQuery, Period
+
+    accounts = list(Account.objects.filter(parent__isnull=False))
+    date_range = Transaction.objects.aggregate(start=Min("date"), end=Max("date"))
+    dates = month_ends(date_range["start"], date_range["end"])
+    periods = [Period(dates[i - 1], dates[i]) for i in range(1, len(dates))]
+    n_movements = Movement.objects.count()
+    print(f"{n_movements} movements, {len(accounts)} accounts, {len(dates)} dates")
+
+    load, _ = best_of(columnar.ColumnarLedger.load, args.repeat)
+    ledger = columnar.ColumnarLedger.load()
+    movement = Movement.objects.select_related("transaction").last()
+    write = columnar._get_write(Movement, movement, ledger.version + 1, deleted=False)
+    apply, _ = best_of(lambda: ledger.apply([write]), args.repeat)
+    print(f"load: {load:.3f}s, apply a write: {apply * 1000:.1f}ms")
+
+    def balance():
+        return BalanceEvolutionQuery(accounts, dates).run()
+
+    def flow():
+        return FlowEvolutionQuery(accounts, periods).run()
+
+    print(f"{'engine':>10} {'balance (s)':>12} {'flow (s)':>9}")
+    results = {}
+    for engine in [columnar.SQL, columnar.COLUMNAR]:
+        with override_settings(REPORTS_ENGINE=engine):
+            # Loads the ledger out of the timings
+            start = time.perf_counter()
+            results[engine] = (balance(), flow())
+            first = time.perf_counter() - start
+            balance_time, _ = best_of(balance, args.repeat)
+            flow_time, _ = best_of(flow, args.repeat)
+        print(f"{engine:>10} {balance_time:>12.3f} {flow_time:>9.3f} (first run: {first:.3f}s)")
+    assert results[columnar.SQL] == results[columnar.COLUMNAR], "The engines differ!"
+
+
+if __name__ == "__main__":
+    main()
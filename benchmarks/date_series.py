@@ -0,0 +1,72 @@
+"""
+Times the balance evolution of the top accounts against the db at
+`PACS_DB_FILE`, for monthly, weekly and daily dates over the whole ledger. The
+same dates are given as a list (one CASE branch per date) and as a date series
+(grouped by arithmetic on the dates). Also times the monthly and yearly flow
+evolution, given as a list of periods and as a period series:
+
+    PACS_DB_FILE=/tmp/bench.sqlite3 python -m benchmarks.date_series
+"""
+import argparse
+
+from benchmarks.utils import best_of, setup_django
+
+
+def _exact_flows(account_flows):
+    """The flows as values compared exactly (`Money` compares only a few
+    decimal places), with the moneys of each flow in a fixed order."""
+    return [
+        [sorted((x.currency.pk, x.quantity) for x in flow.moneys) for flow in y.flows]
+        for y in account_flows
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Max, Min
+
+    from accounts.models import get_root_acc
+    from movements.models import Transaction
+    from reports.reports import (
+        BalanceEvolutionQuery,
+        CalendarStep,
+        DateSeries,
+        DateStep,
+        FlowEvolutionQuery,
+        PeriodSeries,
+    )
+
+    accounts = list(get_root_acc().get_children())
+    date_range = Transaction.objects.aggregate(start=Min("date"), end=Max("date"))
+    for step in [DateStep.MONTH, DateStep.WEEK, DateStep.DAY]:
+        date_series = DateSeries(date_range["start"], date_range["end"], step)
+        dates = date_series.get_dates()
+        with_list = BalanceEvolutionQuery(accounts, dates)
+        with_series = BalanceEvolutionQuery(accounts, dates, date_series=date_series)
+        assert with_list.run() == with_series.run()
+        list_best, _ = best_of(with_list.run, args.repeat)
+        series_best, _ = best_of(with_series.run, args.repeat)
+        print(
+            f"{step.value:>6} {len(dates):5} dates:"
+            f" list={list_best * 1000:9.1f}ms series={series_best * 1000:9.1f}ms"
+        )
+    for step in [CalendarStep.MONTH, CalendarStep.YEAR]:
+        period_series = PeriodSeries(date_range["start"], date_range["end"], step)
+        periods = period_series.get_periods()
+        with_list = FlowEvolutionQuery(accounts, periods)
+        with_series = FlowEvolutionQuery(accounts, periods, period_series=period_series)
+        assert _exact_flows(with_list.run()) == _exact_flows(with_series.run())
+        list_best, _ = best_of(with_list.run, args.repeat)
+        series_best, _ = best_of(with_series.run, args.repeat)
+        print(
+            f"{step.value:>6} {len(periods):5} periods:"
+            f" list={list_best * 1000:9.1f}ms series={series_best * 1000:9.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
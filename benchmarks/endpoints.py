@@ -0,0 +1,141 @@
+"""
+Times the main read endpoints against the db at `PACS_DB_FILE`.
+
+Requests go through the full django stack (middlewares, auth, serialization)
+in-process, so no server is needed. Results are written as json, to be compared
+with the ones of another commit (see `inv bench`):
+
+    PACS_DB_FILE=/tmp/bench.sqlite3 python -m benchmarks.endpoints --output out.json
+    PACS_DB_FILE=/tmp/bench.sqlite3 python -m benchmarks.endpoints --compare out.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import time
+from datetime import date
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.utils import best_of, month_ends, setup_django
+
+
+def _git_version() -> str:
+    try:
+        cmd = ["git", "describe", "--tags", "--always", "--dirty"]
+        return subprocess.run(cmd, capture_output=True, check=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _get_cases(client) -> List[Tuple[str, Callable]]:
+    """Returns (name, fn) for each benchmarked request."""
+    from django.db.models import Count, Max, Min
+
+    from accounts.models import Account, get_root_acc
+    from movements.models import Transaction
+
+    root = get_root_acc()
+    top_accounts = [x.pk for x in root.get_children()]
+    leaf = Account.objects.annotate(n=Count("movement")).order_by("-n").first()
+    date_range = Transaction.objects.aggregate(start=Min("date"), end=Max("date"))
+    dates = [x.isoformat() for x in month_ends(date_range["start"], date_range["end"])]
+    periods = [[dates[i - 1], dates[i]] for i in range(1, len(dates))]
+    balance_evolution_data = {"accounts": top_accounts, "dates": dates}
+    flow_evolution_data = {"accounts": top_accounts, "periods": periods}
+    exchange_rates_params = {
+        "start_at": date(date_range["end"].year, 1, 1).isoformat(),
+        "end_at": date_range["end"].isoformat(),
+        "currency_codes": "EUR,BRL",
+    }
+
+    def get(url, **params):
+        return lambda: client.get(url, params)
+
+    def post(url, data):
+        return lambda: client.post(url, data, content_type="application/json")
+
+    journal_url = f"/accounts/{leaf.pk}/journal/"
+    return [
+        ("balance_evolution", post("/reports/balance-evolution/", balance_evolution_data)),
+        ("flow_evolution", post("/reports/flow-evolution/", flow_evolution_data)),
+        ("journal", get(journal_url)),
+        ("journal_last_page", get(journal_url, reverse=1, page=1, page_size=50)),
+        ("journal_last_month", get(journal_url, start=dates[-2], end=dates[-1])),
+        ("transactions", get("/transactions/", page=1, page_size=100)),
+        ("transactions_by_account", get("/transactions/", account_id=leaf.pk, page_size=100)),
+        ("transactions_by_description", get("/transactions/", description="rent", page_size=100)),
+        ("accounts", get("/accounts/")),
+        ("account_tree", get(f"/accounts/{root.pk}/tree/", date=date_range["end"].isoformat())),
+        ("currencies", get("/currencies/")),
+        ("exchange_rates", get("/exchange_rates/data/v2", **exchange_rates_params)),
+    ]
+
+
+def run(repeat: int) -> Dict:
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    from movements.models import Movement, Transaction
+    from pacs_auth.models import token_factory
+
+    # Allows the "testserver" host used by the test client
+    setup_test_environment()
+    client = Client(HTTP_AUTHORIZATION=f"TOKEN {token_factory().value}")
+    results = {}
+    for name, fn in _get_cases(client):
+        resp = fn()
+        assert resp.status_code == 200, f"{name}: {resp.status_code} {resp.content[:200]}"
+        best, median = best_of(fn, repeat)
+        results[name] = {"best": best, "median": median}
+        print(f"{name:>28} best={best * 1000:9.1f}ms median={median * 1000:9.1f}ms")
+    return {
+        "version": _git_version(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "db": {
+            "transactions": Transaction.objects.count(),
+            "movements": Movement.objects.count(),
+        },
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(old: Dict, new: Dict) -> None:
+    print(f"\n{old['version']} -> {new['version']} (median)")
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before, after = old["results"][name]["median"], result["median"]
+        print(
+            f"{name:>28} {before * 1000:9.1f}ms -> {after * 1000:9.1f}ms"
+            f" ({(after - before) / before * 100:+6.1f}%)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Where to write the json results")
+    parser.add_argument("--compare", help="json results of a previous run to compare with")
+    parser.add_argument(
+        "--report-cache", action="store_true", help="Keeps the report cache (time cache hits)"
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+
+    # By default, time computing the reports and not the cache
+    with override_settings(**({} if args.report_cache else {"REPORTS_CACHE_TIMEOUT": 0})):
+        results = run(args.repeat)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
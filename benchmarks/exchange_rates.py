@@ -0,0 +1,80 @@
+"""
+Times `fetch_exchange_rates` reading from the db at `PACS_DB_FILE` and from
+the `mmap`ed exchange rates store (see `exchangerates.rate_store`), and opening
+the store (what a new worker does). `currencies` currencies with a rate per
+day for `years` years are created and then rolled back, so the db is left as
+it was:
+
+    PACS_DB_FILE=/tmp/bench.sqlite3 python -m benchmarks.exchange_rates
+"""
+import argparse
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+from benchmarks.utils import best_of, setup_django
+
+
+class _Rollback(Exception):
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--currencies", type=int, default=20)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.transaction import atomic
+    from django.test.utils import override_settings
+
+    from exchangerates.models import ExchangeRate
+    from exchangerates.rate_store import RateStore, write_rate_store
+    from exchangerates.services import fetch_exchange_rates
+
+    random.seed(0)
+    codes = [f"C{i:02}" for i in range(args.currencies)]
+    start = date(2010, 1, 1)
+    n_days = 365 * args.years
+    # A year, for a fourth of the currencies
+    fetch_args = (start + timedelta(days=n_days - 365), start + timedelta(days=n_days - 1))
+    fetch_codes = codes[: max(1, len(codes) // 4)]
+
+    try:
+        with atomic(), tempfile.TemporaryDirectory() as tmp_dir:
+            ExchangeRate.objects.bulk_create(
+                ExchangeRate(
+                    currency_code=code,
+                    date=start + timedelta(days=i),
+                    value=Decimal(random.randint(1, 10 ** 6)) / 1000,
+                )
+                for code in codes
+                for i in range(n_days)
+            )
+            path = os.path.join(tmp_dir, "exchangerates.bin")
+            write, _ = best_of(lambda: write_rate_store(path), args.repeat)
+            print(f"{len(codes) * n_days} rates, {os.path.getsize(path) / 1e6:.1f}MB store")
+            print(f"{'write store':>12}: {write * 1000:8.2f}ms")
+            open_store, _ = best_of(lambda: RateStore.open(path), args.repeat)
+            print(f"{'open store':>12}: {open_store * 1000:8.2f}ms")
+
+            results = {}
+            for name, store_file in [("db", ""), ("store", path)]:
+                with override_settings(EXCHANGE_RATES_STORE_FILE=store_file):
+                    results[name] = fetch_exchange_rates(*fetch_args, fetch_codes)
+                    best, median = best_of(
+                        lambda: fetch_exchange_rates(*fetch_args, fetch_codes), args.repeat
+                    )
+                print(f"{name:>12}: best={best * 1000:8.2f}ms median={median * 1000:8.2f}ms")
+            assert results["db"] == results["store"], "The results differ!"
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    main()
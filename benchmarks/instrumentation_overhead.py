@@ -0,0 +1,63 @@
+"""
+Measures the overhead of `metrics.middleware.InstrumentationMiddleware`.
+
+First times the middleware alone (around a view that does nothing), then the
+endpoints of `benchmarks.endpoints` with and without it, alternating between
+both to even out noise, against the db at `PACS_DB_FILE`:
+
+    PACS_DB_FILE=/tmp/bench.sqlite3 python -m benchmarks.instrumentation_overhead
+"""
+import argparse
+import statistics
+import time
+import timeit
+
+from benchmarks.utils import setup_django
+
+MIDDLEWARE = "metrics.middleware.InstrumentationMiddleware"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.http import HttpResponse
+    from django.test import Client, RequestFactory, override_settings
+    from django.test.utils import setup_test_environment
+
+    from benchmarks.endpoints import _get_cases
+    from metrics.middleware import InstrumentationMiddleware
+    from pacs_auth.models import token_factory
+
+    request, response = RequestFactory().get("/currencies/"), HttpResponse()
+    middleware = InstrumentationMiddleware(lambda _: response)
+    number = 20000
+    per_request = timeit.timeit(lambda: middleware(request), number=number) / number
+    print(f"Middleware alone: {per_request * 1e6:.1f}us per request\n")
+
+    setup_test_environment()
+    authorization = f"TOKEN {token_factory().value}"
+    clients = {"on": Client(HTTP_AUTHORIZATION=authorization)}
+    with override_settings(MIDDLEWARE=[x for x in settings.MIDDLEWARE if x != MIDDLEWARE]):
+        clients["off"] = Client(HTTP_AUTHORIZATION=authorization)
+        # Loads the middleware chain without the instrumentation
+        clients["off"].get("/currencies/")
+    cases = {mode: dict(_get_cases(client)) for mode, client in clients.items()}
+
+    print(f"{'endpoint':>28} {'off (ms)':>9} {'on (ms)':>9} {'overhead':>9}")
+    for name in cases["on"]:
+        times = {"on": [], "off": []}
+        for _ in range(args.rounds):
+            for mode in ("off", "on"):
+                start = time.perf_counter()
+                cases[mode][name]()
+                times[mode].append(time.perf_counter() - start)
+        off, on = statistics.median(times["off"]), statistics.median(times["on"])
+        print(f"{name:>28} {off * 1000:9.2f} {on * 1000:9.2f} {(on - off) / off * 100:+8.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Seeded generator of synthetic ledgers, used by the benchmarks.
+
+Builds an account tree of `depth` levels with `branching` children per branch,
+`transactions` transactions spread over `years` years (most of them in one
+currency, some exchanging between two currencies) and daily exchange rates for
+every currency. The same spec and seed always generate the same ledger:
+
+    PACS_DB_FILE=/tmp/bench.sqlite3 python manage.py migrate
+    PACS_DB_FILE=/tmp/bench.sqlite3 python -m benchmarks.ledger --transactions 100000
+
+Transactions and movements are bulk inserted, so 1M transactions take minutes
+instead of hours. Expects the accounts and currencies to be populated.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterator, List, Tuple
+
+import attr
+
+from benchmarks.utils import setup_django
+
+WORDS = [
+    "supermarket",
+    "salary",
+    "rent",
+    "restaurant",
+    "train",
+    "insurance",
+    "books",
+    "pharmacy",
+    "electricity",
+    "internet",
+    "gym",
+    "taxes",
+    "transfer",
+    "coffee",
+    "flight",
+]
+# Currency codes and (rough) prices in USD
+CURRENCY_PRICES = {"USD": 1.0, "EUR": 1.1, "BRL": 0.2, "GBP": 1.3, "JPY": 0.009, "CHF": 1.05}
+BATCH_SIZE = 5000
+
+
+@attr.s(frozen=True)
+class LedgerSpec:
+    seed: int = attr.ib(default=0)
+    depth: int = attr.ib(default=3)
+    branching: int = attr.ib(default=5)
+    transactions: int = attr.ib(default=10000)
+    currency_codes: Tuple[str, ...] = attr.ib(default=("EUR", "BRL", "USD", "GBP"))
+    start: date = attr.ib(default=date(2015, 1, 1))
+    years: int = attr.ib(default=5)
+    # Fraction of transactions that exchange money between two currencies
+    exchange_ratio: float = attr.ib(default=0.05)
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=365 * self.years)
+
+
+@attr.s(frozen=True)
+class Ledger:
+    branches: List = attr.ib()
+    leaves: List = attr.ib()
+    currencies: List = attr.ib()
+    transactions: int = attr.ib()
+    movements: int = attr.ib()
+
+
+def _generate_accounts(spec: LedgerSpec) -> Tuple[List, List]:
+    from accounts.models import AccountFactory, AccTypeEnum, get_root_acc
+
+    factory = AccountFactory()
+    branches, leaves = [], []
+    parents = [("", get_root_acc())]
+    for level in range(1, spec.depth + 1):
+        acc_type = AccTypeEnum.LEAF if level == spec.depth else AccTypeEnum.BRANCH
+        children = []
+        for path, parent in parents:
+            for i in range(spec.branching):
+                child_path = f"{path}.{i}" if path else str(i)
+                child = factory(f"Bench {child_path}", acc_type, parent)
+                children.append((child_path, child))
+        (leaves if acc_type == AccTypeEnum.LEAF else branches).extend(x for _, x in children)
+        parents = children
+    return branches, leaves
+
+
+def _generate_currencies(spec: LedgerSpec) -> List:
+    from currencies.models import Currency, CurrencyFactory
+
+    existing = {x.code: x for x in Currency.objects.filter(code__in=spec.currency_codes)}
+    return [existing.get(x) or CurrencyFactory()(x, x) for x in spec.currency_codes]
+
+
+def _generate_exchange_rates(spec: LedgerSpec, random_: random.Random) -> None:
+    from exchangerates.models import ExchangeRate
+
+    rates = []
+    for code in spec.currency_codes:
+        price = CURRENCY_PRICES.get(code, 1.0)
+        for days in range((spec.end - spec.start).days + 1):
+            # A small random walk around the initial price
+            price *= 1 + random_.gauss(0, 0.005)
+            value = Decimal(price).quantize(Decimal("0.00001"))
+            date_ = spec.start + timedelta(days)
+            rates.append(ExchangeRate(currency_code=code, date=date_, value=value))
+    ExchangeRate.objects.bulk_create(rates, ignore_conflicts=True)
+
+
+def _quantity(random_: random.Random) -> Decimal:
+    # Mostly small expenses, with a long tail of bigger ones
+    return Decimal(round(random_.lognormvariate(3, 1.2), 2)).quantize(Decimal("0.01"))
+
+
+def _generate_transactions(
+    spec: LedgerSpec, random_: random.Random, leaves: List, currencies: List, first_pk: int
+) -> Iterator[Tuple]:
+    """Yields (transaction, movements) tuples with pks already set."""
+    from common.utils import to_minor_units
+    from movements.models import Movement, Transaction
+
+    days = (spec.end - spec.start).days
+    # The first currency is the "main" one, used by most transactions
+    weights = [len(currencies)] + [1] * (len(currencies) - 1)
+    for pk in range(first_pk, first_pk + spec.transactions):
+        description = " ".join(random_.sample(WORDS, random_.randint(1, 3)))
+        reference = f"REF{pk}" if random_.random() < 0.2 else None
+        date_ = spec.start + timedelta(random_.randint(0, days))
+        transaction = Transaction(pk=pk, description=description, reference=reference, date=date_)
+        quantity = _quantity(random_)
+        if len(currencies) > 1 and random_.random() < spec.exchange_ratio:
+            acc_from, acc_to = random_.sample(leaves, 2)
+            cur_from, cur_to = random_.sample(currencies, 2)
+            price = CURRENCY_PRICES.get(cur_from.code, 1.0) / CURRENCY_PRICES.get(cur_to.code, 1.0)
+            quantity_to = (quantity * Decimal(price)).quantize(Decimal("0.01"))
+            specs = [(acc_from, cur_from, -quantity), (acc_to, cur_to, quantity_to)]
+        else:
+            currency = random_.choices(currencies, weights)[0]
+            accounts = random_.sample(leaves, 3 if random_.random() < 0.2 else 2)
+            part = (quantity / 3).quantize(Decimal("0.01"))
+            if len(accounts) == 2:
+                specs = [(accounts[0], currency, -quantity), (accounts[1], currency, quantity)]
+            else:
+                specs = [
+                    (accounts[0], currency, -quantity),
+                    (accounts[1], currency, part),
+                    (accounts[2], currency, quantity - part),
+                ]
+        # bulk_create does not call Movement.save, which sets quantity_minor
+        movements = [
+            Movement(
+                transaction_id=pk,
+                account=account,
+                currency=currency,
+                quantity=quantity,
+                quantity_minor=to_minor_units(quantity),
+            )
+            for account, currency, quantity in specs
+        ]
+        yield transaction, movements
+
+
+def generate_ledger(spec: LedgerSpec) -> Ledger:
+    """Generates a ledger in the default db according to `spec`."""
+    from django.db.models import Max
+    from django.db.transaction import atomic
+
+    from movements.models import Movement, Transaction
+
+    random_ = random.Random(spec.seed)
+    with atomic():
+        branches, leaves = _generate_accounts(spec)
+        currencies = _generate_currencies(spec)
+        _generate_exchange_rates(spec, random_)
+        first_pk = (Transaction.objects.aggregate(x=Max("pk"))["x"] or 0) + 1
+        generated = _generate_transactions(spec, random_, leaves, currencies, first_pk)
+        n_movements = 0
+        while True:
+            batch = [x for _, x in zip(range(BATCH_SIZE), generated)]
+            if not batch:
+                break
+            Transaction.objects.bulk_create([x for x, _ in batch])
+            movements = [x for _, movements in batch for x in movements]
+            Movement.objects.bulk_create(movements)
+            n_movements += len(movements)
+    return Ledger(branches, leaves, currencies, spec.transactions, n_movements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    defaults = LedgerSpec()
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--branching", type=int, default=defaults.branching)
+    parser.add_argument("--transactions", type=int, default=defaults.transactions)
+    parser.add_argument("--currencies", default=",".join(defaults.currency_codes))
+    parser.add_argument("--years", type=int, default=defaults.years)
+    args = parser.parse_args()
+
+    setup_django()
+    spec = LedgerSpec(
+        seed=args.seed,
+        depth=args.depth,
+        branching=args.branching,
+        transactions=args.transactions,
+        currency_codes=tuple(args.currencies.split(",")),
+        years=args.years,
+    )
+    ledger = generate_ledger(spec)
+    print(
+        f"Generated {len(ledger.branches)} branches, {len(ledger.leaves)} leaves,"
+        f" {ledger.transactions} transactions and {ledger.movements} movements"
+    )
+
+
+if __name__ == "__main__":
+    main()
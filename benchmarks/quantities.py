@@ -0,0 +1,50 @@
+"""
+Times summing the quantities of all movements per account and currency
+against the db at `PACS_DB_FILE`, from the decimal column (`quantity`, which
+sqlite sums as floats) and from the integer one (`quantity_minor`), both
+converted to `Decimal`s as the reports do. Also reports how many of the sums
+differ between the two:
+
+    PACS_DB_FILE=/tmp/bench.sqlite3 python -m benchmarks.quantities
+
+The db must have been migrated, so that `quantity_minor` is filled.
+"""
+import argparse
+
+from benchmarks.utils import best_of, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Sum
+
+    from common.utils import from_minor_units
+    from movements.models import Movement
+
+    rows = Movement.objects.order_by().values_list("account_id", "currency_id")
+
+    def decimal_sums():
+        # Django rebuilds a Decimal from the float of each sum
+        return {(a, c): q for a, c, q in rows.annotate(q=Sum("quantity"))}
+
+    def integer_sums():
+        return {(a, c): from_minor_units(q) for a, c, q in rows.annotate(q=Sum("quantity_minor"))}
+
+    n_movements = Movement.objects.count()
+    from_decimals, from_integers = decimal_sums(), integer_sums()
+    differ = sum(from_decimals[k] != from_integers[k] for k in from_integers)
+    print(f"{n_movements} movements, {len(from_integers)} sums ({differ} differ):")
+    for name, fn in [("decimal", decimal_sums), ("integer", integer_sums)]:
+        best, median = best_of(fn, args.repeat)
+        print(
+            f"  {name:>8}: best={best * 1000:9.1f}ms median={median * 1000:9.1f}ms"
+            f" ({n_movements / best / 1e6:5.2f}M movements/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
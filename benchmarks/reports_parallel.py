@@ -0,0 +1,65 @@
+"""
+Benchmarks the report execution modes (see `reports.executors`).
+
+Times BalanceEvolutionQuery and FlowEvolutionQuery over all accounts of the db
+at `PACS_DB_FILE`, serially and with 1..N thread and process workers:
+
+    PACS_DB_FILE=/path/to/big.sqlite3 python -m benchmarks.reports_parallel --max-workers 8
+"""
+import argparse
+import os
+
+from benchmarks.utils import best_of, month_ends, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Max, Min
+
+    from accounts.models import Account
+    from movements.models import Transaction
+    from reports import executors
+    from reports.reports import BalanceEvolutionQuery, FlowEvolutionQuery, Period
+
+    accounts = list(Account.objects.filter(parent__isnull=False))
+    date_range = Transaction.objects.aggregate(start=Min("date"), end=Max("date"))
+    dates = month_ends(date_range["start"], date_range["end"])
+    periods = [Period(dates[i - 1], dates[i]) for i in range(1, len(dates))]
+    print(f"{len(accounts)} accounts, {len(dates)} dates, {len(periods)} periods")
+
+    runs = [("serial", 1)]
+    workers = 1
+    while workers <= args.max_workers:
+        runs += [(executors.THREADS, workers), (executors.PROCESSES, workers)]
+        workers *= 2
+
+    serial_times = {}
+    print(
+        f"{'mode':>10} {'workers':>7} {'balance (s)':>12} {'speedup':>7}"
+        f" {'flow (s)':>9} {'speedup':>7}"
+    )
+    for mode, workers in runs:
+        executor = executors.get_report_executor(mode, workers)
+        # Warms up the pool (starts processes, opens connections)
+        executor.map(int, range(workers))
+        balance, _ = best_of(
+            lambda: BalanceEvolutionQuery(accounts, dates, executor=executor).run(), args.repeat
+        )
+        flow, _ = best_of(
+            lambda: FlowEvolutionQuery(accounts, periods, executor=executor).run(), args.repeat
+        )
+        serial_times.setdefault("balance", balance)
+        serial_times.setdefault("flow", flow)
+        print(
+            f"{mode:>10} {workers:>7} {balance:>12.3f} {serial_times['balance'] / balance:>7.2f}"
+            f" {flow:>9.3f} {serial_times['flow'] / flow:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Times searching transactions against the db at `PACS_DB_FILE`, with the full
+text search index (`search=`) and with `icontains` (`description=`), for some
+words and their first letters, as typed by a user:
+
+    PACS_DB_FILE=/tmp/bench.sqlite3 python -m benchmarks.search
+
+The db must have been migrated, so that the search index exists. Both are
+timed through the TransactionFilterSet, counting the results and fetching the
+first page, like the transactions endpoint does.
+"""
+import argparse
+
+from benchmarks.utils import best_of, setup_django
+
+PAGE_SIZE = 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--words", default="rent,supermarket,restaurant train")
+    args = parser.parse_args()
+
+    setup_django()
+    from movements.filters import TransactionFilterSet
+    from movements.models import Transaction
+
+    transactions = Transaction.objects.order_by("-date", "-pk")
+
+    def fetch(params):
+        def fn():
+            qs = TransactionFilterSet(params, transactions).qs
+            return qs.count(), list(qs[:PAGE_SIZE])
+
+        return fn
+
+    for word in args.words.split(","):
+        for n in [3, len(word)]:
+            text = word[:n]
+            icontains_best, _ = best_of(fetch({"description": text}), args.repeat)
+            search_best, _ = best_of(fetch({"search": text}), args.repeat)
+            print(
+                f"{text:>16}: icontains={icontains_best * 1000:9.1f}ms"
+                f" search={search_best * 1000:9.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
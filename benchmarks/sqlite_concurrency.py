@@ -0,0 +1,148 @@
+"""
+Benchmarks concurrent report readers plus a writer for each sqlite profile.
+
+Copies the db at `PACS_DB_FILE` once per profile of
+`settings.SQLITE_PRAGMA_PROFILES`, and runs reader threads (a report-like
+aggregate query) while a writer thread keeps committing new transactions:
+
+    PACS_DB_FILE=/path/to/db.sqlite3 python -m benchmarks.sqlite_concurrency --readers 4
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import setup_django
+
+READ_QUERY = """
+SELECT m.currency_id, SUM(m.quantity)
+FROM movements_movement m
+JOIN movements_transaction t ON m.transaction_id = t.id
+JOIN accounts_account a ON m.account_id = a.id
+WHERE a.lft >= ? AND a.rght <= ? AND t.date <= ?
+GROUP BY m.currency_id
+"""
+
+
+def _connect(db_file, pragmas):
+    from pacs.db.sqlite3.pragmas import apply_pragmas
+
+    # Same as django: autocommit handled by us, 5s busy timeout
+    conn = sqlite3.connect(db_file, timeout=5, isolation_level=None, check_same_thread=False)
+    apply_pragmas(conn, pragmas)
+    return conn
+
+
+def _reader(db_file, pragmas, root, stop_at, latencies, errors):
+    conn = _connect(db_file, pragmas)
+    while time.monotonic() < stop_at:
+        start = time.monotonic()
+        try:
+            conn.execute(READ_QUERY, (root[0], root[1], "2100-01-01")).fetchall()
+        except sqlite3.OperationalError:
+            errors.append(1)
+        latencies.append(time.monotonic() - start)
+
+
+def _writer(db_file, pragmas, accounts, currency_id, stop_at, commits, errors):
+    conn = _connect(db_file, pragmas)
+    i = 0
+    while time.monotonic() < stop_at:
+        i += 1
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                "INSERT INTO movements_transaction (description, date) VALUES (?, ?)",
+                ("bench", "2020-01-01"),
+            )
+            for account_id, quantity in ((accounts[0], i), (accounts[1], -i)):
+                conn.execute(
+                    "INSERT INTO movements_movement"
+                    " (account_id, transaction_id, currency_id, quantity) VALUES (?, ?, ?, ?)",
+                    (account_id, cursor.lastrowid, currency_id, quantity),
+                )
+            conn.execute("COMMIT")
+            commits.append(1)
+        except sqlite3.OperationalError:
+            conn.execute("ROLLBACK")
+            errors.append(1)
+
+
+def _run(db_file, pragmas, readers, duration):
+    conn = sqlite3.connect(db_file)
+    root = conn.execute("SELECT lft, rght FROM accounts_account WHERE parent_id IS NULL").fetchone()
+    accounts = [
+        x for (x,) in conn.execute("SELECT account_id FROM movements_movement LIMIT 2").fetchall()
+    ]
+    currency_id = conn.execute("SELECT id FROM currencies_currency LIMIT 1").fetchone()[0]
+    conn.close()
+
+    stop_at = time.monotonic() + duration
+    latencies, read_errors, commits, write_errors = [], [], [], []
+    threads = [
+        threading.Thread(
+            target=_reader, args=(db_file, pragmas, root, stop_at, latencies, read_errors)
+        )
+        for _ in range(readers)
+    ]
+    threads.append(
+        threading.Thread(
+            target=_writer,
+            args=(db_file, pragmas, accounts, currency_id, stop_at, commits, write_errors),
+        )
+    )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        "reads/s": len(latencies) / duration,
+        "read p50 (ms)": statistics.median(latencies) * 1000,
+        "read p99 (ms)": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "read max (ms)": latencies[-1] * 1000,
+        "read errors": len(read_errors),
+        "commits/s": len(commits) / duration,
+        "write errors": len(write_errors),
+    }
+
+
+def _copy_with_default_journal(src_file, dst_file):
+    """Copies a db (including any WAL content), leaving it in sqlite's default
+    journal mode, so every profile starts from the same place."""
+    src, dst = sqlite3.connect(src_file), sqlite3.connect(dst_file)
+    src.backup(dst)
+    dst.execute("PRAGMA journal_mode=DELETE")
+    src.close()
+    dst.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for profile, pragmas in settings.SQLITE_PRAGMA_PROFILES.items():
+            db_file = os.path.join(tmp_dir, f"{profile}.sqlite3")
+            _copy_with_default_journal(settings.DATABASES["default"]["NAME"], db_file)
+            result = _run(db_file, pragmas, args.readers, args.duration)
+            print(f"{profile} ({args.readers} readers + 1 writer, {args.duration}s)")
+            for key, value in result.items():
+                print(f"  {key:>15}: {value:10.1f}")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
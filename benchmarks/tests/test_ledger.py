@@ -0,0 +1,32 @@
+from benchmarks.ledger import LedgerSpec, generate_ledger
+from common.testutils import PacsTestCase
+from exchangerates.models import ExchangeRate
+from movements.models import (
+    MovementSpec,
+    Transaction,
+    TransactionMovementSpecListValidator,
+)
+
+
+class TestGenerateLedger(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.populate_currencies()
+        self.spec = LedgerSpec(depth=2, branching=2, transactions=50, years=1, exchange_ratio=0.5)
+
+    def test_base(self):
+        ledger = generate_ledger(self.spec)
+        assert len(ledger.branches) == 2
+        assert len(ledger.leaves) == 4
+        assert [x.code for x in ledger.currencies] == list(self.spec.currency_codes)
+        assert Transaction.objects.count() == 50
+        assert ExchangeRate.objects.count() == 4 * 366
+
+    def test_transactions_are_valid(self):
+        generate_ledger(self.spec)
+        for transaction in Transaction.objects.all():
+            movements_specs = [
+                MovementSpec(x.account, x.get_money()) for x in transaction.movement_set.all()
+            ]
+            TransactionMovementSpecListValidator().validate(movements_specs)
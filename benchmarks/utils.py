@@ -0,0 +1,36 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import statistics
+import time
+from datetime import date
+from typing import List
+
+
+def setup_django():
+    """Sets up django using the environment (`.env`, `PACS_DB_FILE`, ...)"""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pacs.settings")
+    django.setup()
+
+
+def best_of(fn, repeat=3):
+    """Calls `fn` `repeat` times and returns (best, median) wall time in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+def month_ends(start: date, end: date) -> List[date]:
+    """Returns the last day of each month after `start`, up to `end`."""
+    out = []
+    year, month = start.year, start.month
+    while True:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        month_end = date.fromordinal(date(year, month, 1).toordinal() - 1)
+        if month_end > end:
+            return out
+        out.append(month_end)
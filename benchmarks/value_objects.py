@@ -0,0 +1,95 @@
+"""
+Times building the value objects that reports and journals build in loops
+(`Money`, `MovementSpec`, `Balance`), with their constructors and with their
+trusted fast paths, and measures the memory allocated per `Money`, slotted and
+not slotted (as it was). No db is needed:
+
+    python -m benchmarks.value_objects
+"""
+import argparse
+import time
+import tracemalloc
+from decimal import Decimal
+
+import attr
+
+from benchmarks.utils import best_of, setup_django
+
+
+def _evolve_add(one, other):
+    """`Money.__add__` as it was."""
+    if not one.currency == other.currency:
+        raise ValueError()
+    return attr.evolve(one, quantity=one.quantity + other.quantity)
+
+
+@attr.s(frozen=True, eq=False)
+class _UnslottedMoney:
+    """`Money` before it was slotted, to compare the allocations."""
+
+    quantity: Decimal = attr.ib(converter=Decimal)
+    currency = attr.ib()
+
+
+def _allocated_per_call(fn, n: int) -> float:
+    """The bytes still allocated after `n` calls of `fn`, per call."""
+    tracemalloc.start()
+    kept = [fn() for _ in range(n)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(kept) == n
+    return allocated / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from accounts.models import Account, AccountType
+    from currencies.models import Currency
+    from currencies.money import Balance, Money
+    from movements.models import MovementSpec
+
+    n = args.n
+    currency = Currency(pk=1, code="EUR")
+    account = Account(pk=1, acc_type=AccountType(movements_allowed=True))
+    quantity = Decimal("12.34567")
+    money = Money(quantity, currency)
+
+    def per_call(fn):
+        best, _ = best_of(lambda: [fn() for _ in range(n)], args.repeat)
+        return best / n * 1e9
+
+    cases = [
+        ("Money()", lambda: Money(quantity, currency)),
+        ("Money.trusted()", lambda: Money.trusted(quantity, currency)),
+        ("Money + Money (evolve)", lambda: _evolve_add(money, money)),
+        ("Money + Money", lambda: money + money),
+        ("MovementSpec()", lambda: MovementSpec(account, money)),
+        ("MovementSpec.trusted()", lambda: MovementSpec.trusted(account, money)),
+    ]
+    for name, fn in cases:
+        print(f"{name:>24}: {per_call(fn):7.0f}ns")
+
+    for name, fn in [
+        ("unslotted", lambda: _UnslottedMoney(quantity, currency)),
+        ("slotted", lambda: Money.trusted(quantity, currency)),
+    ]:
+        print(f"{name:>24}: {_allocated_per_call(fn, n):7.0f}B per Money")
+
+    # The balances of a journal, each the previous one plus a transaction
+    for n_transactions in [n // 100, n // 25]:
+        start = time.perf_counter()
+        balance = Balance([])
+        for _ in range(n_transactions):
+            balance += Balance([money])
+            balance.get_moneys()
+        elapsed = time.perf_counter() - start
+        print(f"{n_transactions:>7} journal balances: {elapsed * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
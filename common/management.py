@@ -5,12 +5,12 @@ import attr
 class TablePopulator:
     """A service that populates a Model with default data"""
 
-    # Callable[data -> object] used to create objects.
+    # Callable[List[data] -> List[object]] used to create objects, all at once.
     _create_fun = attr.ib()
 
-    # Callable[data -> boolean]. Returns whether an object already exists
-    # or not.
-    _exists_fun = attr.ib()
+    # Callable[[] -> Set[str]]. Returns the names of the objects that already
+    # exist, so that they are all checked with one query.
+    _existing_names_fun = attr.ib()
 
     # A list of data to create
     _model_data = attr.ib()
@@ -25,7 +25,15 @@ class TablePopulator:
         """Populates the db, creating all uncreated objects"""
         self._created_objects = []
         self._printfun(f"Creating objects... ", end="")
-        to_create = (x for x in self._model_data if not self._exists_fun(x))
-        for data in to_create:
-            self._created_objects.append(self._create_fun(data))
+        to_create = self._get_uncreated_data()
+        if to_create:
+            self._created_objects = list(self._create_fun(to_create))
         self._printfun(f"Created objects: {[x.name for x in self._created_objects]}")
+
+    def is_populated(self) -> bool:
+        """Whether all objects were already created"""
+        return not self._get_uncreated_data()
+
+    def _get_uncreated_data(self):
+        existing_names = self._existing_names_fun()
+        return [x for x in self._model_data if x["name"] not in existing_names]
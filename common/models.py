@@ -16,6 +16,15 @@ N_DECIMAL_PLACES: int = 5
 N_DECIMAL_MAX_DIGITS: int = 20
 DECIMAL_PLACES: Decimal = Decimal("10") ** -N_DECIMAL_PLACES
 N_DECIMAL_COMPARISON: int = 2
+# Quantities are also stored as integers, in units of DECIMAL_PLACES (minor
+# units), which sql sums exactly
+MINOR_UNITS_PER_UNIT: int = 10 ** N_DECIMAL_PLACES
+# Money quantities have up to 15 digits, the ones sqlite keeps when it stores
+# them (as floats). Their minor units (less than 10**15) also fit in a 64 bits
+# integer, with room for sums of thousands of them.
+N_QUANTITY_MAX_DIGITS: int = 15
+# Minor units must be in the range of a 64 bits integer (sqlite's INTEGER)
+MAX_MINOR_UNITS: int = 2 ** 63 - 1
 
 # Characters to be considered for tags
 TAGS_CHARS = set(string.ascii_lowercase + string.ascii_uppercase + string.digits + "-_")
@@ -29,7 +38,13 @@ def tag_validator(value):
 
 def new_money_quantity_field():
     """Returns a new field to be used to store currency quantities"""
-    return m.DecimalField(max_digits=20, decimal_places=N_DECIMAL_PLACES)
+    return m.DecimalField(max_digits=N_QUANTITY_MAX_DIGITS, decimal_places=N_DECIMAL_PLACES)
+
+
+def new_money_minor_units_field():
+    """Returns a new field to store a currency quantity in minor units. It is
+    derived from the quantity field when saving, so it is not validated."""
+    return m.BigIntegerField(blank=True, editable=False)
 
 
 def new_price_field():
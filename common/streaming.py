@@ -0,0 +1,64 @@
+"""
+Streaming of json responses.
+
+A `{"<key>": [<item>, ...]}` object is rendered and sent a chunk of items at a
+time, so neither the items nor their serialized copies are ever all in memory.
+Items are rendered like DRF's `JSONRenderer` renders them.
+
+The first chunk is computed before the response is sent, so errors computing it
+(e.g. invalid inputs) are still sent as error responses. Later errors can only
+abort the response.
+"""
+import json
+from typing import Any, Iterable, Iterator
+
+import attr
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+# Items rendered per chunk sent
+CHUNK_SIZE = 200
+
+
+def _dumps(x: Any) -> bytes:
+    return json.dumps(x, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def iter_json_list(key: str, items: Iterable[Any], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yields the json of `{key: list(items)}` in chunks."""
+    chunk = [b"{" + _dumps(key) + b":["]
+    for i, item in enumerate(items):
+        if i > 0:
+            chunk.append(b",")
+        chunk.append(_dumps(item))
+        if len(chunk) >= 2 * chunk_size:
+            yield b"".join(chunk)
+            chunk = []
+    chunk.append(b"]}")
+    yield b"".join(chunk)
+
+
+def streaming_json_response(content: Iterable[bytes]) -> StreamingHttpResponse:
+    """Streams `content`, computing its first chunk right away."""
+    content = iter(content)
+    first_chunk = next(content, None)
+    if first_chunk is not None:
+        content = _Prepended(first_chunk, content)
+    return StreamingHttpResponse(content, content_type="application/json")
+
+
+@attr.s(frozen=True)
+class _Prepended:
+    """`first_chunk` followed by `content`. Closing it (as closing the response
+    does) closes `content`, even if it was never iterated."""
+
+    first_chunk: bytes = attr.ib()
+    content: Iterator[bytes] = attr.ib()
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self.first_chunk
+        yield from self.content
+
+    def close(self) -> None:
+        if hasattr(self.content, "close"):
+            self.content.close()
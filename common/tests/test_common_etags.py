@@ -0,0 +1,20 @@
+from django.test import RequestFactory
+
+import common.etags as sut
+
+
+class TestGetVersionEtag:
+    def test_depends_on_version_path_and_accept(self):
+        request_factory = RequestFactory()
+        etags = {
+            sut.get_version_etag(1, request_factory.get("/foo/")),
+            sut.get_version_etag(2, request_factory.get("/foo/")),
+            sut.get_version_etag(1, request_factory.get("/foo/?page=2")),
+            sut.get_version_etag(1, request_factory.get("/foo/", HTTP_ACCEPT="text/html")),
+        }
+        assert len(etags) == 4
+
+    def test_stable(self):
+        request = RequestFactory().get("/foo/?bar=1")
+        assert sut.get_version_etag(1, request) == sut.get_version_etag(1, request)
+        assert sut.get_version_etag(1, request).startswith("1-")
@@ -0,0 +1,63 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+import common.streaming as sut
+
+
+class TestIterJsonList:
+    def test_renders_object_with_list(self):
+        items = [{"a": Decimal("1.5")}, {"b": "ç"}]
+        content = b"".join(sut.iter_json_list("data", iter(items)))
+        assert json.loads(content) == {"data": [{"a": 1.5}, {"b": "ç"}]}
+
+    def test_renders_empty_list(self):
+        assert b"".join(sut.iter_json_list("data", [])) == b'{"data":[]}'
+
+    def test_yields_chunks_of_items(self):
+        chunks = list(sut.iter_json_list("data", range(5), chunk_size=2))
+        assert len(chunks) == 3
+        assert json.loads(b"".join(chunks)) == {"data": [0, 1, 2, 3, 4]}
+
+    def test_is_lazy(self):
+        def items():
+            yield 1
+            raise RuntimeError()
+
+        chunks = sut.iter_json_list("data", items(), chunk_size=1)
+        assert next(chunks) == b'{"data":[1'
+
+
+class TestStreamingJsonResponse:
+    def test_computes_the_first_chunk(self):
+        def content():
+            yield b"{}"
+            raise RuntimeError()
+
+        resp = sut.streaming_json_response(content())
+        assert next(iter(resp.streaming_content)) == b"{}"
+
+    def test_raises_errors_of_the_first_chunk(self):
+        def content():
+            raise ValueError()
+            yield b"{}"
+
+        with pytest.raises(ValueError):
+            sut.streaming_json_response(content())
+
+    def test_empty(self):
+        assert list(sut.streaming_json_response([]).streaming_content) == []
+
+    def test_closing_closes_the_content(self):
+        closed = []
+
+        def content():
+            try:
+                yield b"{"
+                yield b"}"
+            finally:
+                closed.append(True)
+
+        sut.streaming_json_response(content()).close()
+        assert closed == [True]
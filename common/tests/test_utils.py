@@ -1,4 +1,5 @@
 from datetime import date
+from decimal import Decimal
 from unittest import TestCase
 
 import common.utils as sut
@@ -18,3 +19,23 @@ class TestDateRange(TestCase):
         result = sut.date_range(date(2020, 1, 1), date(2020, 1, 3))
         expected = [date(2020, 1, 1), date(2020, 1, 2), date(2020, 1, 3)]
         assert result == expected
+
+
+class TestMinorUnits(TestCase):
+    def test_to_minor_units(self):
+        assert sut.to_minor_units(Decimal("1")) == 100000
+        assert sut.to_minor_units(Decimal("-0.00001")) == -1
+        assert sut.to_minor_units(Decimal("123456789012.34567")) == 12345678901234567
+
+    def test_to_minor_units_of_the_largest_quantities(self):
+        assert sut.to_minor_units(Decimal("-92233720368547.75807")) == -(2 ** 63 - 1)
+        with self.assertRaises(OverflowError):
+            sut.to_minor_units(Decimal("92233720368547.75808"))
+
+    def test_to_minor_units_rounds_as_round_decimal(self):
+        assert sut.to_minor_units(Decimal("0.000014")) == 1
+        assert sut.to_minor_units(Decimal("0.000016")) == 2
+
+    def test_from_minor_units(self):
+        assert sut.from_minor_units(12345678901234567) == Decimal("123456789012.34567")
+        assert str(sut.from_minor_units(-100000)) == "-1.00000"
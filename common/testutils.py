@@ -1,18 +1,27 @@
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
 from decimal import Decimal
 from functools import partialmethod
 
 import attr
 import requests
 from django.core.cache import cache
-from rest_framework.test import APIClient, APITestCase
+from django.db import connections
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
 
 import common.models
 import exchangerates.models
+import featuretoggles.snapshot
 from accounts.management.commands.populate_accounts import (
     account_populator,
     account_type_populator,
 )
 from currencies.management.commands.populate_currencies import currency_populator
+from pacs.db.routers import REPORTS_DB_ALIAS
+from pacs.db.snapshots import refresh_snapshot
 
 
 class URLS:
@@ -49,6 +58,59 @@ class PacsTestCase(APITestCase):
         """Clear cache between tests"""
         super().tearDown()
         cache.clear()
+        featuretoggles.snapshot.store.invalidate()
+
+
+def get_response_json(resp):
+    """Parses the json of a response, streamed or not."""
+    content = b"".join(resp.streaming_content) if resp.streaming else resp.content
+    return json.loads(content)
+
+
+@contextmanager
+def reports_db(db_file):
+    """Uses `db_file` as the (read-only) reports db, as if it was configured
+    with PACS_REPORTS_DB_FILE."""
+    connections.databases[REPORTS_DB_ALIAS] = {
+        "ENGINE": "pacs.db.sqlite3",
+        "NAME": db_file,
+        "READ_ONLY": True,
+    }
+    try:
+        yield
+    finally:
+        if hasattr(connections._connections, REPORTS_DB_ALIAS):
+            connections[REPORTS_DB_ALIAS].close()
+            del connections[REPORTS_DB_ALIAS]
+        del connections.databases[REPORTS_DB_ALIAS]
+
+
+class ReportsReplicaTestCase(APITransactionTestCase):
+    """Runs with a local file copy of the test db as the reports db. Data is
+    committed (so it can be copied), and only reaches the replica when
+    `refresh_replica` is called."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient(HTTP_AUTHORIZATION="TOKEN valid_token")
+        account_type_populator()
+        account_populator()
+        currency_populator()
+        self.replica_dir = tempfile.mkdtemp()
+        self.replica_file = os.path.join(self.replica_dir, "reports.sqlite3")
+        self.refresh_replica()
+        self._reports_db = reports_db(self.replica_file)
+        self._reports_db.__enter__()
+
+    def refresh_replica(self):
+        refresh_snapshot(self.replica_file)
+
+    def tearDown(self):
+        self._reports_db.__exit__(None, None, None)
+        shutil.rmtree(self.replica_dir)
+        super().tearDown()
+        cache.clear()
+        featuretoggles.snapshot.store.invalidate()
 
 
 @attr.s()
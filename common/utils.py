@@ -3,7 +3,12 @@ from decimal import Decimal
 
 from pytz import utc
 
-from .models import N_DECIMAL_COMPARISON, N_DECIMAL_PLACES
+from .models import (
+    MAX_MINOR_UNITS,
+    MINOR_UNITS_PER_UNIT,
+    N_DECIMAL_COMPARISON,
+    N_DECIMAL_PLACES,
+)
 
 DATE_FORMAT = "%Y-%m-%d"
 
@@ -32,6 +37,21 @@ def round_decimal(x: Decimal) -> Decimal:
     return round(x, N_DECIMAL_PLACES)  # type: ignore
 
 
+def to_minor_units(x: Decimal) -> int:
+    """Returns a quantity as an integer number of minor units (see
+    MINOR_UNITS_PER_UNIT), rounded as `round_decimal`. Raises OverflowError
+    if it does not fit in 64 bits."""
+    out = int(round_decimal(Decimal(x)) * MINOR_UNITS_PER_UNIT)
+    if abs(out) > MAX_MINOR_UNITS:
+        raise OverflowError(f"{x} has too many digits to be stored in minor units")
+    return out
+
+
+def from_minor_units(x: int) -> Decimal:
+    """The inverse of `to_minor_units`."""
+    return Decimal(x).scaleb(-N_DECIMAL_PLACES)
+
+
 def date_range(init, end):
     assert end >= init
     return [init + timedelta(days=x) for x in range((end - init).days + 1)]
@@ -100,7 +100,7 @@ class CurrencyPricePortifolioConverter:
 
     def __init__(self, price_portifolio_list: List[CurrencyPricePortifolio]):
         self._dates = set()
-        self._date_to_currency_prices = defaultdict(lambda: {})
+        self._date_to_currency_prices = defaultdict(dict)
         for price_portifolio in price_portifolio_list:
             currency = price_portifolio.currency
             for date_and_price in price_portifolio.prices:
@@ -116,3 +116,15 @@ class CurrencyPricePortifolioConverter:
             raise UnkownDateForCurrencyConversion()
         currency_code_to_value = self._date_to_currency_prices[date]
         return CurrencyConverter(currency_code_to_value).convert(money, currency)
+
+
+@attr.s(frozen=True)
+class CurrencyConversionFn:
+    """A (money, date) -> money function converting to `convert_to`. Unlike a
+    lambda, it can be pickled (e.g. sent to a report worker process)."""
+
+    converter: CurrencyPricePortifolioConverter = attr.ib()
+    convert_to: Currency = attr.ib()
+
+    def __call__(self, money: Money, date: Date) -> Money:
+        return self.converter.convert(money, self.convert_to, date)
@@ -1,7 +1,6 @@
 from django.core.management import BaseCommand
 
 from common.management import TablePopulator
-from common.models import full_clean_and_save
 from currencies.models import Currency
 
 CURRENCIES_DATA = [
@@ -11,9 +10,21 @@ CURRENCIES_DATA = [
 ]
 
 
+def _populate_currencies(data):
+    from movements.models import LedgerVersion
+
+    currencies = [Currency(**x) for x in data]
+    for currency in currencies:
+        currency.full_clean()
+    currencies = Currency.objects.bulk_create(currencies)
+    # Bulk creates send no post_save signals
+    LedgerVersion.objects.bump()
+    return currencies
+
+
 currency_populator = TablePopulator(
-    lambda x: full_clean_and_save(Currency(**x)),
-    lambda x: Currency.objects.filter(name=x["name"]).exists(),
+    _populate_currencies,
+    lambda: set(Currency.objects.values_list("name", flat=True)),
     CURRENCIES_DATA,
 )
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import itertools
 from copy import copy
 from decimal import Decimal
 from typing import TYPE_CHECKING, List, Set
@@ -12,13 +13,24 @@ if TYPE_CHECKING:
     from currencies.models import Currency
 
 
-@attr.s(frozen=True, eq=False)
+@attr.s(frozen=True, eq=False, slots=True)
 class Money:
     """A combination of a quantity and a currency."""
 
     quantity: Decimal = attr.ib(converter=Decimal)
     currency: Currency = attr.ib()
 
+    @classmethod
+    def trusted(cls, quantity: Decimal, currency: Currency) -> Money:
+        """Returns a new Money without converting `quantity`, which must
+        already be a Decimal (e.g. read from the db or summed from Moneys).
+        Reports and journals build Moneys in loops, where the attrs
+        constructor takes about twice as long."""
+        money = object.__new__(cls)
+        object.__setattr__(money, "quantity", quantity)
+        object.__setattr__(money, "currency", currency)
+        return money
+
     def __eq__(self, other) -> bool:
         if not isinstance(other, Money):
             return False
@@ -27,9 +39,11 @@ class Money:
     def __add__(self, other):
         if not isinstance(other, Money):
             raise TypeError("Can only sum Money")
-        if not self.currency == other.currency:
+        # Moneys summed in loops usually share the currency instance, and the
+        # comparison of models is comparatively slow
+        if self.currency is not other.currency and not self.currency == other.currency:
             raise ValueError("Can not sum Moneys from different currencies.")
-        return attr.evolve(self, quantity=self.quantity + other.quantity)
+        return Money.trusted(self.quantity + other.quantity, self.currency)
 
 
 @attr.s()
@@ -67,7 +81,7 @@ class MoneyAggregator:
         return Balance(self.get_moneys())
 
 
-@attr.s(frozen=True, eq=False)
+@attr.s(frozen=True, eq=False, slots=True)
 class Balance:
     """An aggregation of Money from different currencies"""
 
@@ -78,17 +92,20 @@ class Balance:
         quantity = Decimal("0")
         for m in (m for m in self._moneys if m.currency == currency):
             quantity += m.quantity
-        return Money(quantity, currency)
+        return Money.trusted(quantity, currency)
 
     def add_money(self, money: Money) -> Balance:
         """Returns a new balance with money added."""
         return attr.evolve(self, moneys=[*self._moneys, money])
 
     def add_moneys(self, moneys: List[Money]) -> Balance:
-        out = self
-        for money in moneys:
-            out = out.add_money(money)
-        return out
+        """Returns a new balance with moneys added, with one money per
+        currency. A balance summed many times (like the ones of a journal)
+        does not keep all the moneys it was summed from."""
+        money_agg = MoneyAggregator()
+        for money in itertools.chain(self._moneys, moneys):
+            money_agg.append_money(money)
+        return money_agg.as_balance()
 
     def get_currencies(self) -> Set[Currency]:
         """Returns a set with all the currencies for this Balance"""
@@ -30,6 +30,23 @@ class TestMoney(MoneyTestCase):
         with self.assertRaises(ValueError):
             moneys[0] + moneys[1]
 
+    def test_sum_is_exact(self):
+        currency = Mock()
+        money = Money("0.1", currency) + Money("0.2", currency)
+        assert money.quantity == Decimal("0.3")
+        assert isinstance(money, Money)
+
+    def test_trusted(self):
+        currency, quantity = Mock(), Decimal("10.24")
+        money = Money.trusted(quantity, currency)
+        assert money == Money(quantity, currency)
+        assert money.quantity is quantity
+        assert money.currency is currency
+
+    def test_is_slotted(self):
+        assert not hasattr(Money("1", Mock()), "__dict__")
+        assert not hasattr(Money.trusted(Decimal("1"), Mock()), "__dict__")
+
 
 class TestMoneyAggregator:
     def test_empty(self):
@@ -99,6 +116,15 @@ class TestBalance(MoneyTestCase):
         balance = Balance([moneys[0]])
         assert balance.add_money(moneys[1]) == Balance(moneys)
 
+    def test_add_keeps_one_money_per_currency(self):
+        currencies = [Mock(), Mock()]
+        balance = Balance([])
+        for i in range(10):
+            balance += Balance([Money(i, currencies[0]), Money(-i, currencies[1])])
+        assert len(balance._moneys) == 2
+        assert balance.get_for_currency(currencies[0]) == Money(45, currencies[0])
+        assert balance.get_for_currency(currencies[1]) == Money(-45, currencies[1])
+
     def test_get_currencies_base(self):
         currencies = [Mock(), Mock()]
         balance = Balance([Money("11", currencies[0]), Money("7", currencies[1])])
@@ -35,6 +35,16 @@ class TestCurrencyView(CurrencyViewTestCase):
         resp = self.client.get(f"/currencies/{cur.pk}/").json()
         assert CurrencySerializer(cur).data == resp
 
+    def test_get_currencies_not_modified(self):
+        CurrencyTestFactory.create_batch(3)
+        etag = self.client.get("/currencies/")["ETag"]
+        resp = self.client.get("/currencies/", HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 304
+        CurrencyTestFactory()
+        resp = self.client.get("/currencies/", HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 200
+        assert len(resp.json()) == 4
+
     def test_post_single_currency(self):
         data = {"name": "Yen"}
         resp = self.client.post("/currencies/", data).json()
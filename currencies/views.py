@@ -1,5 +1,8 @@
 from rest_framework.viewsets import ModelViewSet
 
+from common.etags import version_etag
+from movements.models import get_ledger_version
+
 from .models import Currency
 from .serializers import CurrencySerializer
 
@@ -7,3 +10,11 @@ from .serializers import CurrencySerializer
 class CurrencyViewSet(ModelViewSet):
     queryset = Currency.objects.all()
     serializer_class = CurrencySerializer
+
+    @version_etag(get_ledger_version)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @version_etag(get_ledger_version)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
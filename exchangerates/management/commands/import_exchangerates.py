@@ -3,6 +3,7 @@ import csv
 
 from django.core.management import BaseCommand
 
+import exchangerates.rate_store as rate_store
 import exchangerates.services as services
 
 CSV_DELIMITER = ","
@@ -32,3 +33,4 @@ class Command(BaseCommand):
         for row in csv.DictReader(options["file"], delimiter=CSV_DELIMITER):
             exchangerate_import_input = services.ExchangeRateImportInput.from_dict(row)
             services.import_exchangerate(exchangerate_import_input)
+        rate_store.refresh_rate_store()
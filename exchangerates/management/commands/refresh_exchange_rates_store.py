@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from exchangerates.rate_store import write_rate_store
+
+
+class Command(BaseCommand):
+    help = "Rewrites the binary copy of the exchange rates (PACS_EXCHANGE_RATES_STORE_FILE)"
+
+    def handle(self, *args, **kwargs):
+        path = settings.EXCHANGE_RATES_STORE_FILE
+        if not path:
+            raise CommandError(
+                "No exchange rates store configured (PACS_EXCHANGE_RATES_STORE_FILE)"
+            )
+        write_rate_store(path)
+        self.stdout.write(f"Wrote {path}")
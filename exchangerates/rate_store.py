@@ -0,0 +1,178 @@
+"""
+A compact binary copy of the exchange rates, `mmap`ed read-only by every
+process that serves them (e.g. each gunicorn worker). They all share the one
+copy in the page cache, read it without copying it and need no warm up.
+
+It is used by `services.fetch_exchange_rates` if
+`settings.EXCHANGE_RATES_STORE_FILE` is set, and rewritten after exchange rates
+are imported, at startup if it does not match the db (see `pacs.startup`) or by
+the `refresh_exchange_rates_store` command. The new file is written aside and
+renamed over the old one, so readers never see a partial file, and each process
+opens the new one on its next lookup. Without the file, rates are read from the
+db.
+
+The file has a header, an entry per currency (its code, and where its arrays
+are and their length) and then the arrays of each currency: its dates (int64
+ordinals, sorted) and its values (float64). Numbers are in the native byte
+order, as the file is only read on the machine that writes it.
+
+Values are floats because `fetch_exchange_rates` serves the prices as floats
+anyway, so its output is the same with or without the store. The digits of the
+db prices beyond the precision of a float64 (15 to 17 significant digits) are
+lost, so the store is not meant for exact arithmetic.
+"""
+import array
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from datetime import date
+from functools import partial
+from typing import Dict, Iterable, Optional, Tuple
+
+import attr
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.transaction import on_commit
+
+import exchangerates.models as models
+
+MAGIC = b"PACSXR01"
+# The magic and the number of currencies
+_HEADER = struct.Struct("=8sQ")
+_MAX_CODE_SIZE = 56
+# The currency code, the offset of its dates (its values follow them) and their number
+_ENTRY = struct.Struct(f"={_MAX_CODE_SIZE}sQQ")
+# Bytes per date and per value
+_ITEM_SIZE = 8
+
+
+def write_rate_store(path: str) -> None:
+    """Writes the exchange rates of the db to the store at `path`."""
+    series: Dict[str, Tuple[array.array, array.array]] = {}
+    rows = models.ExchangeRate.objects.order_by("currency_code", "date")
+    for code, date_, value in rows.values_list("currency_code", "date", "value").iterator():
+        dates, values = series.setdefault(code, (array.array("q"), array.array("d")))
+        dates.append(date_.toordinal())
+        values.append(float(value))
+
+    chunks = [_HEADER.pack(MAGIC, len(series))]
+    arrays = []
+    offset = _HEADER.size + _ENTRY.size * len(series)
+    for code, (dates, values) in series.items():
+        encoded_code = code.encode()
+        if len(encoded_code) > _MAX_CODE_SIZE:
+            raise ValueError(f"Currency code too long for the exchange rates store: {code}")
+        chunks.append(_ENTRY.pack(encoded_code, offset, len(dates)))
+        arrays += [dates.tobytes(), values.tobytes()]
+        offset += 2 * _ITEM_SIZE * len(dates)
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.writelines(chunks + arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@attr.s(frozen=True)
+class RateStore:
+    """The exchange rates of a store file, read from its mmap."""
+
+    _buffer: mmap.mmap = attr.ib()
+    # {currency_code: (dates, values)}, as memoryviews of the mmap
+    _series: Dict[str, Tuple[memoryview, memoryview]] = attr.ib()
+
+    @classmethod
+    def open(cls, path: str) -> "RateStore":
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_currencies = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"Not an exchange rates store: {path}")
+        view = memoryview(buffer)
+        series = {}
+        for i in range(n_currencies):
+            code, offset, length = _ENTRY.unpack_from(buffer, _HEADER.size + i * _ENTRY.size)
+            values_offset = offset + _ITEM_SIZE * length
+            dates = view[offset:values_offset].cast("q")
+            values = view[values_offset : values_offset + _ITEM_SIZE * length].cast("d")
+            series[code.rstrip(b"\0").decode()] = (dates, values)
+        return cls(buffer, series)
+
+    def get_prices(
+        self, start_at: date, end_at: date, currency_codes: Iterable[str]
+    ) -> Dict[str, Dict[date, float]]:
+        """Returns the exchange rates of each currency from `start_at` to
+        `end_at`, as {currency_code: {date: value}}."""
+        out = {}
+        for code in currency_codes:
+            dates, values = self._series.get(code, ((), ()))
+            start = bisect.bisect_left(dates, start_at.toordinal())
+            end = bisect.bisect_right(dates, end_at.toordinal())
+            out[code] = {date.fromordinal(dates[i]): values[i] for i in range(start, end)}
+        return out
+
+    def get_summary(self) -> Dict[str, Tuple[int, date]]:
+        """Returns the number of exchange rates and the last date of each
+        currency, as {currency_code: (count, last_date)}."""
+        return {
+            code: (len(dates), date.fromordinal(dates[-1]))
+            for code, (dates, _) in self._series.items()
+        }
+
+
+def get_db_summary() -> Dict[str, Tuple[int, date]]:
+    """Like `RateStore.get_summary`, for the exchange rates of the db."""
+    rows = models.ExchangeRate.objects.values("currency_code").annotate(
+        count=Count("id"), last_date=Max("date")
+    )
+    return {x["currency_code"]: (x["count"], x["last_date"]) for x in rows}
+
+
+def is_rate_store_current(path: str) -> bool:
+    """Whether the store at `path` exists and has as many exchange rates, up
+    to the same dates, as the db. It does not compare the values, which only
+    change outside of imports (see `refresh_exchange_rates_store`)."""
+    try:
+        store = RateStore.open(path)
+    except (FileNotFoundError, ValueError, struct.error):
+        return False
+    return store.get_summary() == get_db_summary()
+
+
+# The open store of each file, with the (inode, mtime) of the file when opened
+_stores: Dict[str, Tuple[Tuple[int, int], RateStore]] = {}
+_lock = threading.Lock()
+
+
+def get_rate_store() -> Optional[RateStore]:
+    """Returns the store at `settings.EXCHANGE_RATES_STORE_FILE`, opening it
+    again if it was rewritten. None if there is no store."""
+    path = settings.EXCHANGE_RATES_STORE_FILE
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        opened = _stores.get(path)
+        if opened is None or opened[0] != key:
+            opened = _stores[path] = (key, RateStore.open(path))
+        return opened[1]
+
+
+def refresh_rate_store() -> None:
+    """Rewrites the store, if there is one, once the current db transaction
+    commits."""
+    path = settings.EXCHANGE_RATES_STORE_FILE
+    if path:
+        on_commit(partial(write_rate_store, path))
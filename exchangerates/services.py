@@ -9,20 +9,17 @@ import django.db.utils
 import common.utils as utils
 import exchangerates.exceptions as exceptions
 import exchangerates.models as models
+import exchangerates.rate_store as rate_store
 
 A_DAY = datetime.timedelta(days=1)
 
 
 def fetch_exchange_rates(start_at, end_at, currency_codes):
-    exchange_rates = models.ExchangeRate.objects.filter(
-        currency_code__in=currency_codes,
-        date__lte=end_at,
-        date__gte=start_at,
-    ).order_by("currency_code", "date")
-    prices = collections.defaultdict(dict)
-
-    for exchange_rate in exchange_rates:
-        prices[exchange_rate.currency_code][exchange_rate.date] = exchange_rate.value
+    store = rate_store.get_rate_store()
+    if store is None:
+        prices = _query_prices(start_at, end_at, currency_codes)
+    else:
+        prices = store.get_prices(start_at, end_at, currency_codes)
 
     for date in utils.date_range(start_at, end_at):
         for currency_code in currency_codes:
@@ -48,6 +45,20 @@ def fetch_exchange_rates(start_at, end_at, currency_codes):
     ]
 
 
+def _query_prices(start_at, end_at, currency_codes):
+    exchange_rates = models.ExchangeRate.objects.filter(
+        currency_code__in=currency_codes,
+        date__lte=end_at,
+        date__gte=start_at,
+    ).order_by("currency_code", "date")
+    prices = collections.defaultdict(dict)
+
+    for exchange_rate in exchange_rates:
+        prices[exchange_rate.currency_code][exchange_rate.date] = exchange_rate.value
+
+    return prices
+
+
 @attr.s()
 class ExchangeRateImportInput:
     currency_code = attr.ib()
@@ -68,6 +79,7 @@ def import_exchangerates(exchangerate_import_inputs, options=None):
     for exchangerate_import_input in exchangerate_import_inputs:
         with _handle_duplicated_exchangerates(options, exchangerate_import_input):
             import_exchangerate(exchangerate_import_input)
+    rate_store.refresh_rate_store()
 
 
 def import_exchangerate(exchangerate_import_input):
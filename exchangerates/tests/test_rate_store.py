@@ -0,0 +1,184 @@
+import datetime
+import os
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.core.management import CommandError, call_command
+
+import exchangerates.exceptions as exceptions
+import exchangerates.models as models
+import exchangerates.rate_store as sut
+import exchangerates.services as services
+from common.testutils import PacsTestCase
+
+
+def create_test_data():
+    for (c, d, v) in (
+        ("EUR", datetime.date(2020, 1, 1), Decimal("0.8")),
+        ("EUR", datetime.date(2020, 1, 2), Decimal("0.85")),
+        ("EUR", datetime.date(2020, 1, 5), Decimal("0.90")),
+        ("BRL", datetime.date(2020, 1, 1), Decimal("4")),
+        ("BRL", datetime.date(2020, 1, 6), Decimal("4.25")),
+    ):
+        models.ExchangeRate.objects.create(currency_code=c, date=d, value=v)
+
+
+class RateStoreTestCase(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "exchangerates.bin")
+        self.settings_override = self.settings(EXCHANGE_RATES_STORE_FILE=self.path)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        sut._stores.clear()
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+
+class TestRateStore(RateStoreTestCase):
+    def test_get_prices(self):
+        create_test_data()
+        sut.write_rate_store(self.path)
+        store = sut.RateStore.open(self.path)
+        prices = store.get_prices(
+            datetime.date(2020, 1, 2), datetime.date(2020, 1, 5), ["EUR", "USD"]
+        )
+        assert prices == {
+            "EUR": {datetime.date(2020, 1, 2): 0.85, datetime.date(2020, 1, 5): 0.9},
+            "USD": {},
+        }
+
+    def test_values_are_floats(self):
+        value = Decimal("1234567.12345")
+        day = datetime.date(2020, 1, 1)
+        models.ExchangeRate.objects.create(currency_code="EUR", date=day, value=value)
+        sut.write_rate_store(self.path)
+        price = sut.RateStore.open(self.path).get_prices(day, day, ["EUR"])["EUR"][day]
+        # Not exact, but the same price `fetch_exchange_rates` serves without the store
+        assert price == float(value)
+        assert Decimal(price) != value
+        with self.settings(EXCHANGE_RATES_STORE_FILE=""):
+            served = services.fetch_exchange_rates(day, day, ["EUR"])
+        assert served[0]["prices"] == [{"date": "2020-01-01", "price": price}]
+
+    def test_empty(self):
+        sut.write_rate_store(self.path)
+        store = sut.RateStore.open(self.path)
+        assert store.get_prices(datetime.date(2020, 1, 1), datetime.date(2020, 1, 1), ["EUR"]) == {
+            "EUR": {}
+        }
+
+    def test_open_other_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"0" * 64)
+        with pytest.raises(ValueError):
+            sut.RateStore.open(self.path)
+
+    def test_write_leaves_no_temporary_files(self):
+        sut.write_rate_store(self.path)
+        sut.write_rate_store(self.path)
+        assert os.listdir(self.tmp_dir.name) == ["exchangerates.bin"]
+
+
+class TestIsRateStoreCurrent(RateStoreTestCase):
+    def test_not_written(self):
+        assert sut.is_rate_store_current(self.path) is False
+
+    def test_same_summary_as_the_db(self):
+        create_test_data()
+        sut.write_rate_store(self.path)
+        assert sut.RateStore.open(self.path).get_summary() == {
+            "BRL": (2, datetime.date(2020, 1, 6)),
+            "EUR": (3, datetime.date(2020, 1, 5)),
+        }
+        assert sut.is_rate_store_current(self.path) is True
+
+    def test_not_current_once_the_db_changes(self):
+        create_test_data()
+        sut.write_rate_store(self.path)
+        models.ExchangeRate.objects.filter(date=datetime.date(2020, 1, 2)).delete()
+        models.ExchangeRate.objects.create(
+            currency_code="EUR", date=datetime.date(2020, 1, 6), value=Decimal("1")
+        )
+        assert sut.is_rate_store_current(self.path) is False
+
+    def test_not_current_if_other_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"0" * 64)
+        assert sut.is_rate_store_current(self.path) is False
+
+
+class TestGetRateStore(RateStoreTestCase):
+    def test_none_if_not_configured(self):
+        with self.settings(EXCHANGE_RATES_STORE_FILE=""):
+            assert sut.get_rate_store() is None
+
+    def test_none_if_not_written(self):
+        assert sut.get_rate_store() is None
+
+    def test_opens_again_once_rewritten(self):
+        sut.write_rate_store(self.path)
+        store = sut.get_rate_store()
+        assert sut.get_rate_store() is store
+        create_test_data()
+        sut.write_rate_store(self.path)
+        new_store = sut.get_rate_store()
+        assert new_store is not store
+        assert new_store.get_prices(datetime.date(2020, 1, 1), datetime.date(2020, 1, 1), ["BRL"])
+
+
+class TestFetchExchangeRatesWithRateStore(RateStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        create_test_data()
+
+    def fetch(self, start_at, end_at):
+        return services.fetch_exchange_rates(start_at, end_at, currency_codes=["EUR", "BRL"])
+
+    def test_same_as_from_the_db(self):
+        start_at, end_at = datetime.date(2020, 1, 1), datetime.date(2020, 1, 8)
+        exp = self.fetch(start_at, end_at)
+        sut.write_rate_store(self.path)
+        with self.assertNumQueries(0):
+            assert self.fetch(start_at, end_at) == exp
+
+    def test_throws_when_no_info_for_start_at(self):
+        sut.write_rate_store(self.path)
+        with pytest.raises(exceptions.NotEnoughData):
+            self.fetch(datetime.date(2019, 12, 31), datetime.date(2020, 1, 1))
+
+
+@patch.object(sut, "on_commit", lambda fn: fn())
+class TestRefreshRateStore(RateStoreTestCase):
+    def test_after_imports(self):
+        inputs = [services.ExchangeRateImportInput("EUR", "2020-01-01", 1.1)]
+        services.import_exchangerates(inputs)
+        store = sut.get_rate_store()
+        date_ = datetime.date(2020, 1, 1)
+        assert store.get_prices(date_, date_, ["EUR"]) == {"EUR": {date_: 1.1}}
+
+    def test_not_configured(self):
+        with self.settings(EXCHANGE_RATES_STORE_FILE=""):
+            services.import_exchangerates([])
+        assert not os.path.exists(self.path)
+
+
+class TestRefreshExchangeRatesStoreCommand(RateStoreTestCase):
+    def test_writes_the_store(self):
+        models.ExchangeRate.objects.create(
+            currency_code="EUR", date=datetime.date(2020, 1, 1), value=Decimal("1.1")
+        )
+        call_command("refresh_exchange_rates_store")
+        assert sut.get_rate_store().get_prices(
+            datetime.date(2020, 1, 1), datetime.date(2020, 1, 1), ["EUR"]
+        ) == {"EUR": {datetime.date(2020, 1, 1): 1.1}}
+
+    def test_not_configured(self):
+        with self.settings(EXCHANGE_RATES_STORE_FILE=""):
+            with pytest.raises(CommandError):
+                call_command("refresh_exchange_rates_store")
@@ -1,5 +1,6 @@
-import featuretoggles.models as models
 import featuretoggles.services as services
+import featuretoggles.snapshot as snapshot
+from metrics.timings import timer
 
 
 class FeatureToggleMiddleware:
@@ -7,7 +8,11 @@ class FeatureToggleMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        default_toggles = models.FeatureToggle.objects.read_feature_toggles()
-        featureToggleService = services.FeatureToggleService(default_toggles, request)
-        services.set_instance(featureToggleService)
-        return self.get_response(request)
+        with timer("featuretoggles"):
+            default_toggles = snapshot.get_snapshot().toggles
+            featureToggleService = services.FeatureToggleService(default_toggles, request)
+            token = services.set_instance(featureToggleService)
+        try:
+            return self.get_response(request)
+        finally:
+            services.reset_instance(token)
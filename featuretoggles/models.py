@@ -1,5 +1,7 @@
 import django.db.models as models
 from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 import featuretoggles.utils
 
@@ -22,3 +24,8 @@ class FeatureToggle(models.Model):
     is_active = models.BooleanField(blank=False, null=False)
 
     objects = FeatureToggleQuerySet.as_manager()
+
+
+@receiver([post_save, post_delete], sender=FeatureToggle)
+def _clear_cache_on_write(**kwargs):
+    cache.delete(CACHE_KEY)
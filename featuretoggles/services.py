@@ -1,18 +1,29 @@
+import contextvars
 import copy
+import functools
+from types import MappingProxyType
 
 from django.conf import settings
 
-import featuretoggles.models
 import featuretoggles.utils
 
 
+@functools.lru_cache(maxsize=8)
+def _parse_settings_toggles(settings_toggles_str):
+    return MappingProxyType(featuretoggles.utils.parse_toggles(settings_toggles_str))
+
+
+def get_settings_toggles():
+    """Returns the parsed `settings.FEATURE_TOGGLES`, parsing it only once."""
+    return _parse_settings_toggles(settings.FEATURE_TOGGLES)
+
+
 class FeatureToggleService:
     def __init__(self, default_toggles, request):
         request_toggles_str = request.META.get(settings.FEATURE_TOGGLE_REQUEST_HEADER, "")
-        settings_toggles_str = settings.FEATURE_TOGGLES
         self._features = {
             **default_toggles,
-            **featuretoggles.utils.parse_toggles(settings_toggles_str),
+            **get_settings_toggles(),
             **featuretoggles.utils.parse_toggles(request_toggles_str),
         }
 
@@ -23,15 +34,21 @@ class FeatureToggleService:
         return copy.deepcopy(self._features)
 
 
-instance = None
+# The service for the current request. A ContextVar so that concurrent
+# requests (threads or tasks) never see each other's toggles.
+_instance = contextvars.ContextVar("featuretoggles_service", default=None)
 
 
 def set_instance(x):
-    global instance
-    instance = x
+    return _instance.set(x)
+
+
+def reset_instance(token):
+    _instance.reset(token)
 
 
 def get_instance():
+    instance = _instance.get()
     if instance is None:
         raise RuntimeError("FeatureToggleService was not properly initialized.")
     return instance
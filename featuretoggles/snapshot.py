@@ -0,0 +1,87 @@
+"""
+An in-process snapshot of the feature toggles stored in the db.
+
+The snapshot is shared by all requests (and threads) of a process, so reading
+it costs nothing. It is refreshed lazily: either because a FeatureToggle was
+written in this process (which bumps the store version) or because it is older
+than `REFRESH_INTERVAL`, so changes made by other processes are eventually seen.
+"""
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional
+
+import attr
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+import featuretoggles.models as models
+
+# Max number of seconds a snapshot is used before reloading it.
+REFRESH_INTERVAL = models.CACHE_TIMEOUT
+
+
+@attr.s(frozen=True)
+class FeatureToggleSnapshot:
+    """An immutable view of the db feature toggles at a given version."""
+
+    version: int = attr.ib()
+    toggles: Mapping[str, bool] = attr.ib(converter=MappingProxyType)
+    expires_at: float = attr.ib()
+
+
+class FeatureToggleSnapshotStore:
+    """Holds the current FeatureToggleSnapshot, reloading it when stale."""
+
+    def __init__(
+        self,
+        load_fn: Callable[[], Dict[str, bool]],
+        refresh_interval: float = REFRESH_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._load_fn = load_fn
+        self._refresh_interval = refresh_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[FeatureToggleSnapshot] = None
+
+    def _is_fresh(self, snapshot: Optional[FeatureToggleSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and self._clock() < snapshot.expires_at
+        )
+
+    def get(self) -> FeatureToggleSnapshot:
+        """Returns the current snapshot. Only touches the db (or cache) if
+        the snapshot is missing, outdated or expired."""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        with self._lock:
+            # Another thread may have reloaded it while we waited for the lock
+            if self._is_fresh(self._snapshot):
+                return self._snapshot
+            version = self._version
+            toggles = self._load_fn()
+            expires_at = self._clock() + self._refresh_interval
+            self._snapshot = FeatureToggleSnapshot(version, toggles, expires_at)
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        """Bumps the version, forcing the next `get` to reload."""
+        with self._lock:
+            self._version += 1
+
+
+store = FeatureToggleSnapshotStore(lambda: models.FeatureToggle.objects.read_feature_toggles())
+
+
+def get_snapshot() -> FeatureToggleSnapshot:
+    return store.get()
+
+
+@receiver([post_save, post_delete], sender=models.FeatureToggle)
+def _invalidate_on_write(**kwargs):
+    store.invalidate()
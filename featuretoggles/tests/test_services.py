@@ -32,3 +32,21 @@ class FeatureToggleServiceTest(TestCase):
         assert featureToggleService.is_active("bar") is True
         assert featureToggleService.is_active("baz") is None
         assert featureToggleService.is_active("zzz") is True
+
+    @override_settings(FEATURE_TOGGLES="foo")
+    def test_settings_toggles_are_parsed_once(self):
+        assert sut.get_settings_toggles() is sut.get_settings_toggles()
+        assert sut.get_settings_toggles() == {"foo": True}
+
+
+class InstanceTest(TestCase):
+    def test_raises_if_not_set(self):
+        with self.assertRaises(RuntimeError):
+            sut.get_instance()
+
+    def test_set_and_reset(self):
+        token = sut.set_instance(Mock())
+        assert sut.get_instance() is not None
+        sut.reset_instance(token)
+        with self.assertRaises(RuntimeError):
+            sut.get_instance()
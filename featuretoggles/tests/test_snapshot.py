@@ -0,0 +1,58 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+import featuretoggles.models as models
+import featuretoggles.snapshot as sut
+from common.testutils import PacsTestCase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class FeatureToggleSnapshotStoreTest(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.load_fn = Mock(side_effect=[{"foo": True}, {"foo": False}])
+        self.store = sut.FeatureToggleSnapshotStore(self.load_fn, 10, self.clock)
+
+    def test_loads_once(self):
+        one = self.store.get()
+        two = self.store.get()
+        assert one is two
+        assert one.toggles == {"foo": True}
+        assert self.load_fn.call_count == 1
+
+    def test_snapshot_is_read_only(self):
+        with self.assertRaises(TypeError):
+            self.store.get().toggles["foo"] = False
+
+    def test_reloads_after_invalidate(self):
+        one = self.store.get()
+        self.store.invalidate()
+        two = self.store.get()
+        assert two.version == one.version + 1
+        assert two.toggles == {"foo": False}
+
+    def test_reloads_after_refresh_interval(self):
+        self.store.get()
+        self.clock.now = 9
+        assert self.store.get().toggles == {"foo": True}
+        self.clock.now = 10
+        assert self.store.get().toggles == {"foo": False}
+
+
+class InvalidateOnWriteTest(PacsTestCase):
+    def test_writes_are_seen_immediately(self):
+        assert sut.get_snapshot().toggles == {}
+        toggle = models.FeatureToggle.objects.create(name="foo", is_active=True)
+        assert sut.get_snapshot().toggles == {"foo": True}
+        toggle.is_active = False
+        toggle.save()
+        assert sut.get_snapshot().toggles == {"foo": False}
+        toggle.delete()
+        assert sut.get_snapshot().toggles == {}
@@ -0,0 +1,72 @@
+"""
+In-process histograms of the request timings, by view.
+
+Each process keeps its own histograms since it started; with several workers,
+each one reports its own requests.
+"""
+import bisect
+import threading
+from typing import Dict, List, Tuple
+
+import attr
+
+# Upper bounds of the buckets, in milliseconds. The last bucket is unbounded.
+BUCKETS_MS: Tuple[float, ...] = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Upper bounds of the buckets for the number of queries per request.
+BUCKETS_QUERIES: Tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+@attr.s(slots=True)
+class Histogram:
+    buckets: Tuple[float, ...] = attr.ib()
+    counts: List[int] = attr.ib()
+    count: int = attr.ib(default=0)
+    sum: float = attr.ib(default=0.0)
+
+    @classmethod
+    def new(cls, buckets: Tuple[float, ...]) -> "Histogram":
+        return cls(buckets, [0] * (len(buckets) + 1))
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self) -> Dict:
+        les = [*(str(x) for x in self.buckets), "+Inf"]
+        return {"count": self.count, "sum": self.sum, "buckets": dict(zip(les, self.counts))}
+
+
+class MetricsRegistry:
+    """Histograms of the timings (in ms) and query counts of each view."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, Histogram]] = {}
+
+    def observe(self, view: str, durations: Dict[str, float], queries: int) -> None:
+        """Records the timings of a request. `durations` is in seconds."""
+        with self._lock:
+            histograms = self._histograms.get(view)
+            if histograms is None:
+                histograms = self._histograms[view] = {"queries": Histogram.new(BUCKETS_QUERIES)}
+            histograms["queries"].observe(queries)
+            for name, duration in durations.items():
+                histogram = histograms.get(name)
+                if histogram is None:
+                    histogram = histograms[name] = Histogram.new(BUCKETS_MS)
+                histogram.observe(duration * 1000)
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                view: {name: x.as_dict() for name, x in histograms.items()}
+                for view, histograms in self._histograms.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms = {}
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,92 @@
+import time
+from typing import Callable, Iterable, Iterator
+
+import attr
+
+from metrics.histograms import registry
+from metrics.timings import RequestTimings, collect_timings, get_current
+
+
+def format_server_timing(timings: RequestTimings) -> str:
+    """Formats the timings as the value of a `Server-Timing` header."""
+    out = []
+    for name, duration in timings.durations.items():
+        metric = f"{name};dur={duration * 1000:.2f}"
+        if name == "db":
+            metric += f';desc="{timings.queries} queries"'
+        out.append(metric)
+    return ", ".join(out)
+
+
+def get_view_name(request) -> str:
+    resolver_match = getattr(request, "resolver_match", None)
+    route = resolver_match.route if resolver_match is not None else "unresolved"
+    return f"{request.method} {route}"
+
+
+class InstrumentationMiddleware:
+    """Times every request, adding a `Server-Timing` header to the response and
+    recording the timings in `metrics.histograms.registry`. Should be the
+    first middleware, so it also times the other ones. Queries are timed by
+    the db backend (see `pacs.db.sqlite3.base`)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with collect_timings() as timings:
+            response = self.get_response(request)
+
+        def observe():
+            timings.durations["total"] = time.perf_counter() - start
+            registry.observe(get_view_name(request), timings.durations, timings.queries)
+
+        if response.streaming:
+            # The content is computed while it is sent, after we return. The
+            # header only has the timings until then, the histograms all of them.
+            timings.durations["total"] = time.perf_counter() - start
+            response["Server-Timing"] = format_server_timing(timings)
+            response.streaming_content = _TimedContent(response.streaming_content, timings, observe)
+        else:
+            observe()
+            response["Server-Timing"] = format_server_timing(timings)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered (serialized)
+        timings = get_current()
+        if timings is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda _: timings.add("render", time.perf_counter() - start)
+            )
+        return response
+
+
+@attr.s
+class _TimedContent:
+    """Iterates `content` collecting its timings into `timings`, and calls
+    `on_end` once it is exhausted or closed (as closing the response does).
+    Like `pacs.db.routers.iter_in_reports_db`, the timings are only collected
+    while computing each chunk, not while it is sent."""
+
+    content: Iterable[bytes] = attr.ib()
+    timings: RequestTimings = attr.ib()
+    on_end: Callable[[], None] = attr.ib()
+    _ended: bool = attr.ib(default=False, init=False)
+
+    def __iter__(self) -> Iterator[bytes]:
+        content = iter(self.content)
+        while True:
+            with collect_timings(self.timings):
+                chunk = next(content, None)
+            if chunk is None:
+                break
+            yield chunk
+        self.close()
+
+    def close(self) -> None:
+        if not self._ended:
+            self._ended = True
+            self.on_end()
@@ -0,0 +1,34 @@
+import metrics.histograms as sut
+
+
+class TestHistogram:
+    def test_observe(self):
+        histogram = sut.Histogram.new((1, 10))
+        for x in (0.5, 1, 5, 100):
+            histogram.observe(x)
+        assert histogram.as_dict() == {
+            "count": 4,
+            "sum": 106.5,
+            "buckets": {"1": 2, "10": 1, "+Inf": 1},
+        }
+
+
+class TestMetricsRegistry:
+    def test_observe(self):
+        registry = sut.MetricsRegistry()
+        registry.observe("GET foo", {"db": 0.003, "total": 0.02}, 3)
+        registry.observe("GET foo", {"total": 0.2}, 0)
+        registry.observe("POST bar", {"total": 0.001}, 1)
+        data = registry.as_dict()
+        assert set(data) == {"GET foo", "POST bar"}
+        assert set(data["GET foo"]) == {"queries", "db", "total"}
+        assert data["GET foo"]["total"]["count"] == 2
+        assert data["GET foo"]["total"]["buckets"]["25"] == 1
+        assert data["GET foo"]["total"]["buckets"]["250"] == 1
+        assert data["GET foo"]["queries"]["sum"] == 3
+
+    def test_reset(self):
+        registry = sut.MetricsRegistry()
+        registry.observe("GET foo", {"total": 0.02}, 3)
+        registry.reset()
+        assert registry.as_dict() == {}
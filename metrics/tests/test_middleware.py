@@ -0,0 +1,92 @@
+from unittest.mock import Mock
+
+from django.http import StreamingHttpResponse
+from rest_framework.test import APIClient
+
+import metrics.middleware as sut
+from common.testutils import PacsTestCase
+from currencies.models import Currency
+from metrics.histograms import registry
+from metrics.timings import RequestTimings
+
+
+class TestFormatServerTiming:
+    def test_base(self):
+        timings = RequestTimings({"db": 0.0012, "total": 0.01}, 3)
+        assert sut.format_server_timing(timings) == 'db;dur=1.20;desc="3 queries", total;dur=10.00'
+
+
+class TestGetViewName:
+    def test_base(self):
+        request = Mock(method="GET", resolver_match=Mock(route="^foo/$"))
+        assert sut.get_view_name(request) == "GET ^foo/$"
+
+    def test_unresolved(self):
+        request = Mock(method="GET", resolver_match=None)
+        assert sut.get_view_name(request) == "GET unresolved"
+
+
+class TestInstrumentationMiddleware(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_currencies()
+        registry.reset()
+
+    def test_adds_server_timing_header(self):
+        resp = self.client.get("/currencies/")
+        assert resp.status_code == 200
+        names = [x.split(";")[0] for x in resp["Server-Timing"].split(", ")]
+        assert set(names) == {"auth", "featuretoggles", "db", "render", "total"}
+
+    def test_records_histograms(self):
+        self.client.get("/currencies/")
+        self.client.get("/currencies/")
+        histograms = registry.as_dict()["GET ^currencies/$"]
+        assert histograms["total"]["count"] == 2
+        assert histograms["queries"]["sum"] > 0
+
+    def test_times_denied_requests(self):
+        self.client = APIClient()
+        resp = self.client.get("/currencies/")
+        assert resp.status_code == 403
+        assert "total;dur=" in resp["Server-Timing"]
+
+    def test_times_report_query_compilation(self):
+        self.populate_accounts()
+        data = {"accounts": [1], "periods": [["2020-01-01", "2020-02-01"]]}
+        resp = self.client.post("/reports/flow-evolution/", data)
+        assert "sqlalchemy;dur=" in resp["Server-Timing"]
+
+    def test_times_streamed_content(self):
+        def get_response(request):
+            def iter_content():
+                yield b"["
+                yield str(Currency.objects.count()).encode()
+                yield b"]"
+
+            return StreamingHttpResponse(iter_content())
+
+        middleware = sut.InstrumentationMiddleware(get_response)
+        resp = middleware(Mock(method="POST", resolver_match=Mock(route="^foo/$")))
+        assert "db;" not in resp["Server-Timing"]
+        assert registry.as_dict() == {}
+
+        assert b"".join(resp.streaming_content) == b"[3]"
+        histograms = registry.as_dict()["POST ^foo/$"]
+        assert histograms["queries"]["sum"] == 1
+        assert histograms["db"]["count"] == 1
+        assert histograms["total"]["count"] == 1
+
+    def test_times_streamed_reports(self):
+        self.populate_accounts()
+        date_series = {"start": "2020-01-01", "end": "2020-01-10", "step": "day"}
+        data = {"accounts": [1], "date_series": date_series}
+        resp = self.client.post("/reports/balance-evolution/", data, format="json")
+        assert resp.status_code == 200
+        assert "db;" in resp["Server-Timing"]
+        assert registry.as_dict() == {}
+
+        b"".join(resp.streaming_content)
+        histograms = registry.as_dict()["POST reports/balance-evolution/"]
+        assert histograms["total"]["count"] == 1
+        assert histograms["queries"]["sum"] > 0
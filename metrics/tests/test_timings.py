@@ -0,0 +1,38 @@
+from unittest.mock import Mock, sentinel
+
+import metrics.timings as sut
+
+
+class TestTimer:
+    def test_noop_outside_collect_timings(self):
+        with sut.timer("foo"):
+            pass
+        assert sut.get_current() is None
+
+    def test_adds_durations(self):
+        with sut.collect_timings() as timings:
+            assert sut.get_current() is timings
+            with sut.timer("foo"):
+                pass
+            with sut.timer("foo"):
+                pass
+            with sut.timer("bar"):
+                pass
+        assert sut.get_current() is None
+        assert set(timings.durations) == {"foo", "bar"}
+        assert timings.durations["foo"] > 0
+
+
+class TestQueryWrapper:
+    def test_counts_and_times_queries(self):
+        execute = Mock(return_value=sentinel.result)
+        with sut.collect_timings() as timings:
+            result = sut.query_wrapper(execute, "SELECT 1", None, False, {})
+            sut.query_wrapper(execute, "SELECT 1", None, False, {})
+        assert result == sentinel.result
+        assert timings.queries == 2
+        assert timings.durations["db"] > 0
+
+    def test_outside_collect_timings(self):
+        execute = Mock(return_value=sentinel.result)
+        assert sut.query_wrapper(execute, "SELECT 1", None, False, {}) == sentinel.result
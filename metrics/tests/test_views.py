@@ -0,0 +1,27 @@
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from common.testutils import PacsTestCase
+from metrics.histograms import registry
+
+
+@override_settings(ADMIN_TOKEN="admin_token")
+class TestGetMetrics(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_requires_admin_token(self):
+        self.client = APIClient()
+        assert self.client.get("/metrics").status_code == 403
+        assert self.client.get("/metrics", HTTP_X_PACS_ADMIN_TOKEN="foo").status_code == 403
+
+    def test_user_token_is_not_enough(self):
+        assert self.client.get("/metrics").status_code == 403
+
+    def test_returns_histograms(self):
+        self.client.get("/currencies/")
+        self.client = APIClient()
+        resp = self.client.get("/metrics", HTTP_X_PACS_ADMIN_TOKEN="admin_token")
+        assert resp.status_code == 200
+        assert resp.json()["GET ^currencies/$"]["total"]["count"] == 1
@@ -0,0 +1,69 @@
+"""
+Per-request timings.
+
+`InstrumentationMiddleware` starts a `RequestTimings` for each request. While
+it is active, `timer(name)` adds the time spent in a block to `name`, and every
+query made through a django connection is counted and added to "db".
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import attr
+
+_current: contextvars.ContextVar = contextvars.ContextVar("pacs_request_timings", default=None)
+
+
+@attr.s(slots=True)
+class RequestTimings:
+    # Seconds spent by name (e.g. "db", "auth", "render")
+    durations: Dict[str, float] = attr.ib(factory=dict)
+    queries: int = attr.ib(default=0)
+
+    def add(self, name: str, duration: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+
+def get_current() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def collect_timings(timings: Optional[RequestTimings] = None):
+    """Collects the timings of the code run inside into `timings` (new ones by
+    default), yielding them."""
+    if timings is None:
+        timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timer(name: str):
+    """Adds the time spent inside to `name`. A no-op outside `collect_timings`."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """A django `execute_wrapper` counting and timing queries."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add("db", time.perf_counter() - start)
+        timings.queries += 1
@@ -0,0 +1,13 @@
+from django.conf import settings
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from metrics.histograms import registry
+
+
+@api_view(["GET"])
+def get_metrics(request):
+    """Histograms of the timings of each view, for admins only."""
+    if request.META.get("HTTP_X_PACS_ADMIN_TOKEN") != settings.ADMIN_TOKEN:
+        return Response(status=403)
+    return Response(registry.as_dict())
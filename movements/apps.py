@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class MovementsConfig(AppConfig):
     name = "movements"
+
+    def ready(self):
+        from movements.search import ensure_search_index_after_migrate
+
+        post_migrate.connect(ensure_search_index_after_migrate, sender=self)
@@ -1,12 +1,17 @@
 from django_filters import rest_framework as f
 
 from accounts.models import Account
+from movements.models import TransactionTag
 
 
 class TransactionFilterSet(f.FilterSet):
     account_id = f.NumberFilter(method="filter_account")
     reference = f.CharFilter(lookup_expr="icontains")
     description = f.CharFilter(lookup_expr="icontains")
+    # Full text search of description and reference, ranked
+    search = f.CharFilter(method="filter_search")
+    # `<name>` or `<name>:<value>`
+    tag = f.CharFilter(method="filter_tag")
 
     def filter_account(self, queryset, name, account_id):
         """Filters a Transaction Queryset by account_id, but
@@ -14,3 +19,16 @@ class TransactionFilterSet(f.FilterSet):
         acc = Account.objects.filter(id=account_id).first()
         descendants_ids = [] if acc is None else acc.get_descendants_ids(True, use_cache=True)
         return queryset.filter(movement__account__id__in=list(descendants_ids)).distinct()
+
+    def filter_search(self, queryset, name, text):
+        return queryset.search(text)
+
+    def filter_tag(self, queryset, name, tag):
+        """Filters a Transaction Queryset by the name (and value, if given as
+        `name:value`) of one of its tags. The tags are looked up in their
+        (name, value) index."""
+        tag_name, _, tag_value = tag.partition(":")
+        tags = TransactionTag.objects.filter(name=tag_name)
+        if tag_value:
+            tags = tags.filter(value=tag_value)
+        return queryset.filter(pk__in=tags.values("transaction_id"))
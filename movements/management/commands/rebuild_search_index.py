@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from movements.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full text search index of transactions"
+
+    def handle(self, *args, **kwargs):
+        rebuild_search_index()
+        self.stdout.write("Rebuilt the transactions search index")
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.6 on 2026-10-19 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movements', '0006_ledgerversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transactiontag',
+            index=models.Index(fields=['name', 'value'], name='movements_t_name_eeb9c3_idx'),
+        ),
+    ]
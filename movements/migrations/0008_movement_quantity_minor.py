@@ -0,0 +1,57 @@
+# Generated by Django 3.0.6 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+BATCH_SIZE = 10000
+
+# Quantities must be smaller than this (in absolute value) to have up to 15
+# digits, so their minor units fit in 64 bits (see 0009).
+MAX_QUANTITY = 10 ** 10
+
+
+def check_quantities(Movement):
+    too_large = Movement.objects.filter(
+        models.Q(quantity__gte=MAX_QUANTITY) | models.Q(quantity__lte=-MAX_QUANTITY)
+    )
+    pks = list(too_large.values_list('pk', flat=True)[:10])
+    if pks:
+        raise ValueError(
+            f'Movements (e.g. {pks}) have quantities with more than 15 digits (of'
+            f' {MAX_QUANTITY} or more). Fix them before migrating.'
+        )
+
+
+def backfill_quantity_minor(apps, schema_editor):
+    # As Movement.save, for the existing movements, in batches of pks
+    from common.utils import to_minor_units
+
+    Movement = apps.get_model('movements', 'Movement')
+    check_quantities(Movement)
+    table = Movement._meta.db_table
+    last_pk = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            rows = Movement.objects.filter(pk__gt=last_pk).order_by('pk')
+            rows = rows.values_list('pk', 'quantity')[:BATCH_SIZE]
+            batch = [(to_minor_units(quantity), pk) for pk, quantity in rows]
+            if not batch:
+                break
+            cursor.executemany(f'UPDATE {table} SET quantity_minor = %s WHERE id = %s', batch)
+            last_pk = batch[-1][1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movements', '0007_transactiontag_name_value_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movement',
+            name='quantity_minor',
+            field=models.BigIntegerField(blank=True, default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_quantity_minor, migrations.RunPython.noop),
+    ]
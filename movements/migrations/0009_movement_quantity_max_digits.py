@@ -0,0 +1,18 @@
+# Generated by Django 3.0.6 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movements', '0008_movement_quantity_minor'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movement',
+            name='quantity',
+            field=models.DecimalField(decimal_places=5, max_digits=15),
+        ),
+    ]
@@ -6,12 +6,19 @@ from typing import TYPE_CHECKING, Dict, List, NoReturn
 
 import attr
 import django.db.models as m
+from django.db.models.signals import post_delete, post_save
 from django.db.transaction import atomic
+from django.dispatch import receiver
 from rest_framework.exceptions import ValidationError
 
 from accounts.models import Account
-from common.models import full_clean_and_save, new_money_quantity_field, tag_validator
-from common.utils import decimals_equal, round_decimal
+from common.models import (
+    full_clean_and_save,
+    new_money_minor_units_field,
+    new_money_quantity_field,
+    tag_validator,
+)
+from common.utils import decimals_equal, from_minor_units, round_decimal, to_minor_units
 from currencies.models import Currency
 from currencies.money import Balance, Money
 
@@ -68,12 +75,32 @@ class TransactionQuerySet(m.QuerySet):
         in an efficient way."""
         movements = self.filter_by_account(account)._get_movements_qset().distinct()
         data_dct = movements.values("currency_id").annotate(  # Group by currency
-            quantity=m.Sum("quantity")
+            quantity_minor=m.Sum("quantity_minor")
         )  # Sum value
+        currencies = Currency.objects.in_bulk([x["currency_id"] for x in data_dct])
         return Balance(
-            [Money(x["quantity"], Currency.objects.get(id=x["currency_id"])) for x in data_dct]
+            [
+                Money.trusted(from_minor_units(x["quantity_minor"]), currencies[x["currency_id"]])
+                for x in data_dct
+            ]
         )
 
+    def search(self, text: str) -> TransactionQuerySet:
+        """Returns only transactions matching a full text search (see
+        movements.search), the best matches first."""
+        from movements.search import SEARCH_TABLE, to_match_query
+
+        match_query = to_match_query(text)
+        if not match_query:
+            return self.none()
+        x = self.extra(
+            tables=[SEARCH_TABLE],
+            where=[f"{SEARCH_TABLE}.rowid = movements_transaction.id", f"{SEARCH_TABLE} MATCH %s"],
+            params=[match_query],
+            select={"search_rank": f"{SEARCH_TABLE}.rank"},
+        )
+        return x.order_by("search_rank", "-date", "-pk")
+
     def _get_movements_qset(self):
         """Returns a queryset of all Movements related to self (distincted)"""
         pks = self.values_list("movement__pk", flat=True)
@@ -89,6 +116,10 @@ class TransactionTag(m.Model):
     name = _char_field(validators=[tag_validator])
     value = _char_field(validators=[tag_validator])
 
+    class Meta:
+        # For filtering transactions and grouping flows by tag
+        indexes = [m.Index(fields=["name", "value"])]
+
     def has_transaction(self):
         return hasattr(self, "transaction") and self.transaction is not None
 
@@ -189,7 +220,7 @@ class Transaction(m.Model):
         )
 
 
-@attr.s(frozen=True)
+@attr.s(frozen=True, slots=True)
 class MovementSpec:
     """
     The specification for a movement. A Value-Object wrapper around Movement,
@@ -206,10 +237,22 @@ class MovementSpec:
             m = "Account '{}' does not allow movements".format(account.name)
             raise ValidationError(m)
 
+    @classmethod
+    def trusted(cls, account: Account, money: Money, comment: str = "") -> MovementSpec:
+        """Returns a new MovementSpec without validating the account, which
+        must allow movements (e.g. the one of a movement read from the db).
+        The validation reads the account type, which may be a query."""
+        spec = object.__new__(cls)
+        object.__setattr__(spec, "account", account)
+        object.__setattr__(spec, "money", money)
+        object.__setattr__(spec, "comment", comment)
+        return spec
+
     @classmethod
     def from_movement(cls, mov: Movement) -> MovementSpec:
-        """Creates a MovementSpec from a Movement"""
-        return MovementSpec(mov.get_account(), mov.get_money(), mov.get_comment())
+        """Creates a MovementSpec from a Movement read from the db"""
+        money = Money.trusted(mov.quantity, mov.currency)
+        return cls.trusted(mov.get_account(), money, mov.get_comment())
 
 
 class MovementQueryset(m.QuerySet):
@@ -231,6 +274,9 @@ class Movement(m.Model):
     # currency + quantity forms Money
     currency = m.ForeignKey(Currency, on_delete=m.CASCADE)
     quantity = new_money_quantity_field()
+    # The quantity in minor units, which is what sql sums (sqlite sums decimals
+    # as floats). Set from `quantity` on save.
+    quantity_minor = new_money_minor_units_field()
 
     #
     # django magic
@@ -240,6 +286,10 @@ class Movement(m.Model):
     #
     # Methods
     #
+    def save(self, *args, **kwargs):
+        self.quantity_minor = to_minor_units(self.quantity)
+        super().save(*args, **kwargs)
+
     def get_date(self) -> datetime.date:
         return self.transaction.get_date()
 
@@ -256,6 +306,41 @@ class Movement(m.Model):
         return Money(self.quantity, self.currency)
 
 
+class LedgerVersionQuerySet(m.QuerySet):
+    def get_version(self) -> int:
+        return self.filter(pk=1).values_list("version", flat=True).first() or 0
+
+    def bump(self) -> None:
+        if self.filter(pk=1).update(version=m.F("version") + 1) == 0:
+            self.get_or_create(pk=1, defaults={"version": 1})
+
+
+class LedgerVersion(m.Model):
+    """
+    A counter bumped (in the same db transaction) by every write to accounts,
+    currencies, transactions, movements or tags. Anything computed from the
+    ledger, like a report or an ETag, stays valid for as long as the version
+    doesn't change.
+    """
+
+    version = m.PositiveIntegerField(default=0)
+
+    objects = LedgerVersionQuerySet.as_manager()
+
+
+@receiver([post_save, post_delete], sender=Account)
+@receiver([post_save, post_delete], sender=Currency)
+@receiver([post_save, post_delete], sender=TransactionTag)
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=Movement)
+def _bump_ledger_version(**kwargs):
+    LedgerVersion.objects.bump()
+
+
+def get_ledger_version() -> int:
+    return LedgerVersion.objects.get_version()
+
+
 #
 # Auxiliary classes
 #
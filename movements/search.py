@@ -0,0 +1,85 @@
+"""
+Full text search of transactions.
+
+The description and reference of transactions are indexed in the
+`movements_transaction_search` FTS5 table. It is an external content table
+(it does not store the text again) kept in sync by triggers, so bulk inserts
+are indexed too. The table and triggers are not models: they are created
+after every `migrate` if missing (e.g. migrations that rebuild the
+transactions table drop its triggers), and for the test db.
+
+A search matches the transactions with all of its words, the last one
+possibly incomplete (e.g. "super rest" matches "supermarket restaurant"),
+ranked by bm25.
+"""
+import re
+
+from django.db import connections
+
+SEARCH_TABLE = "movements_transaction_search"
+
+CREATE_TABLE_SQL = f"""
+CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+    description, reference, content='movements_transaction', content_rowid='id', prefix='2 3'
+)
+"""
+
+_INSERT_SQL = f"""
+INSERT INTO {SEARCH_TABLE}(rowid, description, reference)
+VALUES (new.id, new.description, new.reference);
+"""
+
+_DELETE_SQL = f"""
+INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, description, reference)
+VALUES ('delete', old.id, old.description, old.reference);
+"""
+
+CREATE_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON movements_transaction
+    BEGIN {_INSERT_SQL} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON movements_transaction
+    BEGIN {_DELETE_SQL} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update
+    AFTER UPDATE OF description, reference ON movements_transaction
+    BEGIN {_DELETE_SQL} {_INSERT_SQL} END
+    """,
+]
+
+
+def to_match_query(text: str) -> str:
+    """Returns the FTS5 query for a text typed by a user, quoting each word
+    so no FTS5 syntax is interpreted. Empty if there are no words."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    return " ".join(f'"{x}"' for x in words) + "*"
+
+
+def rebuild_search_index(using: str = "default") -> None:
+    """Rebuilds the search index from the transactions table."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def ensure_search_index(using: str = "default") -> None:
+    """Creates the search index (and indexes the existing transactions) and
+    its triggers, if missing."""
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [SEARCH_TABLE])
+        created = cursor.fetchone() is None
+        if created:
+            cursor.execute(CREATE_TABLE_SQL)
+        for sql in CREATE_TRIGGERS_SQL:
+            cursor.execute(sql)
+    if created:
+        rebuild_search_index(using)
+
+
+def ensure_search_index_after_migrate(using, **kwargs) -> None:
+    """A post_migrate receiver for `ensure_search_index`."""
+    ensure_search_index(using)
@@ -7,15 +7,22 @@ from rest_framework.serializers import (
 )
 
 from accounts.models import Account
+from common.models import N_DECIMAL_PLACES, N_QUANTITY_MAX_DIGITS
 from currencies.money import Money
 from currencies.serializers import MoneySerializer
 
 from .models import MovementSpec, Transaction, TransactionFactory, TransactionTag
 
 
+class MovementMoneySerializer(MoneySerializer):
+    """Money with at most the digits that a movement stores."""
+
+    quantity = serializers.DecimalField(N_QUANTITY_MAX_DIGITS, N_DECIMAL_PLACES)
+
+
 class MovementSpecSerializer(Serializer):
     account = PrimaryKeyRelatedField(queryset=Account.objects.all())
-    money = MoneySerializer()
+    money = MovementMoneySerializer()
     comment = serializers.CharField(allow_blank=True, default="")
 
     def create(self, validated_data):
@@ -6,7 +6,7 @@ from accounts.models import AccTypeEnum
 from accounts.tests.factories import AccountTestFactory
 from common.testutils import PacsTestCase
 from movements.filters import TransactionFilterSet
-from movements.models import Transaction
+from movements.models import Transaction, TransactionTag
 from movements.tests.factories import MovementSpecTestFactory, TransactionTestFactory
 
 
@@ -54,3 +54,24 @@ class TestTransactionFilterSet(PacsTestCase):
         with self.assertNumQueries(3):
             qset = Transaction.objects.all()
             list(TransactionFilterSet({"account_id": super_parent.id}, qset).qs)
+
+    @staticmethod
+    def create_transaction(tags):
+        transaction = TransactionTestFactory()
+        transaction.set_tags([TransactionTag(name=name, value=value) for name, value in tags])
+        return transaction
+
+    def test_filter_by_tag(self):
+        brussels = self.create_transaction([("trip-to", "Brussels")])
+        paris = self.create_transaction([("trip-to", "Paris")])
+        self.create_transaction([("with", "Brussels")])
+        self.create_transaction([])
+        qset = Transaction.objects.order_by("pk")
+        assert list(TransactionFilterSet({"tag": "trip-to"}, qset).qs) == [brussels, paris]
+        assert list(TransactionFilterSet({"tag": "trip-to:Paris"}, qset).qs) == [paris]
+        assert list(TransactionFilterSet({"tag": "trip-to:Rome"}, qset).qs) == []
+
+    def test_filter_by_tag_with_repeated_tags_returns_transaction_once(self):
+        transaction = self.create_transaction([("trip-to", "Brussels"), ("trip-to", "Paris")])
+        qset = Transaction.objects.all()
+        assert list(TransactionFilterSet({"tag": "trip-to"}, qset).qs) == [transaction]
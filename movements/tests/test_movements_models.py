@@ -3,6 +3,7 @@ from decimal import Decimal
 
 import attr
 import django.core.exceptions
+from django.db.models import Sum
 from rest_framework import serializers
 
 from accounts.management.commands.populate_accounts import (
@@ -17,6 +18,7 @@ from currencies.management.commands.populate_currencies import currency_populato
 from currencies.money import Balance, Money
 from currencies.tests.factories import CurrencyTestFactory
 from movements.models import (
+    LedgerVersion,
     Movement,
     MovementSpec,
     Transaction,
@@ -143,6 +145,23 @@ class TestTransactionQueryset_get_balance_for_account(MovementsModelsTestCase):
             exp += t.get_balance_for_account(account)
         assert exp == res
 
+    def test_sums_exactly(self):
+        # Sqlite sums the decimal column as floats, which would give 0.00011
+        self.populate_accounts()
+        account, currency = AccountTestFactory(), CurrencyTestFactory()
+        quantities = ["9999999999.99999", "-9999999999.99998"] * 12
+        transactions = [
+            TransactionTestFactory(
+                movements_specs__0__account=account,
+                movements_specs__0__money=Money(quantity, currency),
+                movements_specs__1__money__currency=currency,
+                movements_specs__1__money__quantity=-Decimal(quantity),
+            )
+            for quantity in quantities
+        ]
+        balance = list_to_queryset(transactions).get_balance_for_account(account)
+        assert balance.get_for_currency(currency).quantity == Decimal("0.00012")
+
 
 class TestTransactionFactory(MovementsModelsTestCase):
     def setUp(self):
@@ -293,6 +312,20 @@ class TestMovementSpec(MovementsModelsTestCase):
         mov = transactions.movement_set.all()[0]
         assert MovementSpec.from_movement(mov) == MovementSpec(mov.get_account(), mov.get_money())
 
+    def test_from_movement_does_not_query(self):
+        transaction = TransactionTestFactory()
+        mov = transaction.movement_set.select_related("account", "currency").all()[0]
+        with self.assertNumQueries(0):
+            MovementSpec.from_movement(mov)
+
+    def test_trusted_does_not_validate_account(self):
+        account = AccountTestFactory(acc_type=AccTypeEnum.BRANCH)
+        money = Money(10, CurrencyTestFactory())
+        with self.assertRaises(serializers.ValidationError):
+            MovementSpec(account, money)
+        spec = MovementSpec.trusted(account, money, "comment")
+        assert (spec.account, spec.money, spec.comment) == (account, money, "comment")
+
 
 class TestMovementModel(MovementsModelsTestCase):
     def test_get_money(self):
@@ -300,3 +333,60 @@ class TestMovementModel(MovementsModelsTestCase):
         currency = CurrencyTestFactory()
         mov = Movement(quantity=quantity, currency=currency)
         assert mov.get_money() == Money(quantity, currency)
+
+    def test_save_sets_quantity_minor(self):
+        mov = MovementTestFactory(quantity=Decimal("-12.34567"))
+        assert Movement.objects.get(pk=mov.pk).quantity_minor == -1234567
+        mov.quantity = Decimal("0.1")
+        mov.save()
+        assert Movement.objects.get(pk=mov.pk).quantity_minor == 10000
+
+    def test_largest_quantity(self):
+        quantity = Decimal("-9999999999.99999")
+        account = AccountTestFactory()
+        currency = CurrencyTestFactory()
+        for _ in range(2):
+            mov = MovementTestFactory(quantity=quantity, account=account, currency=currency)
+        mov.full_clean()
+        assert Movement.objects.get(pk=mov.pk).quantity == quantity
+        assert Movement.objects.get(pk=mov.pk).quantity_minor == -999999999999999
+        movements = Movement.objects.filter(account=account)
+        total = movements.aggregate(total=Sum("quantity_minor"))["total"]
+        assert total == 2 * -999999999999999
+
+    def test_quantity_too_large(self):
+        mov = MovementTestFactory()
+        mov.quantity = Decimal("10000000000")
+        with self.assertRaises(django.core.exceptions.ValidationError) as e:
+            mov.full_clean()
+        assert "quantity" in e.exception.message_dict
+
+
+class TestLedgerVersion(MovementsModelsTestCase):
+    def test_starts_at_zero(self):
+        LedgerVersion.objects.all().delete()
+        assert LedgerVersion.objects.get_version() == 0
+        LedgerVersion.objects.bump()
+        assert LedgerVersion.objects.get_version() == 1
+
+    def test_bumped_by_transaction_writes(self):
+        version = LedgerVersion.objects.get_version()
+        transaction = TransactionTestFactory()
+        assert LedgerVersion.objects.get_version() > version
+
+        version = LedgerVersion.objects.get_version()
+        transaction.set_description("foo")
+        assert LedgerVersion.objects.get_version() == version + 1
+
+        version = LedgerVersion.objects.get_version()
+        transaction.delete()
+        assert LedgerVersion.objects.get_version() > version
+
+    def test_bumped_by_account_writes(self):
+        version = LedgerVersion.objects.get_version()
+        account = AccountTestFactory()
+        assert LedgerVersion.objects.get_version() > version
+
+        version = LedgerVersion.objects.get_version()
+        account.set_name("foo")
+        assert LedgerVersion.objects.get_version() > version
@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+
+import movements.search as sut
+from accounts.management.commands.populate_accounts import (
+    account_populator,
+    account_type_populator,
+)
+from common.testutils import PacsTestCase
+from movements.filters import TransactionFilterSet
+from movements.models import Transaction
+from movements.tests.factories import TransactionTestFactory
+
+
+class TestToMatchQuery:
+    def test_quotes_words_and_prefixes_the_last(self):
+        assert sut.to_match_query("super market") == '"super" "market"*'
+
+    def test_ignores_fts_syntax(self):
+        assert sut.to_match_query('foo" OR bar*') == '"foo" "OR" "bar"*'
+
+    def test_empty_without_words(self):
+        assert sut.to_match_query(" -*- ") == ""
+
+
+class TestTransactionSearch(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        account_type_populator()
+        account_populator()
+
+    def search(self, text):
+        return list(Transaction.objects.search(text))
+
+    def test_matches_words_and_prefixes(self):
+        supermarket = TransactionTestFactory(description="Supermarket with friends")
+        restaurant = TransactionTestFactory(description="Restaurant", reference="REF123")
+        assert self.search("supermarket") == [supermarket]
+        assert self.search("with frie") == [supermarket]
+        assert self.search("ref12") == [restaurant]
+        assert self.search("restaurant friends") == []
+        assert self.search("!!") == []
+
+    def test_ranks_results(self):
+        once = TransactionTestFactory(description="rent and other things to pay")
+        twice = TransactionTestFactory(description="rent rent")
+        assert self.search("rent") == [twice, once]
+
+    def test_kept_in_sync(self):
+        transaction = TransactionTestFactory(description="old description")
+        transaction.set_description("new description")
+        assert self.search("old") == []
+        assert self.search("new") == [transaction]
+        transaction.delete()
+        assert self.search("new") == []
+
+    def test_indexes_bulk_created(self):
+        transaction = TransactionTestFactory(description="foo")
+        Transaction.objects.bulk_create([Transaction(description="bulk", date=transaction.date)])
+        assert [x.description for x in self.search("bulk")] == ["bulk"]
+
+    def test_rebuild(self):
+        transaction = TransactionTestFactory(description="foo")
+        with connection.cursor() as cursor:
+            table = sut.SEARCH_TABLE
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('delete-all')")
+        assert self.search("foo") == []
+        call_command("rebuild_search_index", stdout=StringIO())
+        assert self.search("foo") == [transaction]
+
+    def test_ensure_search_index_recreates_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {sut.SEARCH_TABLE}_insert")
+        sut.ensure_search_index()
+        transaction = TransactionTestFactory(description="foo")
+        assert self.search("foo") == [transaction]
+
+    def test_filter(self):
+        transaction = TransactionTestFactory(description="foo bar")
+        TransactionTestFactory(description="baz")
+        filter_set = TransactionFilterSet({"search": "bar"}, Transaction.objects.all())
+        assert list(filter_set.qs) == [transaction]
+
+    def test_get_transactions_searched(self):
+        TransactionTestFactory(description="baz")
+        transaction = TransactionTestFactory(description="foo bar")
+        resp = self.client.get("/transactions/", {"search": "fo"})
+        assert [x["pk"] for x in resp.json()] == [transaction.pk]
@@ -72,9 +72,26 @@ class TestTransactionView(MovementsViewsTestCase):
 
     def test_get_transactions_count_queries(self):
         TransactionTestFactory.create_batch(5)
-        with self.assertNumQueries(7):
+        # 1 of them reads the ledger version, for the ETag
+        with self.assertNumQueries(8):
             self.client.get("/transactions/")
 
+    def test_get_transactions_not_modified(self):
+        TransactionTestFactory.create_batch(5)
+        etag = self.client.get("/transactions/")["ETag"]
+        # Only reads the ledger version
+        with self.assertNumQueries(1):
+            resp = self.client.get("/transactions/", HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 304
+
+    def test_get_transactions_modified(self):
+        transaction = TransactionTestFactory()
+        etag = self.client.get("/transactions/")["ETag"]
+        transaction.set_description("foo")
+        resp = self.client.get("/transactions/", HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 200
+        assert resp["ETag"] != etag
+
     def test_get_transaction_with_pagination(self):
         TransactionTestFactory.create_batch(5)
         resp = self.client.get("/transactions/?page=1&page_size=3")
@@ -153,6 +170,13 @@ class TestTransactionView(MovementsViewsTestCase):
             MovementSpec(self.accs[1], Money(-200, self.cur)),
         ]
 
+    def test_post_quantity_too_large_returns_error(self):
+        for i, quantity in enumerate(["10000000000", "-10000000000"]):
+            self.post_data["movements_specs"][i]["money"]["quantity"] = quantity
+        resp = self.client.post("/transactions/", self.post_data, format="json")
+        assert resp.status_code == 400
+        assert "movements_specs" in resp.json(), resp.json()
+
     def test_post_transaction_with_empty_movements_returns_error(self):
         self.post_data["movements_specs"] = []
         resp = self.client.post("/transactions/", self.post_data)
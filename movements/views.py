@@ -3,8 +3,9 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.viewsets import ModelViewSet
 
 from common.constants import PAGE_QUERY_PARAM, PAGE_SIZE_QUERY_PARAM
+from common.etags import version_etag
 from movements.filters import TransactionFilterSet
-from movements.models import Transaction
+from movements.models import Transaction, get_ledger_version
 from movements.serializers import TransactionSerializer
 
 
@@ -32,3 +33,11 @@ class TransactionViewSet(ModelViewSet):
         (PageNumberPagination,),
         {"page_query_param": PAGE_QUERY_PARAM, "page_size_query_param": PAGE_SIZE_QUERY_PARAM},
     )
+
+    @version_etag(get_ledger_version)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @version_etag(get_ledger_version)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
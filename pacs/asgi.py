@@ -0,0 +1,22 @@
+"""
+ASGI config for pacs project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Read-only report requests are served from their own bounded thread pool, see
+``pacs.handlers.PacsASGIHandler``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
+"""
+
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pacs.settings")
+
+django.setup(set_prefix=False)
+
+from pacs.handlers import PacsASGIHandler  # noqa: E402
+
+application = PacsASGIHandler()
@@ -0,0 +1,84 @@
+"""
+Routes the reads of reports and journals to the "reports" database.
+
+The "reports" database (see `settings.REPORTS_DB_FILE`) is a read-only replica
+or snapshot of the primary one. Code that only reads and can live with some
+lag opts in with `with use_reports_db(): ...` (or `iter_in_reports_db` for
+what is consumed lazily); everything else, and every write, goes to the
+primary ("default") database.
+"""
+import contextlib
+import contextvars
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from pacs.db.snapshots import refresh_snapshot_if_stale
+
+REPORTS_DB_ALIAS = "reports"
+
+_use_reports_db = contextvars.ContextVar("pacs_use_reports_db", default=False)
+
+T = TypeVar("T")
+
+
+def has_reports_db() -> bool:
+    return REPORTS_DB_ALIAS in connections.databases
+
+
+def get_reports_db_alias() -> str:
+    """Returns the alias reports should read from in the current context."""
+    if _use_reports_db.get() and has_reports_db():
+        return REPORTS_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+@contextlib.contextmanager
+def use_reports_db():
+    """Reads made inside this context go to the reports database, if any."""
+    if has_reports_db():
+        refresh_snapshot_if_stale(REPORTS_DB_ALIAS)
+        connections[REPORTS_DB_ALIAS].close_if_replaced()
+    with _reads_from_reports_db():
+        yield
+
+
+@contextlib.contextmanager
+def _reads_from_reports_db():
+    token = _use_reports_db.set(True)
+    try:
+        yield
+    finally:
+        _use_reports_db.reset(token)
+
+
+def iter_in_reports_db(get_items: Callable[[], Iterable[T]]) -> Iterator[T]:
+    """Yields the items returned by `get_items`, reading each of them inside
+    `use_reports_db`. Unlike yielding inside `use_reports_db`, the context is
+    left while the caller handles each item, so a suspended iterator (e.g. the
+    content of a streamed response) does not route other reads."""
+    with use_reports_db():
+        items = iter(get_items())
+    while True:
+        with _reads_from_reports_db():
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+        yield item
+
+
+class ReportsRouter:
+    def db_for_read(self, model, **hints):
+        return get_reports_db_alias()
+
+    def db_for_write(self, model, **hints):
+        # Never write to the reports db, even for objects read from it.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both dbs hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
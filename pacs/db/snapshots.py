@@ -0,0 +1,60 @@
+"""
+Snapshot copies of the primary sqlite db.
+
+When `settings.REPORTS_DB_SNAPSHOT_INTERVAL` is set, the "reports" database is
+a copy of the primary one refreshed every that many seconds (lazily, when a
+report is requested, or by the `refresh_reports_db` command).
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_refresh_lock = threading.Lock()
+
+
+def refresh_snapshot(dst_file: str, src_alias: str = DEFAULT_DB_ALIAS) -> None:
+    """Copies the db of `src_alias` to `dst_file` using sqlite's online backup.
+    The copy is written to a temporary file that is then renamed, so readers
+    never see a partial copy."""
+    src = connections[src_alias]
+    src.ensure_connection()
+    fd, tmp_file = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(dst_file)))
+    os.close(fd)
+    try:
+        dst = sqlite3.connect(tmp_file)
+        try:
+            src.connection.backup(dst)
+            # WAL dbs can not be opened read-only without their -shm file
+            dst.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dst.close()
+        os.replace(tmp_file, dst_file)
+    except BaseException:
+        os.remove(tmp_file)
+        raise
+
+
+def is_stale(db_file: str, interval: float) -> bool:
+    return not os.path.exists(db_file) or time.time() - os.path.getmtime(db_file) >= interval
+
+
+def refresh_snapshot_if_stale(alias: str) -> bool:
+    """Refreshes the snapshot db of `alias` if it is older than
+    `settings.REPORTS_DB_SNAPSHOT_INTERVAL`. Returns whether it refreshed."""
+    interval = settings.REPORTS_DB_SNAPSHOT_INTERVAL
+    db_file = connections.databases[alias]["NAME"]
+    if not interval or not is_stale(db_file, interval):
+        return False
+    # Someone else is already refreshing it, and the old copy is still usable
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+    try:
+        refresh_snapshot(db_file)
+    finally:
+        _refresh_lock.release()
+    return True
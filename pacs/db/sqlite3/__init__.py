@@ -0,0 +1,4 @@
+"""
+The sqlite3 database backend for pacs: django's sqlite3 backend, but running
+`settings.SQLITE_PRAGMAS` on every new connection.
+"""
@@ -0,0 +1,38 @@
+import os
+
+from django.db.backends.sqlite3 import base
+
+from metrics.timings import query_wrapper
+
+from .pragmas import apply_pragmas
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _db_file_inode = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Counts and times queries made inside `metrics.timings.collect_timings`
+        self.execute_wrappers.append(query_wrapper)
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # A "READ_ONLY" database (e.g. a replica) is opened in read-only mode.
+        if self.settings_dict.get("READ_ONLY", False):
+            kwargs["database"] = f"file:{kwargs['database']}?mode=ro"
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, read_only=self.settings_dict.get("READ_ONLY", False))
+        if self.settings_dict.get("READ_ONLY", False):
+            self._db_file_inode = os.stat(self.settings_dict["NAME"]).st_ino
+        return conn
+
+    def close_if_replaced(self):
+        """Closes the connection if the db file was replaced (e.g. a refreshed
+        snapshot), so the next query reads the new file."""
+        if self.connection is None or self._db_file_inode is None:
+            return
+        if os.stat(self.settings_dict["NAME"]).st_ino != self._db_file_inode:
+            self.close()
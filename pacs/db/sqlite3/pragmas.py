@@ -0,0 +1,33 @@
+"""Pragmas used to tune sqlite connections (see `settings.SQLITE_PRAGMAS`)."""
+from typing import Dict, List, Optional, Union
+
+from django.conf import settings
+
+# Pragmas that are persisted in the db file, and can only be set by writers.
+PERSISTENT_PRAGMAS = {"journal_mode"}
+
+
+def get_pragma_statements(
+    pragmas: Dict[str, Union[str, int]], read_only: bool = False
+) -> List[str]:
+    return [
+        f"PRAGMA {name}={value}"
+        for (name, value) in pragmas.items()
+        if not (read_only and name in PERSISTENT_PRAGMAS)
+    ]
+
+
+def apply_pragmas(
+    dbapi_connection,
+    pragmas: Optional[Dict[str, Union[str, int]]] = None,
+    read_only: bool = False,
+) -> None:
+    """Runs the pragmas (by default `settings.SQLITE_PRAGMAS`) on a dbapi
+    sqlite3 connection."""
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in get_pragma_statements(pragmas, read_only):
+            cursor.execute(statement)
+    finally:
+        cursor.close()
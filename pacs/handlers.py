@@ -0,0 +1,178 @@
+"""
+Request handlers for pacs.
+
+Django 3.0 runs every view synchronously, and its ASGI handler sends all of
+them to the same default thread pool. `PacsASGIHandler` instead runs read-only
+report requests (see `settings.ASGI_READ_ONLY_ROUTES`) in their own bounded
+pool, so that many slow dashboard requests can not starve CRUD requests.
+
+Streamed responses are iterated in the same pool thread (and so with the same
+db connections) as their view, which hands the chunks to the event loop a few
+at a time. The thread is busy until the response is fully sent.
+"""
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import attr
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+
+# Chunks of a streamed response computed ahead of the ones sent
+STREAMED_CHUNKS_BUFFER = 8
+
+_END = object()
+
+
+# The future is cancelled if the client disconnects while waiting
+def _set_result(future: asyncio.Future, result) -> None:
+    if not future.cancelled():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, exception: BaseException) -> None:
+    if not future.cancelled():
+        future.set_exception(exception)
+
+
+@attr.s(frozen=True)
+class ReadOnlyRoute:
+    """A (path regex, methods) pair identifying a read-only request."""
+
+    path = attr.ib(converter=re.compile)
+    methods = attr.ib(converter=frozenset)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["path"], d["methods"])
+
+    def matches(self, request):
+        return request.method in self.methods and self.path.match(request.path) is not None
+
+
+class PacsASGIHandler(ASGIHandler):
+    """An ASGIHandler that uses one thread pool for read-only report requests
+    and another one for everything else."""
+
+    def __init__(self):
+        super().__init__()
+        self.read_only_routes = [ReadOnlyRoute.from_dict(x) for x in settings.ASGI_READ_ONLY_ROUTES]
+        self.read_only_executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_READ_ONLY_THREADS, thread_name_prefix="pacs-read-only"
+        )
+        self.default_executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_DEFAULT_THREADS, thread_name_prefix="pacs-default"
+        )
+
+    def is_read_only(self, request):
+        return any(route.matches(request) for route in self.read_only_routes)
+
+    def get_executor(self, request):
+        if self.is_read_only(request):
+            return self.read_only_executor
+        return self.default_executor
+
+    # Being a coroutine function, ASGIHandler awaits this directly instead of
+    # wrapping it in `sync_to_async`.
+    async def get_response(self, request):
+        loop = asyncio.get_event_loop()
+        response = loop.create_future()
+        chunks = StreamedChunks(loop, asyncio.Queue(STREAMED_CHUNKS_BUFFER))
+        loop.run_in_executor(
+            self.get_executor(request), self._get_response_in_thread, request, response, chunks
+        )
+        return await response
+
+    def _get_response_in_thread(self, request, response_future, chunks):
+        """Runs the middleware chain and view in a pool thread, and then
+        iterates the content of a streamed response. Db connections are per
+        thread, so they are released here and not in the event loop."""
+        loop = chunks.loop
+        close_old_connections()
+        try:
+            try:
+                response = super().get_response(request)
+            except BaseException as e:
+                loop.call_soon_threadsafe(_set_exception, response_future, e)
+                return
+            if not response.streaming:
+                loop.call_soon_threadsafe(_set_result, response_future, response)
+                return
+            # The event loop would iterate it, querying the db outside of
+            # the pool thread. It sends `chunks` instead.
+            content = response.streaming_content
+            response.streaming_content = []
+            response.pacs_streamed_chunks = chunks
+            loop.call_soon_threadsafe(_set_result, response_future, response)
+            chunks.produce(content)
+        finally:
+            close_old_connections()
+
+    async def send_response(self, response, send):
+        chunks = getattr(response, "pacs_streamed_chunks", None)
+        if chunks is None:
+            return await super().send_response(response, send)
+
+        async def send_with_chunks(message):
+            # Django sends the headers, the (now empty) content and then a
+            # last message, so the chunks go right before that one.
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                try:
+                    part = await chunks.get()
+                    while part is not None:
+                        for chunk, _ in self.chunk_bytes(part):
+                            await send(
+                                {"type": "http.response.body", "body": chunk, "more_body": True}
+                            )
+                        part = await chunks.get()
+                finally:
+                    chunks.stop()
+            await send(message)
+
+        await super().send_response(response, send_with_chunks)
+
+
+@attr.s()
+class StreamedChunks:
+    """The chunks of a streamed response, produced by a thread and consumed
+    from the event loop. The producer waits while `queue` is full."""
+
+    loop: asyncio.AbstractEventLoop = attr.ib()
+    queue: asyncio.Queue = attr.ib()
+    # Set once the consumer stops, e.g. when the client disconnects
+    stopped: bool = attr.ib(default=False)
+
+    def _put(self, item) -> None:
+        asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop).result()
+
+    def produce(self, content: Iterable[bytes]) -> None:
+        """Iterates `content` (in the calling thread), queueing its chunks."""
+        try:
+            for chunk in content:
+                self._put(chunk)
+                if self.stopped:
+                    return
+            self._put(_END)
+        except Exception as e:
+            self._put(e)
+        finally:
+            if hasattr(content, "close"):
+                content.close()
+
+    async def get(self) -> Optional[bytes]:
+        """Returns the next chunk, or None after the last one."""
+        item = await self.queue.get()
+        if item is _END:
+            return None
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def stop(self) -> None:
+        """Stops the producer, also if the chunks were not all sent."""
+        self.stopped = True
+        # Unblocks the producer, which then sees `stopped`
+        while not self.queue.empty():
+            self.queue.get_nowait()
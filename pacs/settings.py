@@ -46,17 +46,19 @@ INSTALLED_APPS = [
     "mptt",
     "currencies",
     "accounts",
-    "movements",
+    "movements.apps.MovementsConfig",
     "pacs_auth",
     "featuretoggles",
     "exchangerates",
+    "reports.apps.ReportsConfig",
 ]
 
 if DEBUG:
     INSTALLED_APPS += ["django_extensions", "debug_toolbar"]
 
 TOKEN_VALIDATOR_CLASS = "SingleStaticTokenValidator" if TEST else None
-PACS_AUTH_ALLOWED_URLS = ["/auth/token", "/auth/api_key", "/featuretoggles"]
+# "/metrics" checks the admin token itself
+PACS_AUTH_ALLOWED_URLS = ["/auth/token", "/auth/api_key", "/featuretoggles", "/metrics"]
 PACS_AUTH_ROLE_AUTH_RULES = [
     {
         "path": "/auth/test",
@@ -66,6 +68,8 @@ PACS_AUTH_ROLE_AUTH_RULES = [
 ]
 
 MIDDLEWARE = [
+    # First, so it times all others
+    "metrics.middleware.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -100,18 +104,83 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "pacs.wsgi.application"
 
+# ASGI (pacs.asgi): read-only report requests run on their own thread pool.
+ASGI_READ_ONLY_THREADS = int(os.environ.get("PACS_ASGI_READ_ONLY_THREADS", "4"))
+ASGI_DEFAULT_THREADS = int(os.environ.get("PACS_ASGI_DEFAULT_THREADS", "4"))
+ASGI_READ_ONLY_ROUTES = [
+    # Every report only reads
+    {"path": r"^/reports/", "methods": ["POST"]},
+    {"path": r"^/accounts/[0-9]+/(journal|tree)/$", "methods": ["GET"]},
+    {"path": r"^/exchange_rates/data/v2$", "methods": ["GET"]},
+]
+
 
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "pacs.db.sqlite3",
         "NAME": os.environ["PACS_DB_FILE"],
         "TEST": {"NAME": os.path.join(BASE_DIR, "test_db.sqlite3")},
     }
 }
 
+# Reports and journals may read from a read-only replica of the db. If
+# REPORTS_DB_SNAPSHOT_INTERVAL is set, the replica is instead a snapshot copy
+# of the db, refreshed every that many seconds.
+REPORTS_DB_FILE = os.environ.get("PACS_REPORTS_DB_FILE", "")
+REPORTS_DB_SNAPSHOT_INTERVAL = int(os.environ.get("PACS_REPORTS_DB_SNAPSHOT_INTERVAL", "0"))
+if REPORTS_DB_FILE:
+    DATABASES["reports"] = {
+        "ENGINE": "pacs.db.sqlite3",
+        "NAME": REPORTS_DB_FILE,
+        "READ_ONLY": True,
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["pacs.db.routers.ReportsRouter"]
+
+# A binary copy of the exchange rates, mmaped by all processes (see
+# exchangerates.rate_store). Exchange rates are read from the db if unset.
+EXCHANGE_RATES_STORE_FILE = os.environ.get("PACS_EXCHANGE_RATES_STORE_FILE", "")
+
+# Pragmas run on every new sqlite connection (django, sqlalchemy and report
+# workers). "tuned" lets readers run concurrently with a writer, but switches the
+# db to WAL (which stays on the db file), so it must be chosen explicitly.
+SQLITE_PRAGMA_PROFILES = {
+    "default": {},
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # Negative means KiB
+        "temp_store": "MEMORY",
+    },
+}
+SQLITE_PRAGMAS = SQLITE_PRAGMA_PROFILES[os.environ.get("PACS_SQLITE_PROFILE", "default")]
+
+
+# Reports: the per-account work can be split across a pool of workers.
+# One of "serial", "threads" or "processes".
+REPORTS_EXECUTION_MODE = os.environ.get("PACS_REPORTS_EXECUTION_MODE", "serial")
+REPORTS_EXECUTION_WORKERS = int(os.environ.get("PACS_REPORTS_EXECUTION_WORKERS", os.cpu_count()))
+
+# Where the balance and flow evolution reports are computed: "sql" or
+# "columnar" (in memory, see reports.columnar, which needs numpy).
+REPORTS_ENGINE = os.environ.get("PACS_REPORTS_ENGINE", "sql")
+
+# Seconds report results are cached for (see reports.cache). 0 disables it.
+REPORTS_CACHE_TIMEOUT = int(os.environ.get("PACS_REPORTS_CACHE_TIMEOUT", "3600"))
+# Larger results are not cached, so they are streamed without being all in
+# memory: json bodies over MAX_SIZE bytes, and balance evolution reports with
+# more than MAX_ITEMS items (accounts x dates).
+REPORTS_CACHE_MAX_SIZE = int(os.environ.get("PACS_REPORTS_CACHE_MAX_SIZE", str(2 ** 20)))
+REPORTS_CACHE_MAX_ITEMS = int(os.environ.get("PACS_REPORTS_CACHE_MAX_ITEMS", "10000"))
+
+# Where report requests with the "profile_reports" feature toggle save their
+# profiles (see reports.profiling). Profiling is disabled if empty.
+REPORTS_PROFILE_DIR = os.environ.get("PACS_REPORTS_PROFILE_DIR", "")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
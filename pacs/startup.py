@@ -0,0 +1,177 @@
+"""
+Prepares the db and the static files for the server to start (see
+docker/entrypoint), in one process, skipping the steps that are already done.
+Each step first runs a cheap check:
+
+- migrate: whether the migration plan is empty (one query to the migrations
+  table, instead of `migrate` building the state of every model);
+- collectstatic: whether a fingerprint of the found static files (their paths,
+  sizes and mtimes) is the one saved in STATIC_ROOT by the last run;
+- populate: whether the seed data exists (one query per table). Missing data
+  is created in bulk;
+- exchange rates store: whether the file, if one is configured (see
+  exchangerates.rate_store), has the exchange rates of the db (their number
+  and last date per currency, in one query).
+
+Then prints how long each step took:
+
+    python -m pacs.startup
+"""
+import hashlib
+import os
+import sys
+import time
+from typing import Callable, List, Optional, TextIO
+
+import attr
+
+# Ignored by collectstatic by default
+STATIC_IGNORE_PATTERNS = ["CVS", ".*", "*~"]
+STATIC_FINGERPRINT_FILE = ".pacs-static-fingerprint"
+
+
+@attr.s(frozen=True)
+class Step:
+    name: str = attr.ib()
+    # Whether the step is already done
+    is_done: Callable[[], bool] = attr.ib()
+    run: Callable[[], None] = attr.ib()
+
+
+@attr.s(frozen=True)
+class StepTiming:
+    name: str = attr.ib()
+    seconds: float = attr.ib()
+    skipped: bool = attr.ib()
+
+
+def has_unapplied_migrations() -> bool:
+    from django.db import DEFAULT_DB_ALIAS, connections
+    from django.db.migrations.executor import MigrationExecutor
+
+    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+    return bool(executor.migration_plan(executor.loader.graph.leaf_nodes()))
+
+
+def migrate() -> None:
+    from django.core.management import call_command
+
+    call_command("migrate", interactive=False)
+
+
+def get_static_fingerprint() -> str:
+    """Returns a hash of the paths, sizes and mtimes of the static files that
+    collectstatic would collect."""
+    from django.contrib.staticfiles.finders import get_finders
+
+    entries = []
+    for finder in get_finders():
+        for path, storage in finder.list(STATIC_IGNORE_PATTERNS):
+            prefixed_path = os.path.join(getattr(storage, "prefix", None) or "", path)
+            stat = os.stat(storage.path(path))
+            entries.append(f"{prefixed_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n")
+    return hashlib.sha256("".join(sorted(entries)).encode()).hexdigest()
+
+
+def _get_static_fingerprint_path() -> str:
+    from django.conf import settings
+
+    return os.path.join(settings.STATIC_ROOT, STATIC_FINGERPRINT_FILE)
+
+
+def _read_static_fingerprint() -> Optional[str]:
+    try:
+        with open(_get_static_fingerprint_path()) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def are_static_files_collected() -> bool:
+    return _read_static_fingerprint() == get_static_fingerprint()
+
+
+def collectstatic() -> None:
+    from django.core.management import call_command
+
+    call_command("collectstatic", interactive=False)
+    with open(_get_static_fingerprint_path(), "w") as f:
+        f.write(get_static_fingerprint())
+
+
+def _get_populators():
+    from accounts.management.commands.populate_accounts import (
+        account_populator,
+        account_type_populator,
+    )
+    from currencies.management.commands.populate_currencies import currency_populator
+
+    return [account_type_populator, account_populator, currency_populator]
+
+
+def is_populated() -> bool:
+    return all(x.is_populated() for x in _get_populators())
+
+
+def populate() -> None:
+    for populator in _get_populators():
+        populator()
+
+
+def is_exchange_rates_store_written() -> bool:
+    """Also if no store is configured, as there is nothing to write."""
+    from django.conf import settings
+
+    from exchangerates.rate_store import is_rate_store_current
+
+    path = settings.EXCHANGE_RATES_STORE_FILE
+    return not path or is_rate_store_current(path)
+
+
+def write_exchange_rates_store() -> None:
+    from django.conf import settings
+
+    from exchangerates.rate_store import write_rate_store
+
+    write_rate_store(settings.EXCHANGE_RATES_STORE_FILE)
+
+
+STEPS = [
+    Step("migrate", lambda: not has_unapplied_migrations(), migrate),
+    Step("collectstatic", are_static_files_collected, collectstatic),
+    Step("populate", is_populated, populate),
+    Step("exchange rates store", is_exchange_rates_store_written, write_exchange_rates_store),
+]
+
+
+def run_steps(steps: List[Step]) -> List[StepTiming]:
+    timings = []
+    for step in steps:
+        start = time.perf_counter()
+        skipped = step.is_done()
+        if not skipped:
+            step.run()
+        timings.append(StepTiming(step.name, time.perf_counter() - start, skipped))
+    return timings
+
+
+def print_timings(timings: List[StepTiming], out: TextIO = sys.stdout) -> None:
+    for timing in timings:
+        status = "skipped" if timing.skipped else "ran"
+        out.write(f"{timing.name:>22}: {timing.seconds:7.3f}s ({status})\n")
+    out.write(f"{'total':>22}: {sum(x.seconds for x in timings):7.3f}s\n")
+
+
+def main():
+    import django
+
+    start = time.perf_counter()
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pacs.settings")
+    django.setup()
+    timings = [StepTiming("django setup", time.perf_counter() - start, False)]
+    timings += run_steps(STEPS)
+    print_timings(timings)
+
+
+if __name__ == "__main__":
+    main()
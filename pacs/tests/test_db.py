@@ -0,0 +1,50 @@
+import sqlite3
+from unittest.mock import Mock, call
+
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from pacs.db.sqlite3.pragmas import apply_pragmas, get_pragma_statements
+
+
+class TestGetPragmaStatements:
+    pragmas = {"journal_mode": "WAL", "cache_size": -100}
+
+    def test_base(self):
+        assert get_pragma_statements(self.pragmas) == [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA cache_size=-100",
+        ]
+
+    def test_read_only_skips_persistent_pragmas(self):
+        assert get_pragma_statements(self.pragmas, read_only=True) == ["PRAGMA cache_size=-100"]
+
+
+class TestApplyPragmas:
+    def test_uses_settings_by_default(self):
+        dbapi_connection = Mock()
+        with override_settings(SQLITE_PRAGMAS={"temp_store": "MEMORY"}):
+            apply_pragmas(dbapi_connection)
+        cursor = dbapi_connection.cursor.return_value
+        assert cursor.execute.call_args_list == [call("PRAGMA temp_store=MEMORY")]
+        assert cursor.close.call_args_list == [call()]
+
+    def test_on_sqlite_connection(self):
+        dbapi_connection = sqlite3.connect(":memory:")
+        apply_pragmas(dbapi_connection, {"cache_size": -1234})
+        assert dbapi_connection.execute("PRAGMA cache_size").fetchone() == (-1234,)
+
+
+class TestDatabaseWrapper(TestCase):
+    def test_default_profile_keeps_the_journal_mode(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            assert cursor.fetchone() != ("wal",)
+
+    def test_applies_settings_pragmas(self):
+        with override_settings(SQLITE_PRAGMAS={"temp_store": "MEMORY"}):
+            new_connection = connection.get_new_connection(connection.get_connection_params())
+        try:
+            assert new_connection.execute("PRAGMA temp_store").fetchone() == (2,)
+        finally:
+            new_connection.close()
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.http import StreamingHttpResponse
+from django.test import override_settings
+
+import featuretoggles.snapshot
+from common.testutils import PacsTestCase
+from pacs.handlers import PacsASGIHandler, ReadOnlyRoute, StreamedChunks
+
+
+class TestReadOnlyRoute:
+    def test_matches_path_and_method(self):
+        route = ReadOnlyRoute.from_dict({"path": r"^/foo/[0-9]+/$", "methods": ["GET"]})
+        assert route.matches(Mock(method="GET", path="/foo/12/"))
+        assert not route.matches(Mock(method="POST", path="/foo/12/"))
+        assert not route.matches(Mock(method="GET", path="/foo/bar/"))
+
+
+class TestPacsASGIHandler(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.handler = PacsASGIHandler()
+
+    def test_uses_read_only_executor_for_reports(self):
+        for (method, path) in [
+            ("POST", "/reports/balance-evolution/"),
+            ("POST", "/reports/flow-evolution/"),
+            ("POST", "/reports/tag-flow-evolution/"),
+            ("GET", "/accounts/12/journal/"),
+            ("GET", "/accounts/12/tree/"),
+            ("GET", "/exchange_rates/data/v2"),
+        ]:
+            request = Mock(method=method, path=path)
+            assert self.handler.get_executor(request) is self.handler.read_only_executor
+
+    def test_uses_default_executor_for_everything_else(self):
+        for (method, path) in [
+            ("GET", "/accounts/"),
+            ("PATCH", "/accounts/12/"),
+            ("POST", "/exchange_rates/data/v2"),
+            ("GET", "/reports/balance-evolution/"),
+        ]:
+            request = Mock(method=method, path=path)
+            assert self.handler.get_executor(request) is self.handler.default_executor
+
+    def stream(self, content):
+        """Returns the messages sent for a streamed response with `content`."""
+        response = StreamingHttpResponse(content)
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async def run():
+            with patch(
+                "django.core.handlers.base.BaseHandler.get_response", return_value=response
+            ):
+                out = await self.handler.get_response(Mock(method="GET", path="/accounts/"))
+            await self.handler.send_response(out, send)
+
+        async_to_sync(run)()
+        return messages
+
+    def test_streams_responses_from_the_pool_thread(self):
+        threads = []
+
+        def content():
+            for chunk in (b"foo", b"bar"):
+                threads.append(threading.current_thread().name)
+                yield chunk
+
+        messages = self.stream(content())
+        assert [x.get("body") for x in messages[1:]] == [b"foo", b"bar", None]
+        assert [x.get("more_body") for x in messages[1:]] == [True, True, None]
+        assert all(x.startswith("pacs-default") for x in threads)
+
+    def test_raises_errors_while_streaming(self):
+        def content():
+            yield b"foo"
+            raise ValueError()
+
+        with pytest.raises(ValueError):
+            self.stream(content())
+
+    def test_stops_producing_when_stopped(self):
+        produced = []
+        chunks = StreamedChunks(None, None)
+
+        async def run():
+            chunks.loop = asyncio.get_event_loop()
+            chunks.queue = asyncio.Queue(1)
+            producer = chunks.loop.run_in_executor(None, chunks.produce, content())
+            assert await chunks.get() == b"foo"
+            chunks.stop()
+            await producer
+
+        def content():
+            for i in range(100):
+                produced.append(i)
+                yield b"foo"
+
+        async_to_sync(run)()
+        assert chunks.stopped is True
+        assert len(produced) < 100
+
+    @override_settings(ASGI_READ_ONLY_THREADS=1, ASGI_DEFAULT_THREADS=1)
+    def test_serves_requests(self):
+        # Loads the feature toggles here, so that the pool thread does not need the db
+        featuretoggles.snapshot.get_snapshot()
+        handler = PacsASGIHandler()
+        assert handler.read_only_executor._max_workers == 1
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/auth/test",
+            "query_string": b"",
+            "headers": [(b"host", b"testserver"), (b"authorization", b"TOKEN valid_token")],
+        }
+
+        async def run():
+            communicator = ApplicationCommunicator(handler, scope)
+            await communicator.send_input({"type": "http.request"})
+            start = await communicator.receive_output(5)
+            body = await communicator.receive_output(5)
+            return start, body
+
+        start, body = async_to_sync(run)()
+        assert start["status"] == 200
+        assert body["type"] == "http.response.body"
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import tempfile
+import time
+from unittest.mock import Mock, patch
+
+from django.db import DEFAULT_DB_ALIAS
+from django.test import TestCase, override_settings
+
+import pacs.db.routers as sut
+import pacs.db.snapshots as snapshots
+from common.testutils import reports_db
+
+
+class TestReportsRouter:
+    router = sut.ReportsRouter()
+
+    def test_reads_from_default_without_reports_db(self):
+        with sut.use_reports_db():
+            assert self.router.db_for_read(Mock()) == DEFAULT_DB_ALIAS
+
+    def test_reads_from_reports_db_only_inside_context(self):
+        with reports_db("/tmp/foo.sqlite3"):
+            assert self.router.db_for_read(Mock()) == DEFAULT_DB_ALIAS
+            with sut.use_reports_db():
+                assert self.router.db_for_read(Mock()) == sut.REPORTS_DB_ALIAS
+            assert self.router.db_for_read(Mock()) == DEFAULT_DB_ALIAS
+
+    def test_iter_in_reports_db_reads_each_item_inside_context(self):
+        def get_items():
+            yield self.router.db_for_read(Mock())
+            yield self.router.db_for_read(Mock())
+
+        with reports_db("/tmp/foo.sqlite3"):
+            items = sut.iter_in_reports_db(get_items)
+            assert next(items) == sut.REPORTS_DB_ALIAS
+            # Not while the caller handles the item
+            assert self.router.db_for_read(Mock()) == DEFAULT_DB_ALIAS
+            assert list(items) == [sut.REPORTS_DB_ALIAS]
+
+    def test_always_writes_to_default(self):
+        with reports_db("/tmp/foo.sqlite3"), sut.use_reports_db():
+            assert self.router.db_for_write(Mock()) == DEFAULT_DB_ALIAS
+
+    def test_only_migrates_default(self):
+        assert self.router.allow_migrate(DEFAULT_DB_ALIAS, "accounts") is True
+        assert self.router.allow_migrate(sut.REPORTS_DB_ALIAS, "accounts") is False
+
+
+class TestSnapshots(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.db_file = os.path.join(tempfile.mkdtemp(), "reports.sqlite3")
+
+    def tearDown(self):
+        super().tearDown()
+        if os.path.exists(self.db_file):
+            os.remove(self.db_file)
+        os.rmdir(os.path.dirname(self.db_file))
+
+    def test_refresh_snapshot(self):
+        snapshots.refresh_snapshot(self.db_file)
+        dbapi_connection = sqlite3.connect(self.db_file)
+        try:
+            tables = dbapi_connection.execute("SELECT name FROM sqlite_master").fetchall()
+            journal_mode = dbapi_connection.execute("PRAGMA journal_mode").fetchone()
+        finally:
+            dbapi_connection.close()
+        assert ("movements_movement",) in tables
+        assert journal_mode == ("delete",)
+        assert os.listdir(os.path.dirname(self.db_file)) == ["reports.sqlite3"]
+
+    def test_is_stale(self):
+        assert snapshots.is_stale(self.db_file, 10)
+        snapshots.refresh_snapshot(self.db_file)
+        assert not snapshots.is_stale(self.db_file, 10)
+        past = time.time() - 11
+        os.utime(self.db_file, (past, past))
+        assert snapshots.is_stale(self.db_file, 10)
+
+    @patch.object(snapshots, "refresh_snapshot")
+    def test_refresh_snapshot_if_stale(self, m_refresh_snapshot):
+        with reports_db(self.db_file):
+            with override_settings(REPORTS_DB_SNAPSHOT_INTERVAL=0):
+                assert snapshots.refresh_snapshot_if_stale(sut.REPORTS_DB_ALIAS) is False
+            with override_settings(REPORTS_DB_SNAPSHOT_INTERVAL=10):
+                assert snapshots.refresh_snapshot_if_stale(sut.REPORTS_DB_ALIAS) is True
+        m_refresh_snapshot.assert_called_once_with(self.db_file)
@@ -0,0 +1,114 @@
+import io
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from django.test import TestCase, override_settings
+
+import pacs.startup as sut
+from accounts.models import Account, AccountType
+from currencies.models import Currency
+from exchangerates.models import ExchangeRate
+from movements.models import LedgerVersion
+
+
+class TestRunSteps:
+    def test_skips_the_steps_already_done(self):
+        done = sut.Step("done", lambda: True, Mock())
+        not_done = sut.Step("not done", lambda: False, Mock())
+        timings = sut.run_steps([done, not_done])
+        assert done.run.call_count == 0
+        assert not_done.run.call_count == 1
+        assert [(x.name, x.skipped) for x in timings] == [("done", True), ("not done", False)]
+
+    def test_print_timings(self):
+        out = io.StringIO()
+        sut.print_timings([sut.StepTiming("one", 1.5, True), sut.StepTiming("two", 2, False)], out)
+        assert out.getvalue().splitlines() == [
+            "                   one:   1.500s (skipped)",
+            "                   two:   2.000s (ran)",
+            "                 total:   3.500s",
+        ]
+
+
+class TestHasUnappliedMigrations(TestCase):
+    @patch("django.db.migrations.executor.MigrationExecutor.migration_plan")
+    def test_from_the_migration_plan(self, m_migration_plan):
+        m_migration_plan.return_value = []
+        assert sut.has_unapplied_migrations() is False
+        m_migration_plan.return_value = [(Mock(), False)]
+        assert sut.has_unapplied_migrations() is True
+
+
+class TestStaticFiles(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.src_dir = os.path.join(self.tmp_dir.name, "src")
+        os.mkdir(self.src_dir)
+        self.write_src_file("one.css")
+        self.settings_override = override_settings(
+            STATIC_ROOT=os.path.join(self.tmp_dir.name, "static"), STATICFILES_DIRS=[self.src_dir]
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def write_src_file(self, name, content="body {}"):
+        with open(os.path.join(self.src_dir, name), "w") as f:
+            f.write(content)
+
+    def test_collected_until_they_change(self):
+        assert sut.are_static_files_collected() is False
+        with patch("sys.stdout", io.StringIO()):
+            sut.collectstatic()
+        assert sut.are_static_files_collected() is True
+        self.write_src_file("one.css", "body { color: red }")
+        assert sut.are_static_files_collected() is False
+
+    def test_fingerprint_changes_with_new_files(self):
+        fingerprint = sut.get_static_fingerprint()
+        assert sut.get_static_fingerprint() == fingerprint
+        self.write_src_file("two.css")
+        assert sut.get_static_fingerprint() != fingerprint
+
+
+class TestPopulate(TestCase):
+    def test_populates_once(self):
+        assert sut.is_populated() is False
+        with patch("builtins.print"):
+            sut.populate()
+        assert sut.is_populated() is True
+        assert AccountType.objects.count() == 3
+        assert Account.objects.count() == 1
+        assert Currency.objects.count() == 3
+        version = LedgerVersion.objects.get_version()
+        assert version > 0
+        with patch("builtins.print"), self.assertNumQueries(3):
+            sut.populate()
+        assert LedgerVersion.objects.get_version() == version
+
+
+class TestExchangeRatesStore(TestCase):
+    def test_written_if_not_configured(self):
+        with override_settings(EXCHANGE_RATES_STORE_FILE=""):
+            assert sut.is_exchange_rates_store_written() is True
+
+    def test_written_until_the_db_changes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "rates.bin")
+            with override_settings(EXCHANGE_RATES_STORE_FILE=path):
+                assert sut.is_exchange_rates_store_written() is False
+                sut.write_exchange_rates_store()
+                assert sut.is_exchange_rates_store_written() is True
+                ExchangeRate.objects.create(
+                    currency_code="EUR", date=date(2020, 1, 1), value=Decimal("1.1")
+                )
+                assert sut.is_exchange_rates_store_written() is False
+                sut.write_exchange_rates_store()
+                assert sut.is_exchange_rates_store_written() is True
@@ -20,11 +20,16 @@ from rest_framework.routers import DefaultRouter
 
 import exchangerates.views
 import featuretoggles.views
+import metrics.views
 import pacs_auth.views
 from accounts.views import AccountViewSet
 from currencies.views import CurrencyViewSet
 from movements.views import TransactionViewSet
-from reports.views import balance_evolution_view, flow_evolution_view
+from reports.views import (
+    balance_evolution_view,
+    flow_evolution_view,
+    tag_flow_evolution_view,
+)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -39,12 +44,14 @@ urlpatterns += router.urls
 
 urlpatterns += [
     path(r"reports/flow-evolution/", flow_evolution_view),
+    path(r"reports/tag-flow-evolution/", tag_flow_evolution_view),
     path(f"reports/balance-evolution/", balance_evolution_view),
     path(f"exchange_rates/data/v2", exchangerates.views.exchangerates),
     path(f"auth/token", pacs_auth.views.token_view),
     path(f"auth/api_key", pacs_auth.views.post_api_key),
     path(f"auth/test", pacs_auth.views.get_test),
     path(f"featuretoggles", featuretoggles.views.get_featuretoggles),
+    path(f"metrics", metrics.views.get_metrics),
 ]
 
 if settings.DEBUG:
@@ -2,6 +2,7 @@ import logging
 
 from django.core.exceptions import PermissionDenied
 
+from metrics.timings import timer
 from pacs_auth.services import AuthorizerFactory
 
 logger = logging.getLogger(__name__)
@@ -12,6 +13,7 @@ class PacsAuthMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        authorizer = AuthorizerFactory(request)()
-        authorizer.run_validation()
+        with timer("auth"):
+            authorizer = AuthorizerFactory(request)()
+            authorizer.run_validation()
         return self.get_response(request)
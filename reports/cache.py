@@ -0,0 +1,170 @@
+"""
+Cache of report results.
+
+Results are keyed by the report name, the `LedgerVersion` and a hash of the
+normalized inputs. Any write to the ledger bumps the version, so a cached
+result is never stale: it is simply not found anymore.
+
+Balance evolution reports are also cached before serialization, so that a
+request for more dates reuses the report of a request for its first dates
+(e.g. a dashboard polling with a growing list of dates) and only queries the
+movements after them.
+
+Large results are not cached, so that they can be streamed without ever being
+all in memory (see `REPORTS_CACHE_MAX_SIZE` and `REPORTS_CACHE_MAX_ITEMS`).
+"""
+import hashlib
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import attr
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+
+from movements.models import LedgerVersion
+from pacs.db.routers import use_reports_db
+
+from .reports import (
+    BalanceEvolutionQuery,
+    BalanceEvolutionReport,
+    BalanceEvolutionReportData,
+)
+from .view_models import BalanceEvolutionInput
+
+
+def _normalize(x):
+    """Converts report inputs to plain json values."""
+    if isinstance(x, Model):
+        return x.pk
+    if isinstance(x, date):
+        return x.isoformat()
+    if isinstance(x, Decimal):
+        return str(x.normalize())
+    if isinstance(x, (list, tuple)):
+        return [_normalize(y) for y in x]
+    if attr.has(type(x)):
+        return {f.name: _normalize(getattr(x, f.name)) for f in attr.fields(type(x))}
+    if x is None or isinstance(x, (str, int, float)):
+        return x
+    # e.g. NOINPUT
+    return repr(x)
+
+
+def get_inputs_hash(inputs) -> str:
+    normalized = json.dumps(_normalize(inputs), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+@attr.s(frozen=True)
+class ReportCache:
+    name: str = attr.ib()
+    timeout: int = attr.ib(factory=lambda: settings.REPORTS_CACHE_TIMEOUT)
+    # Streamed results over this many bytes are not cached
+    max_size: int = attr.ib(factory=lambda: settings.REPORTS_CACHE_MAX_SIZE)
+
+    def get_key(self, inputs, ledger_version: int) -> str:
+        return f"reports_{self.name}_{ledger_version}_{get_inputs_hash(inputs)}"
+
+    def get_or_compute(self, inputs, compute_fn: Callable[[], Any]) -> Any:
+        """Returns the cached result for `inputs`, calling `compute_fn` to
+        compute (and cache) it if missing."""
+        if not self.timeout:
+            return compute_fn()
+        # The version of the db the report reads from
+        with use_reports_db():
+            ledger_version = LedgerVersion.objects.get_version()
+        key = self.get_key(inputs, ledger_version)
+        result = cache.get(key)
+        if result is None:
+            result = compute_fn()
+            cache.set(key, result, self.timeout)
+        return result
+
+    def get_or_stream(self, inputs, stream_fn: Callable[[], Iterable[bytes]]) -> Iterator[bytes]:
+        """Like `get_or_compute`, for results streamed as chunks of bytes. A
+        missing result is cached once fully streamed, unless it is larger than
+        `max_size`, so larger results are never kept in memory."""
+        if not self.timeout:
+            yield from stream_fn()
+            return
+        with use_reports_db():
+            ledger_version = LedgerVersion.objects.get_version()
+        key = self.get_key(inputs, ledger_version)
+        result = cache.get(key)
+        if result is not None:
+            yield result
+            return
+        chunks, size = [], 0
+        for chunk in stream_fn():
+            size += len(chunk)
+            if size <= self.max_size:
+                chunks.append(chunk)
+            else:
+                chunks.clear()
+            yield chunk
+        if size <= self.max_size:
+            cache.set(key, b"".join(chunks), self.timeout)
+
+
+@attr.s(frozen=True)
+class BalanceEvolutionReportCache:
+    timeout: int = attr.ib(factory=lambda: settings.REPORTS_CACHE_TIMEOUT)
+    # Reports with more data (accounts x dates) than this are not cached
+    max_items: int = attr.ib(factory=lambda: settings.REPORTS_CACHE_MAX_ITEMS)
+
+    @staticmethod
+    def get_keys(inputs: BalanceEvolutionInput, ledger_version: int) -> List[str]:
+        """Returns the keys for the sorted dates of `inputs` and each of their
+        prefixes, longest first. The dates are hashed incrementally, so this is
+        linear on the number of dates."""
+        prefix = f"reports_balance_evolution_report_{ledger_version}"
+        # The report only depends on the dates, and not on how they were given
+        inputs_hash = get_inputs_hash(attr.evolve(inputs, dates=[], date_series=None))
+        dates_hash = hashlib.sha256()
+        keys = []
+        for dt in sorted(inputs.dates):
+            dates_hash.update(dt.isoformat().encode())
+            hexdigest = dates_hash.copy().hexdigest()
+            keys.append(f"{prefix}_{inputs_hash}_{hexdigest}")
+        return keys[::-1]
+
+    def _get_longest_cached(
+        self, keys: List[str], n_accounts: int
+    ) -> Tuple[Optional[str], Optional[BalanceEvolutionReport]]:
+        """Returns the first of `keys` (see `get_keys`) that is cached, and its
+        report, or `(None, None)`."""
+        # Longer prefixes are too large to have been cached
+        n_cacheable = self.max_items // max(n_accounts, 1)
+        cached = cache.get_many(keys[-n_cacheable:] if n_cacheable else [])
+        return next(((x, cached[x]) for x in keys if x in cached), (None, None))
+
+    def _is_cacheable(self, inputs: BalanceEvolutionInput) -> bool:
+        return len(inputs.accounts) * len(inputs.dates) <= self.max_items
+
+    def run(self, inputs: BalanceEvolutionInput) -> BalanceEvolutionReport:
+        """Runs the query for `inputs`, starting from the cached report of the
+        longest prefix of its dates. Must run in the db the report reads from."""
+        if not self.timeout or not inputs.dates:
+            return BalanceEvolutionQuery(**inputs.as_dict()).run()
+        keys = self.get_keys(inputs, LedgerVersion.objects.get_version())
+        key, prefix_report = self._get_longest_cached(keys, len(inputs.accounts))
+        if key == keys[0]:
+            return prefix_report
+        report = BalanceEvolutionQuery(**inputs.as_dict(), prefix_report=prefix_report).run()
+        if self._is_cacheable(inputs):
+            cache.set(keys[0], report, self.timeout)
+        return report
+
+    def iter_data(self, inputs: BalanceEvolutionInput) -> Iterator[BalanceEvolutionReportData]:
+        """Like `run`, yielding the data of the report. Reports too large to be
+        cached (or with the cache disabled) are yielded as they are computed."""
+        if not self.timeout or not inputs.dates:
+            return BalanceEvolutionQuery(**inputs.as_dict()).iter_data()
+        if self._is_cacheable(inputs):
+            return iter(self.run(inputs).data)
+        keys = self.get_keys(inputs, LedgerVersion.objects.get_version())
+        _, prefix_report = self._get_longest_cached(keys, len(inputs.accounts))
+        return BalanceEvolutionQuery(**inputs.as_dict(), prefix_report=prefix_report).iter_data()
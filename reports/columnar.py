@@ -0,0 +1,332 @@
+"""
+An in-memory, columnar copy of the movements, used instead of sql to answer
+the balance and flow evolution reports if `settings.REPORTS_ENGINE` is
+"columnar". It needs numpy, which is an optional dependency.
+
+The movements are kept in numpy arrays sorted by date: the date (as an
+ordinal), the `lft` of the account, the currency and the quantity in minor
+units (see `Movement.quantity_minor`). The movements of an account and its
+descendants are the ones with a `lft` in its range, and they are split into
+date groups or periods with `searchsorted` over their dates. Quantities are
+summed as int64s, so exactly (`bincount` would sum them as float64s).
+
+Each process keeps a ledger per db, at the `LedgerVersion` it was loaded at.
+The writes of this process are applied to it after their db transaction
+commits, one version after the other. A version it did not see (a write of
+another process, or a bulk write that sends no signals) makes it be loaded
+again when next used.
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+from datetime import date
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import attr
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.db.transaction import on_commit
+
+from .executors import execute_query, get_db_name
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+if TYPE_CHECKING:
+    from accounts.models import Account
+    from reports.reports import Period
+
+SQL = "sql"
+COLUMNAR = "columnar"
+
+# The python date ordinal of an sqlite date
+_DATE_ORDINAL_SQL = "CAST(julianday({}) - 1721424.5 AS INTEGER)"
+
+# The columns of a movement, in the order they are loaded
+_COLUMNS = ["movement_ids", "transaction_ids", "dates", "account_ids", "currency_ids", "quantities"]
+
+_LOAD_SQL = f"""
+SELECT m.id, m.transaction_id, {_DATE_ORDINAL_SQL.format("t.date")}, m.account_id,
+       m.currency_id, m.quantity_minor
+FROM movements_movement m JOIN movements_transaction t ON t.id = m.transaction_id
+ORDER BY t.date, m.id
+"""
+
+# Writes not yet applied to a ledger, above which it is loaded again instead
+MAX_PENDING_WRITES = 10000
+
+
+def is_enabled() -> bool:
+    """Whether reports use the columnar engine."""
+    engine = settings.REPORTS_ENGINE
+    if engine == SQL:
+        return False
+    if engine == COLUMNAR:
+        if np is None:
+            raise ImproperlyConfigured("The columnar reports engine needs numpy")
+        return True
+    raise ValueError(f"Unknown reports engine: {engine}")
+
+
+@attr.s(frozen=True)
+class Write:
+    """A write to the ledger, made at `version`. Only the changes to the
+    movements, their dates and the accounts matter here."""
+
+    version: int = attr.ib()
+    # (id, transaction_id, date ordinal, account_id, currency_id, quantity_minor)
+    added_movements: List[Tuple[int, ...]] = attr.ib(factory=list)
+    deleted_movement_ids: List[int] = attr.ib(factory=list)
+    # {transaction_id: date ordinal}
+    transaction_dates: Dict[int, int] = attr.ib(factory=dict)
+    accounts_changed: bool = attr.ib(default=False)
+
+
+@attr.s(frozen=True)
+class ColumnarLedger:
+    """The movements of a db at a version, one int64 array per column, sorted
+    by date."""
+
+    version: int = attr.ib()
+    movement_ids = attr.ib()
+    transaction_ids = attr.ib()
+    dates = attr.ib()
+    account_ids = attr.ib()
+    currency_ids = attr.ib()
+    quantities = attr.ib()
+    # {account_id: lft}, as an array, and the `lft` of the account of each movement
+    lft_per_account_id = attr.ib()
+    lfts = attr.ib()
+
+    @classmethod
+    def load(cls) -> ColumnarLedger:
+        """Loads the movements of the db `execute_query` reads from."""
+        version = _query_version()
+        values = itertools.chain.from_iterable(execute_query(_LOAD_SQL))
+        rows = np.fromiter(values, dtype=np.int64).reshape(-1, len(_COLUMNS))
+        columns = dict(zip(_COLUMNS, rows.T.copy()))
+        return cls._with_lfts(version, columns, _query_lft_per_account_id())
+
+    @classmethod
+    def _with_lfts(cls, version: int, columns: Dict, lft_per_account_id) -> ColumnarLedger:
+        lfts = lft_per_account_id[columns["account_ids"]]
+        return cls(version=version, lft_per_account_id=lft_per_account_id, lfts=lfts, **columns)
+
+    def apply(self, writes: List[Write]) -> ColumnarLedger:
+        """Returns the ledger after `writes`, made in order after its version."""
+        added: Dict[int, Tuple[int, ...]] = {}
+        deleted = set()
+        transaction_dates: Dict[int, int] = {}
+        for write in writes:
+            for movement_id in write.deleted_movement_ids:
+                added.pop(movement_id, None)
+                deleted.add(movement_id)
+            added.update((x[0], x) for x in write.added_movements)
+            transaction_dates.update(write.transaction_dates)
+
+        # Movements whose transaction changed date are taken out and inserted
+        # again, as the new ones
+        columns = {x: getattr(self, x) for x in _COLUMNS}
+        removed = np.isin(columns["movement_ids"], list(deleted | set(added)))
+        redated = ~removed & np.isin(columns["transaction_ids"], list(transaction_dates))
+        new_rows = np.array(list(added.values()), dtype=np.int64).reshape(-1, len(_COLUMNS))
+        new_rows = np.concatenate([np.stack([columns[x][redated] for x in _COLUMNS], 1), new_rows])
+        for transaction_id, date_ordinal in transaction_dates.items():
+            new_rows[new_rows[:, 1] == transaction_id, 2] = date_ordinal
+        new_rows = new_rows[np.lexsort((new_rows[:, 0], new_rows[:, 2]))]
+
+        kept = ~(removed | redated)
+        positions = np.searchsorted(columns["dates"][kept], new_rows[:, 2], side="right")
+        columns = {
+            x: np.insert(column[kept], positions, new_rows[:, i])
+            for i, (x, column) in enumerate(columns.items())
+        }
+        lft_per_account_id = self.lft_per_account_id
+        accounts_changed = any(x.accounts_changed for x in writes)
+        if accounts_changed or np.any(new_rows[:, 3] >= len(lft_per_account_id)):
+            lft_per_account_id = _query_lft_per_account_id()
+        return self._with_lfts(writes[-1].version, columns, lft_per_account_id)
+
+    def _select(self, account: Account):
+        """Returns the indexes of the movements of an account and its
+        descendants, sorted by date."""
+        return np.flatnonzero((self.lfts >= account.lft) & (self.lfts <= account.rght))
+
+    def get_balance_evolution_rows(
+        self, account: Account, dates: List[date], n_prefix_dates: int
+    ) -> List[Tuple[int, int, int]]:
+        """Returns the rows of `BalanceEvolutionQuery._run_query`:
+        (currency_id, quantity_minor__sum, date_group). A movement is in the
+        group of the first of `dates` on or after it."""
+        indexes = self._select(account)
+        date_ordinals = np.array([x.toordinal() for x in dates], dtype=np.int64)
+        date_groups = np.searchsorted(date_ordinals, self.dates[indexes], side="left")
+        # Date groups of the prefix are already summed
+        in_groups = (date_groups >= n_prefix_dates) & (date_groups < len(dates))
+        indexes, date_groups = indexes[in_groups], date_groups[in_groups]
+        currency_ids, sums, group_indexes = self._sum_per_group(indexes, date_groups)
+        return list(zip(currency_ids.tolist(), sums.tolist(), date_groups[group_indexes].tolist()))
+
+    def get_flow_evolution_rows(
+        self, account: Account, periods: List[Period], by_date: bool
+    ) -> List[Tuple[int, int, Optional[date], int]]:
+        """Returns rows as `FlowEvolutionQuery._get_query`: (currency_id,
+        sum(quantity_minor), date, period_index), with the date None and one
+        row per period (instead of per date) if not `by_date`."""
+        indexes = self._select(account)
+        dates = self.dates[indexes]
+        period_indexes = np.zeros(len(indexes), dtype=np.int64)
+        # As the CASE in sql, a date in many periods is in the first one
+        for i, period in reversed(list(enumerate(periods, 1))):
+            start = np.searchsorted(dates, period.start.toordinal(), side="left")
+            end = np.searchsorted(dates, period.end.toordinal(), side="right")
+            period_indexes[start:end] = i
+        in_periods = period_indexes > 0
+        indexes, period_indexes = indexes[in_periods], period_indexes[in_periods]
+        keys = self.dates[indexes] if by_date else period_indexes
+        currency_ids, sums, group_indexes = self._sum_per_group(indexes, keys)
+        if by_date:
+            group_dates = [date.fromordinal(x) for x in keys[group_indexes].tolist()]
+        else:
+            # Sorted as sql (by date) sorts them, which is the order of the moneys
+            # of the flows. `group_indexes` are of the first movement of each group.
+            order = np.lexsort((currency_ids, self.dates[indexes][group_indexes]))
+            currency_ids, sums, group_indexes = (
+                currency_ids[order],
+                sums[order],
+                group_indexes[order],
+            )
+            group_dates = [None] * len(group_indexes)
+        group_periods = period_indexes[group_indexes].tolist()
+        return list(zip(currency_ids.tolist(), sums.tolist(), group_dates, group_periods))
+
+    def _sum_per_group(self, indexes, keys):
+        """Sums the quantities of the movements at `indexes` per key and
+        currency. Returns the currency_ids, the sums, and the position in
+        `indexes` (and `keys`) of a movement of each group, sorted by key."""
+        if len(indexes) == 0:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, empty
+        currency_ids = self.currency_ids[indexes]
+        order = np.lexsort((currency_ids, keys))
+        sorted_keys, sorted_currency_ids = keys[order], currency_ids[order]
+        is_start = np.empty(len(order), dtype=bool)
+        is_start[0] = True
+        is_start[1:] = (sorted_keys[1:] != sorted_keys[:-1]) | (
+            sorted_currency_ids[1:] != sorted_currency_ids[:-1]
+        )
+        starts = np.flatnonzero(is_start)
+        sums = np.add.reduceat(self.quantities[indexes][order], starts)
+        return sorted_currency_ids[starts], sums, order[starts]
+
+
+def _query_version() -> int:
+    rows = list(execute_query("SELECT version FROM movements_ledgerversion WHERE id = 1"))
+    return rows[0][0] if rows else 0
+
+
+def _query_lft_per_account_id():
+    rows = np.array(list(execute_query("SELECT id, lft FROM accounts_account")), dtype=np.int64)
+    rows = rows.reshape(-1, 2)
+    out = np.zeros(rows[:, 0].max() + 1 if len(rows) else 1, dtype=np.int64)
+    out[rows[:, 0]] = rows[:, 1]
+    return out
+
+
+# The ledger of each db and the writes committed since it was loaded
+_ledgers: Dict[str, ColumnarLedger] = {}
+_pending_writes: Dict[str, List[Write]] = {}
+_lock = threading.Lock()
+
+
+def get_ledger() -> ColumnarLedger:
+    """Returns the ledger of the db `execute_query` reads from, up to date."""
+    db_name = get_db_name()
+    version = _query_version()
+    with _lock:
+        ledger = _ledgers.get(db_name)
+        pending_writes = _pending_writes.pop(db_name, [])
+        if ledger is not None and pending_writes and pending_writes[-1].version == version:
+            ledger = ledger.apply(pending_writes)
+        elif ledger is None or ledger.version != version:
+            ledger = ColumnarLedger.load()
+        _ledgers[db_name] = ledger
+        return ledger
+
+
+def reset() -> None:
+    """Forgets all ledgers, so that they are loaded again."""
+    with _lock:
+        _ledgers.clear()
+        _pending_writes.clear()
+
+
+def _record_write(db_name: str, write: Write) -> None:
+    """Keeps a committed write, to be applied to the ledger of its db."""
+    with _lock:
+        ledger = _ledgers.get(db_name)
+        if ledger is None:
+            return
+        pending_writes = _pending_writes.setdefault(db_name, [])
+        last_version = pending_writes[-1].version if pending_writes else ledger.version
+        if write.version == last_version + 1 and len(pending_writes) < MAX_PENDING_WRITES:
+            pending_writes.append(write)
+        else:
+            # Some write was not seen
+            _ledgers.pop(db_name)
+            _pending_writes.pop(db_name)
+
+
+def _get_write(sender, instance, version: int, deleted: bool) -> Write:
+    from accounts.models import Account
+    from movements.models import Movement, Transaction
+
+    if sender is Movement:
+        if deleted:
+            return Write(version, deleted_movement_ids=[instance.pk])
+        date_ = Transaction._meta.get_field("date").to_python(instance.transaction.date)
+        row = (
+            instance.pk,
+            instance.transaction_id,
+            date_.toordinal(),
+            instance.account_id,
+            instance.currency_id,
+            instance.quantity_minor,
+        )
+        # An update is a delete and an insert
+        return Write(version, added_movements=[row], deleted_movement_ids=[instance.pk])
+    if sender is Transaction and not deleted:
+        # The movements of a deleted transaction are deleted with their own signals
+        date_ = Transaction._meta.get_field("date").to_python(instance.date)
+        return Write(version, transaction_dates={instance.pk: date_.toordinal()})
+    return Write(version, accounts_changed=sender is Account)
+
+
+def track_write(sender, instance, signal, using, **kwargs) -> None:
+    """Receives the signals of every write that bumps the `LedgerVersion`
+    (after it is bumped) and keeps the write, once committed."""
+    # Not `is_enabled`, so that writes never fail because of reports settings
+    if settings.REPORTS_ENGINE != COLUMNAR:
+        return
+    from movements.models import LedgerVersion
+
+    version = LedgerVersion.objects.using(using).get_version()
+    write = _get_write(sender, instance, version, deleted=signal is post_delete)
+    db_name = connections[using].settings_dict["NAME"]
+    on_commit(partial(_record_write, db_name, write), using=using)
+
+
+def connect_signals() -> None:
+    from accounts.models import Account
+    from currencies.models import Currency
+    from movements.models import Movement, Transaction, TransactionTag
+
+    for sender in [Account, Currency, TransactionTag, Transaction, Movement]:
+        post_save.connect(track_write, sender=sender)
+        post_delete.connect(track_write, sender=sender)
@@ -0,0 +1,188 @@
+"""
+Executors used to run the per-account work of the reports.
+
+By default the work runs serially, in the request thread. If
+`settings.REPORTS_EXECUTION_MODE` is "threads" or "processes", the accounts are
+split across a pool of `settings.REPORTS_EXECUTION_WORKERS` workers instead,
+and the results are returned in the same order as the accounts. Inside a pool
+worker, `execute_query` reads through a read-only sqlite connection owned by
+that worker. Reads go to the reports db when inside `use_reports_db`.
+
+Worker processes are spawned, not forked: a fork from a threaded server could
+copy a lock held by another thread (e.g. `SqlAlchemyLoader._lock`), which would
+never be released in the child. Each of them sets up django when it starts.
+"""
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+import attr
+from django.conf import settings
+from django.db import connections
+
+from pacs.db.routers import get_reports_db_alias
+from pacs.db.sqlite3.pragmas import apply_pragmas
+
+SERIAL = "serial"
+THREADS = "threads"
+PROCESSES = "processes"
+
+# Per-thread worker state: the db being read and the read-only connections.
+_local = threading.local()
+# All read-only connections of this process, to close them on shutdown
+_read_only_connections: List[sqlite3.Connection] = []
+_read_only_connections_lock = threading.Lock()
+
+
+def _get_read_only_connection(db_name: str) -> sqlite3.Connection:
+    """Returns the read-only connection of this worker, creating it if needed."""
+    read_only_connections = getattr(_local, "connections", None)
+    if read_only_connections is None:
+        read_only_connections = _local.connections = {}
+    key = db_name
+    # A snapshot db is replaced by a new file when refreshed
+    inode = os.stat(db_name).st_ino
+    if key in read_only_connections and read_only_connections[key][0] != inode:
+        read_only_connections.pop(key)[1].close()
+    if key not in read_only_connections:
+        read_only_connection = sqlite3.connect(
+            f"file:{db_name}?mode=ro",
+            uri=True,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            # Only used by this thread, but closed by the one shutting down
+            check_same_thread=False,
+        )
+        apply_pragmas(read_only_connection, read_only=True)
+        read_only_connections[key] = (inode, read_only_connection)
+        with _read_only_connections_lock:
+            _read_only_connections.append(read_only_connection)
+    return read_only_connections[key][1]
+
+
+def get_db_name() -> str:
+    """Returns the file of the db `execute_query` reads from."""
+    db_name = getattr(_local, "db_name", None)
+    return db_name or connections[get_reports_db_alias()].settings_dict["NAME"]
+
+
+def execute_query(str_query: str) -> Iterable[Tuple]:
+    """Executes a raw sql query, yielding the rows."""
+    db_name = getattr(_local, "db_name", None)
+    if db_name is None:
+        with connections[get_reports_db_alias()].cursor() as cursor:
+            yield from cursor.execute(str_query)
+    else:
+        yield from _get_read_only_connection(db_name).execute(str_query)
+
+
+def _init_process_worker(settings_module: str, db_names: Dict[str, str]) -> None:
+    """Sets up django in a new worker process, with the same db files as the
+    process that started it (which may have changed them, e.g. in tests)."""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+    for alias, db_name in db_names.items():
+        connections.databases[alias]["NAME"] = db_name
+
+
+def _call_in_worker(db_name: str, fn: Callable, *args):
+    _local.db_name = db_name
+    try:
+        return fn(*args)
+    finally:
+        _local.db_name = None
+
+
+class ReportExecutor:
+    def imap(self, fn: Callable, *iterables: Iterable) -> Iterator:
+        """Like the builtin `map`, yielding the results in order."""
+        raise NotImplementedError()
+
+    def map(self, fn: Callable, *iterables: Iterable) -> List:
+        """Like the builtin `map`, but returns a list."""
+        return list(self.imap(fn, *iterables))
+
+
+class SerialReportExecutor(ReportExecutor):
+    def imap(self, fn, *iterables):
+        return map(fn, *iterables)
+
+
+@attr.s(frozen=True)
+class PoolReportExecutor(ReportExecutor):
+    """Runs each call in a pool. For a process pool, `fn` and its arguments
+    must be picklable."""
+
+    _pool: Executor = attr.ib()
+
+    def __reduce__(self):
+        # When sent to a worker (e.g. as part of a query), work is done serially
+        return (SerialReportExecutor, ())
+
+    def imap(self, fn, *iterables):
+        db_name = connections[get_reports_db_alias()].settings_dict["NAME"]
+        return self._pool.map(partial(_call_in_worker, db_name, fn), *iterables)
+
+
+_pools: Dict[Tuple[str, int], Executor] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(mode: str, workers: int) -> Executor:
+    with _pools_lock:
+        if (mode, workers) not in _pools:
+            if mode == THREADS:
+                pool = ThreadPoolExecutor(workers, thread_name_prefix="pacs-reports")
+            else:
+                pool = ProcessPoolExecutor(
+                    workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_process_worker,
+                    initargs=(
+                        settings.SETTINGS_MODULE,
+                        {x: connections.databases[x]["NAME"] for x in connections.databases},
+                    ),
+                )
+            _pools[(mode, workers)] = pool
+        return _pools[(mode, workers)]
+
+
+def _close_read_only_connections() -> None:
+    """Closes the read-only connections of the thread workers of this process,
+    once they are gone. Worker processes close theirs when they exit."""
+    with _read_only_connections_lock:
+        for read_only_connection in _read_only_connections:
+            read_only_connection.close()
+        _read_only_connections.clear()
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    """Shuts down the pools, waiting for their work, and closes the read-only
+    connections."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+    _close_read_only_connections()
+
+
+def get_report_executor(mode: str = None, workers: int = None) -> ReportExecutor:
+    """Returns the executor for a mode and number of workers, defaulting to
+    the ones in the settings."""
+    mode = mode or settings.REPORTS_EXECUTION_MODE
+    workers = workers or settings.REPORTS_EXECUTION_WORKERS
+    if mode == SERIAL:
+        return SerialReportExecutor()
+    if mode in (THREADS, PROCESSES):
+        return PoolReportExecutor(_get_pool(mode, workers))
+    raise ValueError(f"Unknown reports execution mode: {mode}")
@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+
+from pacs.db.routers import REPORTS_DB_ALIAS, has_reports_db
+from pacs.db.snapshots import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = "Refreshes the snapshot copy of the db used by reports (PACS_REPORTS_DB_FILE)"
+
+    def handle(self, *args, **kwargs):
+        if not has_reports_db():
+            raise CommandError("No reports db configured (PACS_REPORTS_DB_FILE)")
+        db_file = connections.databases[REPORTS_DB_ALIAS]["NAME"]
+        refresh_snapshot(db_file)
+        self.stdout.write(f"Refreshed {db_file}")
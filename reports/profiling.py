@@ -0,0 +1,108 @@
+"""
+Opt-in profiling of report requests.
+
+When the "profile_reports" feature toggle is active for a request (e.g. sent
+with the `Pacs-Feature-Toggles: profile_reports` header) and
+`settings.REPORTS_PROFILE_DIR` is set, the view runs under cProfile. The
+profile is saved as `<id>.pstats` next to `<id>.json`, with the inputs of the
+request, so it can be analyzed and replayed offline:
+
+    python -m pstats <id>.pstats
+"""
+import cProfile
+import functools
+import json
+import os
+import time
+import uuid
+from typing import Callable, Dict, Iterable, Iterator
+
+from django.conf import settings
+
+import featuretoggles.services
+
+PROFILE_FEATURE_TOGGLE = "profile_reports"
+PROFILE_ID_HEADER = "Pacs-Profile-Id"
+
+
+def is_profiling_enabled() -> bool:
+    if not settings.REPORTS_PROFILE_DIR:
+        return False
+    return bool(featuretoggles.services.get_instance().is_active(PROFILE_FEATURE_TOGGLE))
+
+
+def _get_request_inputs(request) -> Dict:
+    return {
+        "method": request.method,
+        "path": request.path,
+        "query_params": request.query_params.dict(),
+        "data": request.data,
+        "feature_toggles": featuretoggles.services.get_instance().get_dict(),
+    }
+
+
+def new_profile_id(name: str) -> str:
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}"
+
+
+def save_profile(profile: cProfile.Profile, profile_id: str, inputs: Dict, duration: float) -> None:
+    """Saves a profile and the inputs of the request."""
+    path = os.path.join(settings.REPORTS_PROFILE_DIR, profile_id)
+    os.makedirs(settings.REPORTS_PROFILE_DIR, exist_ok=True)
+    profile.dump_stats(f"{path}.pstats")
+    with open(f"{path}.json", "w") as f:
+        json.dump({**inputs, "duration": duration}, f, indent=2, default=str)
+
+
+def _iter_profiled(
+    profile: cProfile.Profile, content: Iterable[bytes], on_end: Callable[[float], None]
+) -> Iterator[bytes]:
+    """Yields the chunks of a streamed response, profiling the work of computing
+    each of them (but not of sending them). Calls `on_end` with the time it took."""
+    content = iter(content)
+    duration = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = profile.runcall(next, content)
+            except StopIteration:
+                return
+            finally:
+                duration += time.perf_counter() - start
+            yield chunk
+    finally:
+        on_end(duration)
+
+
+def profiled(name: str) -> Callable:
+    """Decorates a view so it runs under cProfile when profiling is enabled
+    for the request. The id of the saved profile is returned in the
+    `Pacs-Profile-Id` header. For streamed responses, the profile includes
+    the streaming, and is saved once it ends."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_profiling_enabled():
+                return view(request, *args, **kwargs)
+            inputs = _get_request_inputs(request)
+            profile = cProfile.Profile()
+            profile_id = new_profile_id(name)
+            start = time.perf_counter()
+            response = profile.runcall(view, request, *args, **kwargs)
+            duration = time.perf_counter() - start
+            response[PROFILE_ID_HEADER] = profile_id
+            if not response.streaming:
+                save_profile(profile, profile_id, inputs, duration)
+                return response
+            response.streaming_content = _iter_profiled(
+                profile,
+                response.streaming_content,
+                lambda x: save_profile(profile, profile_id, inputs, duration + x),
+            )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,18 +1,33 @@
 from __future__ import annotations
 
+import calendar
+import itertools
+import threading
 from collections import defaultdict
 from datetime import date, datetime, timedelta
-from decimal import Decimal
-from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from enum import Enum
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
 import attr
 from django.db import connection
 from sqlalchemy import (
+    Integer,
     MetaData,
     and_,
     between,
     case,
+    cast,
     create_engine,
+    event,
     func,
     literal_column,
     select,
@@ -20,14 +35,97 @@ from sqlalchemy import (
 from sqlalchemy.engine import Engine
 
 import common.utils as utils
+from common.utils import from_minor_units
 from currencies.models import Currency
 from currencies.money import Balance, Money, MoneyAggregator
+from metrics.timings import timer
+from pacs.db.sqlite3.pragmas import apply_pragmas
+
+from . import columnar
+from .executors import ReportExecutor, execute_query, get_report_executor
 
 if TYPE_CHECKING:
     from accounts.models import Account
 
 
 A_DAY = timedelta(days=1)
+A_WEEK = timedelta(weeks=1)
+
+
+def no_currency_conversion(money: Money, _: date) -> Money:
+    """The default currency conversion fn, which keeps money as it is.
+    A module-level function (and not a lambda) so that queries can be pickled."""
+    return money
+
+
+class DateStep(Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+def _add_months(x: date, months: int, day: int) -> date:
+    """Adds `months` to `x`, using `day` as the day (or the last day of the
+    month if it is shorter)."""
+    year, month = divmod(x.year * 12 + x.month - 1 + months, 12)
+    return date(year, month + 1, min(day, calendar.monthrange(year, month + 1)[1]))
+
+
+def _sql_int(x):
+    return cast(x, Integer)
+
+
+@attr.s(frozen=True)
+class DateSeries:
+    """The dates from `start` to `end` (inclusive), every `step`. Monthly
+    dates keep the day of `start`, or are the last day of shorter months."""
+
+    start: date = attr.ib()
+    end: date = attr.ib()
+    step: DateStep = attr.ib(converter=DateStep)
+
+    def get_dates(self) -> List[date]:
+        out = []
+        for i in itertools.count():
+            if self.step == DateStep.MONTH:
+                dt = _add_months(self.start, i, self.start.day)
+            else:
+                dt = self.start + i * (A_WEEK if self.step == DateStep.WEEK else A_DAY)
+            if dt > self.end:
+                return out
+            out.append(dt)
+
+    def count(self) -> int:
+        """Returns the number of dates, like `len(self.get_dates())` but
+        without building them."""
+        if self.step == DateStep.MONTH:
+            months = self.end.year * 12 + self.end.month - (self.start.year * 12 + self.start.month)
+            if _add_months(self.start, months, self.start.day) > self.end:
+                months -= 1
+            return max(0, months + 1)
+        days = (self.end - self.start).days
+        return max(0, (days if self.step == DateStep.DAY else days // 7) + 1)
+
+    def get_index_expression(self, date_column):
+        """Returns an sql expression with the index of the first date of the
+        series that is at or after `date_column` (0 if before `start`). It
+        is pure arithmetic, so its cost does not grow with the number of
+        dates."""
+        if self.step == DateStep.MONTH:
+            year = _sql_int(func.strftime("%Y", date_column))
+            month = _sql_int(func.strftime("%m", date_column))
+            day = _sql_int(func.strftime("%d", date_column))
+            last_day = _sql_int(
+                func.strftime("%d", date_column, "start of month", "+1 month", "-1 day")
+            )
+            months = year * 12 + month - (self.start.year * 12 + self.start.month)
+            # Dates after the day of the series in the month fall in the next one
+            index = months + _sql_int(day > func.min(self.start.day, last_day))
+        else:
+            days = _sql_int(func.julianday(date_column) - func.julianday(self.start.isoformat()))
+            # Rounds up to the next date of the series
+            index = days if self.step == DateStep.DAY else (days + 6) / 7
+        return func.max(0, index)
 
 
 @attr.s()
@@ -38,96 +136,113 @@ class BalanceEvolutionQuery:
     _dates: List[date] = attr.ib()
     _currency_dct: Dict[int, Currency] = attr.ib(init=False)
     _currency_conversion_fn: Callable[[Money, date], Money]
-    _currency_conversion_fn = attr.ib(default=lambda x, _: x)
+    _currency_conversion_fn = attr.ib(default=no_currency_conversion)
+    # Runs the per-account work, possibly in a pool of workers.
+    _executor: ReportExecutor = attr.ib(factory=get_report_executor)
+    # A report computed before for the same accounts and the first dates of
+    # `dates`. Its balances are reused, and only the movements after its last
+    # date are queried.
+    _prefix_report: Optional[BalanceEvolutionReport] = attr.ib(default=None)
+    _prefix_data: Dict[int, List[BalanceEvolutionReportData]] = attr.ib(init=False)
+    # When `dates` are a series, the movements are grouped by arithmetic on
+    # their dates instead of by a CASE with one branch per date.
+    _date_series: Optional[DateSeries] = attr.ib(default=None)
 
     def __attrs_post_init__(self):
         self._currency_dct = _get_currencies_in_dct()
         self._dates = sorted(self._dates)
+        self._prefix_data = self._get_prefix_data()
+        if self._date_series is not None and self._date_series.get_dates() != self._dates:
+            raise ValueError("The dates are not the ones of the date series")
+
+    def _get_prefix_data(self) -> Dict[int, List[BalanceEvolutionReportData]]:
+        """Returns the data of the prefix report for each account pk."""
+        out: Dict[int, List[BalanceEvolutionReportData]] = defaultdict(list)
+        if self._prefix_report is None:
+            return out
+        for data in self._prefix_report.data:
+            out[data.account.pk].append(data)
+        for acc in self._accounts:
+            prefix_dates = [x.date for x in out[acc.pk]]
+            if not prefix_dates or prefix_dates != self._dates[: len(prefix_dates)]:
+                raise ValueError(f"The prefix report does not match the dates for {acc}")
+        return out
 
-    def _run_query(self, acc: Account) -> Iterable[Tuple[int, Decimal, int]]:
+    @property
+    def _n_prefix_dates(self) -> int:
+        if self._prefix_report is None or not self._accounts:
+            return 0
+        return len(self._prefix_data[self._accounts[0].pk])
+
+    def _run_query(self, acc: Account) -> Iterable[Tuple[int, int, int]]:
         """Given an account, returns a tuple of
-        (currency_id, quantity__sum, date_group)
+        (currency_id, quantity_minor__sum, date_group)
         for each date group in self._dates"""
         # Usefull constants
         meta, engine = SqlAlchemyLoader.get_meta_and_engine()
         t_mov, t_tra, t_acc = SqlAlchemyLoader.get_tables(meta)
-        initial_date = min(self._dates)
+        n_prefix_dates = self._n_prefix_dates
+        if n_prefix_dates == len(self._dates):
+            return []
+        if columnar.is_enabled():
+            ledger = columnar.get_ledger()
+            return ledger.get_balance_evolution_rows(acc, self._dates, n_prefix_dates)
 
         # The sql statement
-        date_ranges = [
-            (t_tra.c.date <= initial_date, 0),  # For the initial balance
-            *[
+        conditions = [t_acc.c.lft >= acc.lft, t_acc.c.rght <= acc.rght]
+        if self._date_series is not None:
+            date_group = self._date_series.get_index_expression(t_tra.c.date)
+            conditions.append(t_tra.c.date <= self._dates[-1])
+        else:
+            date_ranges = [
                 (between(t_tra.c.date, self._dates[i - 1] + A_DAY, self._dates[i]), i)
-                for i in range(1, len(self._dates))
-            ],
-        ]
-        date_group = case(date_ranges, else_=None).label("date_group")
-        x = select([t_mov.c.currency_id, func.sum(t_mov.c.quantity), date_group])
+                for i in range(max(n_prefix_dates, 1), len(self._dates))
+            ]
+            if n_prefix_dates == 0:
+                # For the initial balance
+                date_ranges.insert(0, (t_tra.c.date <= self._dates[0], 0))
+            date_group = case(date_ranges, else_=None)
+            conditions.append(literal_column("date_group") != None)  # noqa
+        date_group = date_group.label("date_group")
+        x = select([t_mov.c.currency_id, func.sum(t_mov.c.quantity_minor), date_group])
         x = x.select_from(t_mov.join(t_tra).join(t_acc))
-        x = x.where(
-            and_(
-                t_acc.c.lft >= acc.lft,
-                t_acc.c.rght <= acc.rght,
-                literal_column("date_group") != None,  # noqa
-            )
-        )
+        if n_prefix_dates > 0:
+            # Movements up to the last date of the prefix are already summed
+            conditions.append(t_tra.c.date > self._dates[n_prefix_dates - 1])
+        x = x.where(and_(*conditions))
         x = x.group_by(t_mov.c.currency_id, literal_column("date_group"))
         x = x.order_by("date_group")
-        x = str(x.compile(engine, compile_kwargs={"literal_binds": True}))
-        return _execute_query(x)
-
-    def _get_quantity_per_group_and_currencies(
-        self,
-    ) -> Tuple[Dict[Tuple[date, Account, Currency], Decimal], Set[Currency]]:
-        """Runs the query for each account, and aggregates all results into
-        a dictionary with the Quantity groupped by date, Account and Currency.
-        Also returns a set of all used currencies."""
-        currencies: Set[Currency] = set()
-        data: Dict[Tuple[date, Account, Currency], Decimal] = {}
-        for account in self._accounts:
-            for cur_id, quantity, date_i in self._run_query(account):
-                currency = self._currency_dct[cur_id]
-                dt = self._dates[date_i]
-                currencies.add(currency)
-                data[(dt, account, currency)] = quantity
-        return data, currencies
-
-    def _aggregate_by_account_and_data(
-        self,
-        currencies: Iterable[Currency],
-        data: Dict[Tuple[date, Account, Currency], Decimal],
-    ) -> List[BalanceEvolutionReportData]:
-        """Given the data quantity groupped by date, account and currency,
-        and a set of all currencies, construct a list of all balance evolution
-        report data.
-        ASSUMES THAT data IS ORDERED BY DATE"""
-        money_agg: Dict[Account, MoneyAggregator]
-        money_agg = defaultdict(lambda: MoneyAggregator())
-
-        out: List[BalanceEvolutionReportData] = []
-        for account in self._accounts:
-            for dt in self._dates:
-                for currency in currencies:
-                    q: Optional[Decimal] = data.get((dt, account, currency), None)
-                    if q is not None:
-                        money = Money(q, currency)
-                        converted_money = self._currency_conversion_fn(money, dt)
-                        money_agg[account].append_money(converted_money)
-                balance: Balance = money_agg[account].as_balance()
-                out.append(BalanceEvolutionReportData(dt, account, balance))
+        return _execute_query(_compile_sql_alchemy_query(x, engine))
+
+    def _get_report_data_for(self, account: Account) -> List[BalanceEvolutionReportData]:
+        """Runs the query for an account and accumulates the quantities of
+        each date group into the balance of the account at each date."""
+        quantities_per_date_index: Dict[int, List[Tuple[int, int]]]
+        quantities_per_date_index = defaultdict(list)
+        for cur_id, quantity_minor, date_i in self._run_query(account):
+            quantities_per_date_index[date_i].append((cur_id, quantity_minor))
+
+        money_agg = MoneyAggregator()
+        out = list(self._prefix_data[account.pk])
+        if out:
+            for money in out[-1].balance.get_moneys():
+                money_agg.append_money(money)
+        for date_i, dt in enumerate(self._dates[len(out) :], len(out)):
+            for cur_id, quantity_minor in quantities_per_date_index[date_i]:
+                money = Money.trusted(from_minor_units(quantity_minor), self._currency_dct[cur_id])
+                money_agg.append_money(self._currency_conversion_fn(money, dt))
+            out.append(BalanceEvolutionReportData(dt, account, money_agg.as_balance()))
         return out
 
-    def run(self) -> BalanceEvolutionReport:
-        # Prepares a dict with Quantity for each account, currency and date
-        data: Dict[Tuple[date, Account, Currency], Decimal]
-        currencies: Set[Currency]
-        (data, currencies) = self._get_quantity_per_group_and_currencies()
-
-        # Sums the quantity for each account, date and currency
-        out: List[BalanceEvolutionReportData]
-        out = self._aggregate_by_account_and_data(currencies, data)
+    def iter_data(self) -> Iterator[BalanceEvolutionReportData]:
+        """Yields the data of the report, one account at a time, so that the
+        data of all accounts is never in memory at once."""
+        # Each account is independent, so they may be computed in parallel.
+        for data in self._executor.imap(self._get_report_data_for, self._accounts):
+            yield from data
 
-        return BalanceEvolutionReport(out)
+    def run(self) -> BalanceEvolutionReport:
+        return BalanceEvolutionReport(list(self.iter_data()))
 
 
 @attr.s()
@@ -147,6 +262,45 @@ class BalanceEvolutionReportData:
     balance: Balance = attr.ib()
 
 
+class CalendarStep(Enum):
+    MONTH = "month"
+    YEAR = "year"
+
+
+# strftime formats giving the calendar period of a date
+_CALENDAR_KEY_FORMATS = {CalendarStep.MONTH: "%Y-%m", CalendarStep.YEAR: "%Y"}
+
+
+@attr.s(frozen=True)
+class PeriodSeries:
+    """The calendar months or years from `start` to `end`, as periods. The
+    first and last periods start at `start` and end at `end`."""
+
+    start: date = attr.ib()
+    end: date = attr.ib()
+    step: CalendarStep = attr.ib(converter=CalendarStep)
+
+    def get_periods(self) -> List[Period]:
+        out = []
+        period_start = self.start
+        while period_start <= self.end:
+            if self.step == CalendarStep.MONTH:
+                next_start = _add_months(period_start.replace(day=1), 1, 1)
+            else:
+                next_start = date(period_start.year + 1, 1, 1)
+            out.append(Period(period_start, min(next_start - A_DAY, self.end)))
+            period_start = next_start
+        return out
+
+    def get_key(self, x: date) -> str:
+        """Returns the key of the period of a date, as `get_key_expression`."""
+        return x.strftime(_CALENDAR_KEY_FORMATS[self.step])
+
+    def get_key_expression(self, date_column):
+        """Returns an sql expression with the key of the period of a date."""
+        return func.strftime(_CALENDAR_KEY_FORMATS[self.step], date_column)
+
+
 @attr.s(frozen=True)
 class Flow:
     period: Period = attr.ib()
@@ -169,20 +323,49 @@ class FlowEvolutionQuery:
     periods: List[Period] = attr.ib()
     # And optional function used to convert Money to a specific currency.
     currency_conversion_fn: Callable[[Money, date], Money]
-    currency_conversion_fn = attr.ib(default=lambda x, _: x)
+    currency_conversion_fn = attr.ib(default=no_currency_conversion)
+    # Runs the per-account work, possibly in a pool of workers.
+    executor: ReportExecutor = attr.ib(factory=get_report_executor)
+    # When `periods` are a series of calendar periods, the movements are
+    # grouped by the key of their period instead of by a CASE with one branch
+    # per period, and by date only if they need to be converted.
+    period_series: Optional[PeriodSeries] = attr.ib(default=None)
+
+    def __attrs_post_init__(self):
+        if self.period_series is not None and self.period_series.get_periods() != self.periods:
+            raise ValueError("The periods are not the ones of the period series")
 
     def run(self) -> List[AccountFlows]:
         """Runs the query and returns a report"""
         currencies_dct = _get_currencies_in_dct()
-        return [self._get_flows_for(account, currencies_dct) for account in self.accounts]
+        return self.executor.map(
+            self._get_flows_for, self.accounts, itertools.repeat(currencies_dct)
+        )
 
     def _get_flows_for(
         self,
         account: Account,
         currencies_dct: Dict[int, Currency],
     ) -> AccountFlows:
+        if columnar.is_enabled():
+            # Without conversion, there is no need for one row per date
+            convert = self.currency_conversion_fn is not no_currency_conversion
+            ledger = columnar.get_ledger()
+            queried_data = ledger.get_flow_evolution_rows(account, self.periods, by_date=convert)
+            if self.period_series is not None:
+                # As the rows of `_get_calendar_flows_for`, grouped by currency first
+                queried_data = sorted(queried_data, key=lambda x: x[0])
+            return self._query_data_to_account_flows(
+                account=account,
+                queried_data=queried_data,
+                periods=self.periods,
+                currencies_dct=currencies_dct,
+                currency_conversion_fn=self.currency_conversion_fn,
+            )
         meta, engine = SqlAlchemyLoader.get_meta_and_engine()
         t_mov, t_tra, t_acc = SqlAlchemyLoader.get_tables(meta)
+        if self.period_series is not None:
+            return self._get_calendar_flows_for(account, currencies_dct, t_mov, t_tra, t_acc)
         query = self._get_query(self.periods, account, t_mov, t_tra, t_acc)
         compiled_query = _compile_sql_alchemy_query(query, engine)
         queried_data = _execute_query(compiled_query)
@@ -197,17 +380,17 @@ class FlowEvolutionQuery:
     @staticmethod
     def _get_query(periods: List[Period], account: Account, t_mov, t_tra, t_acc):
         """Returns an sql alchemy query that yields
-        (currency_id, sum(quantity), date, period_index)
+        (currency_id, sum(quantity_minor), date, period_index)
         For each period.
         """
-        period_index_expr = case(
-            [(between(t_tra.c.date, p.start, p.end), i) for i, p in enumerate(periods, 1)], else_=-1
-        ).label("period_index")
+        period_index_expr = _get_period_index_expression(periods, t_tra.c.date).label(
+            "period_index"
+        )
         period_index_literal = literal_column("period_index")
         x = select(
             [
                 t_mov.c.currency_id,
-                func.sum(t_mov.c.quantity),
+                func.sum(t_mov.c.quantity_minor),
                 t_tra.c.date,
                 period_index_expr,
             ]
@@ -224,10 +407,49 @@ class FlowEvolutionQuery:
         x = x.order_by(t_tra.c.date)
         return x
 
+    def _get_calendar_flows_for(
+        self, account: Account, currencies_dct: Dict[int, Currency], t_mov, t_tra, t_acc
+    ) -> AccountFlows:
+        """Like `_get_flows_for`, for a period series."""
+        _, engine = SqlAlchemyLoader.get_meta_and_engine()
+        period_series = self.period_series
+        assert period_series is not None
+        convert = self.currency_conversion_fn is not no_currency_conversion
+        key = period_series.get_key_expression(t_tra.c.date).label("period_key")
+        # Without conversion, there is no need for one row per date
+        date_column = t_tra.c.date if convert else literal_column("NULL")
+        group_by = t_tra.c.date if convert else literal_column("period_key")
+        x = select([t_mov.c.currency_id, func.sum(t_mov.c.quantity_minor), date_column, key])
+        x = x.select_from(t_mov.join(t_tra).join(t_acc))
+        x = x.where(
+            and_(
+                t_acc.c.lft >= account.lft,
+                t_acc.c.rght <= account.rght,
+                between(t_tra.c.date, period_series.start, period_series.end),
+            )
+        )
+        x = x.group_by(t_mov.c.currency_id, group_by)
+        queried_data = _execute_query(_compile_sql_alchemy_query(x, engine))
+
+        index_per_key = {
+            period_series.get_key(p.start): i for i, p in enumerate(self.periods, 1)
+        }
+        money_aggregators: Dict[int, MoneyAggregator] = defaultdict(MoneyAggregator)
+        for cur_id, quantity_minor, date_, period_key in queried_data:
+            money = Money.trusted(from_minor_units(quantity_minor), currencies_dct[cur_id])
+            if convert:
+                money = self.currency_conversion_fn(money, date_)
+            money_aggregators[index_per_key[period_key]].append_money(money)
+        flows = [
+            Flow(period=period, moneys=money_aggregators[i].get_moneys())
+            for i, period in enumerate(self.periods, 1)
+        ]
+        return AccountFlows(account=account, flows=flows)
+
     @staticmethod
     def _query_data_to_account_flows(
         account: Account,
-        queried_data: Iterable[Tuple[int, Decimal, date, int]],
+        queried_data: Iterable[Tuple[int, int, date, int]],
         periods: List[Period],
         currencies_dct: Dict[int, Currency],
         currency_conversion_fn: Callable[[Money, date], Money],
@@ -235,9 +457,10 @@ class FlowEvolutionQuery:
         period_index_money_aggregator_dct: Dict[int, MoneyAggregator]
         period_index_money_aggregator_dct = defaultdict(lambda: MoneyAggregator())
 
-        for (cur_id, quantity, date_, period_index) in queried_data:
+        for (cur_id, quantity_minor, date_, period_index) in queried_data:
             currency = currencies_dct[cur_id]
-            orig_currency_money = Money(currency=currency, quantity=quantity)
+            quantity = from_minor_units(quantity_minor)
+            orig_currency_money = Money.trusted(quantity, currency)
             final_currency_money = currency_conversion_fn(
                 orig_currency_money,
                 date_,
@@ -253,6 +476,107 @@ class FlowEvolutionQuery:
         return AccountFlows(account=account, flows=account_flows)
 
 
+@attr.s(frozen=True)
+class TagFlows:
+    tag_value: str = attr.ib()
+    flows: List[Flow] = attr.ib()
+
+
+@attr.s()
+class TagFlowEvolutionQuery:
+    """Represents a query for the flows of an account per value of a tag of
+    the transactions of its movements (e.g. the expenses per `trip-to`).
+
+    Movements of transactions with more than one tag with `tag_name` count for
+    each of their values."""
+
+    tag_name: str = attr.ib()
+    # The flows are the ones of this account and its descendants
+    account: Account = attr.ib()
+    periods: List[Period] = attr.ib()
+    currency_conversion_fn: Callable[[Money, date], Money]
+    currency_conversion_fn = attr.ib(default=no_currency_conversion)
+    # As in `FlowEvolutionQuery`
+    period_series: Optional[PeriodSeries] = attr.ib(default=None)
+
+    def __attrs_post_init__(self):
+        if self.period_series is not None and self.period_series.get_periods() != self.periods:
+            raise ValueError("The periods are not the ones of the period series")
+
+    def run(self) -> List[TagFlows]:
+        """Runs the query and returns the flows per tag value, sorted by it."""
+        currencies_dct = _get_currencies_in_dct()
+        money_aggregators: Dict[Tuple[str, int], MoneyAggregator]
+        money_aggregators = defaultdict(MoneyAggregator)
+        for tag_value, cur_id, quantity_minor, date_, period_index in self._run_query():
+            money = Money.trusted(from_minor_units(quantity_minor), currencies_dct[cur_id])
+            money = self.currency_conversion_fn(money, date_)
+            money_aggregators[tag_value, period_index].append_money(money)
+        tag_values = sorted(set(tag_value for tag_value, _ in money_aggregators))
+        return [
+            TagFlows(
+                tag_value=tag_value,
+                flows=[
+                    Flow(period=period, moneys=money_aggregators[tag_value, i].get_moneys())
+                    for i, period in enumerate(self.periods, 1)
+                ],
+            )
+            for tag_value in tag_values
+        ]
+
+    def _run_query(self) -> Iterator[Tuple[str, int, int, Optional[date], int]]:
+        """Yields (tag_value, currency_id, sum(quantity_minor), date, period_index),
+        from one query grouping the movements by tag value and period (and by
+        date, only if they need to be converted)."""
+        meta, engine = SqlAlchemyLoader.get_meta_and_engine()
+        t_mov, t_tra, t_acc = SqlAlchemyLoader.get_tables(meta)
+        t_tag = meta.tables["movements_transactiontag"]
+        convert = self.currency_conversion_fn is not no_currency_conversion
+        if self.period_series is not None:
+            period = self.period_series.get_key_expression(t_tra.c.date)
+        else:
+            period = _get_period_index_expression(self.periods, t_tra.c.date)
+        date_column = t_tra.c.date if convert else literal_column("NULL")
+        x = select(
+            [
+                t_tag.c.value,
+                t_mov.c.currency_id,
+                func.sum(t_mov.c.quantity_minor),
+                date_column,
+                period.label("period"),
+            ]
+        )
+        x = x.select_from(
+            t_tag.join(t_tra, t_tag.c.transaction_id == t_tra.c.id).join(t_mov).join(t_acc)
+        )
+        x = x.where(
+            and_(
+                t_tag.c.name == self.tag_name,
+                t_acc.c.lft >= self.account.lft,
+                t_acc.c.rght <= self.account.rght,
+                between(
+                    t_tra.c.date,
+                    min(p.start for p in self.periods),
+                    max(p.end for p in self.periods),
+                ),
+            )
+        )
+        group_by = [t_tag.c.value, t_mov.c.currency_id, literal_column("period")]
+        x = x.group_by(*group_by, *([t_tra.c.date] if convert else []))
+        queried_data = _execute_query(_compile_sql_alchemy_query(x, engine))
+
+        if self.period_series is not None:
+            index_per_key = {
+                self.period_series.get_key(p.start): i for i, p in enumerate(self.periods, 1)
+            }
+            for tag_value, cur_id, quantity_minor, date_, period_key in queried_data:
+                yield tag_value, cur_id, quantity_minor, date_, index_per_key[period_key]
+        else:
+            for tag_value, cur_id, quantity_minor, date_, period_index in queried_data:
+                if period_index != -1:
+                    yield tag_value, cur_id, quantity_minor, date_, period_index
+
+
 @attr.s()
 class Period:
     """Represents a period of time, with a start and an end"""
@@ -273,14 +597,20 @@ class SqlAlchemyLoader:
 
     _cached_meta: Optional[MetaData] = None
     _cached_engine: Optional[Engine] = None
+    _lock = threading.Lock()
 
     @classmethod
     def get_meta_and_engine(cls) -> Tuple[MetaData, Engine]:
-        if cls._cached_engine is None or cls._cached_engine is None:
-            cls._cached_engine = create_engine(f'sqlite:///{connection.settings_dict["NAME"]}')
-            cls._cached_meta = MetaData()
-            cls._cached_meta.reflect(bind=cls._cached_engine)
-        return cls._cached_meta, cls._cached_engine
+        # Requests may run concurrently in threads, and none of them may see a
+        # half-reflected meta.
+        with cls._lock:
+            if cls._cached_meta is None or cls._cached_engine is None:
+                engine = create_engine(f'sqlite:///{connection.settings_dict["NAME"]}')
+                event.listen(engine, "connect", lambda dbapi_conn, _: apply_pragmas(dbapi_conn))
+                meta = MetaData()
+                meta.reflect(bind=engine)
+                cls._cached_meta, cls._cached_engine = meta, engine
+            return cls._cached_meta, cls._cached_engine
 
     @staticmethod
     def get_tables(meta):
@@ -293,13 +623,21 @@ class SqlAlchemyLoader:
         cls._cached_meta = None
 
 
+def _get_period_index_expression(periods: List[Period], date_column):
+    """Returns an sql expression with the (1-based) index of the first period
+    of a date, or -1 if it is in none."""
+    return case(
+        [(between(date_column, p.start, p.end), i) for i, p in enumerate(periods, 1)], else_=-1
+    )
+
+
 def _compile_sql_alchemy_query(query, engine):
-    return str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+    with timer("sqlalchemy"):
+        return str(query.compile(engine, compile_kwargs={"literal_binds": True}))
 
 
 def _execute_query(str_query):
-    with connection.cursor() as cursor:
-        yield from cursor.execute(str_query)
+    return execute_query(str_query)
 
 
 def _str_to_date(x):
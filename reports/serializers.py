@@ -2,13 +2,19 @@ from rest_framework import serializers
 
 from accounts.models import Account
 from accounts.serializers import BalanceSerializer
+from common.models import tag_validator
 from common.serializers import new_price_field
 from currencies.currency_converter import CurrencyPricePortifolio, DateAndPrice
 from currencies.models import Currency
 from currencies.serializers import MoneySerializer
-from reports.reports import Period
+from reports.reports import CalendarStep, DateSeries, DateStep, Period, PeriodSeries
 
-from .view_models import BalanceEvolutionInput, CurrencyOpts, FlowEvolutionInput
+from .view_models import (
+    BalanceEvolutionInput,
+    CurrencyOpts,
+    FlowEvolutionInput,
+    TagFlowEvolutionInput,
+)
 
 
 def _new_account_field():
@@ -26,13 +32,13 @@ def _new_account_list_serializer():
     return serializers.ListSerializer(child=_new_account_field())
 
 
-def _new_periods_serializer():
+def _new_periods_serializer(**kwargs):
     def validator(x):
         if len(x) == 0:
             msg = "At least one period must be passed"
             raise serializers.ValidationError(msg)
 
-    return serializers.ListSerializer(child=PeriodField(), validators=[validator])
+    return serializers.ListSerializer(child=PeriodField(), validators=[validator], **kwargs)
 
 
 class PeriodField(serializers.Field):
@@ -51,6 +57,40 @@ class PeriodField(serializers.Field):
         ]
 
 
+class DateSeriesSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    step = serializers.ChoiceField(choices=[x.value for x in DateStep])
+
+    # Bounds the size of the report
+    MAX_DATES = 10000
+
+    def validate(self, data):
+        if data["start"] > data["end"]:
+            raise serializers.ValidationError("start must not be after end")
+        if DateSeries(**data).count() > self.MAX_DATES:
+            msg = f"A series can not have more than {self.MAX_DATES} dates"
+            raise serializers.ValidationError(msg)
+        return data
+
+    def create(self, data):
+        return DateSeries(**data)
+
+
+class PeriodSeriesSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    step = serializers.ChoiceField(choices=[x.value for x in CalendarStep])
+
+    def validate(self, data):
+        if data["start"] > data["end"]:
+            raise serializers.ValidationError("start must not be after end")
+        return data
+
+    def create(self, data):
+        return PeriodSeries(**data)
+
+
 class DateAndPriceSerialzier(serializers.Serializer):
     date = serializers.DateField()
     price = new_price_field()
@@ -90,19 +130,31 @@ class CurrencyOptsSerializer(serializers.Serializer):
         return field.create(data)
 
 
-class FlowEvolutionInputSerializer(serializers.Serializer):
-    periods = _new_periods_serializer()
-    accounts = _new_account_list_serializer()
+class _PeriodsInputSerializer(serializers.Serializer):
+    """Base for the inputs of reports of flows over periods."""
+
+    # Either a list of periods or a series of calendar periods
+    periods = _new_periods_serializer(required=False)
+    period_series = PeriodSeriesSerializer(required=False)
     currency_opts = CurrencyOptsSerializer(default=None)
 
-    def create(self, data):
+    def validate(self, data):
+        if ("periods" in data) == ("period_series" in data):
+            raise serializers.ValidationError("Exactly one of periods or period_series is required")
+        return data
+
+    def _create_periods_data(self, data):
+        """Returns the kwargs for the periods, series and currency opts."""
         currency_opts_data = data.get("currency_opts")
         currency_opts = self._create_currency_opts(currency_opts_data)
-        return FlowEvolutionInput(
-            periods=data["periods"],
-            accounts=data["accounts"],
-            currency_opts=currency_opts,
-        )
+        period_series = None
+        if "period_series" in data:
+            period_series = self.fields["period_series"].create(data["period_series"])
+        return {
+            "periods": period_series.get_periods() if period_series else data["periods"],
+            "currency_opts": currency_opts,
+            "period_series": period_series,
+        }
 
     def _create_currency_opts(self, data):
         if not data:
@@ -110,6 +162,23 @@ class FlowEvolutionInputSerializer(serializers.Serializer):
         return self.fields["currency_opts"].create(data)
 
 
+class FlowEvolutionInputSerializer(_PeriodsInputSerializer):
+    accounts = _new_account_list_serializer()
+
+    def create(self, data):
+        return FlowEvolutionInput(accounts=data["accounts"], **self._create_periods_data(data))
+
+
+class TagFlowEvolutionInputSerializer(_PeriodsInputSerializer):
+    tag_name = serializers.CharField(validators=[tag_validator])
+    account = _new_account_field()
+
+    def create(self, data):
+        return TagFlowEvolutionInput(
+            tag_name=data["tag_name"], account=data["account"], **self._create_periods_data(data)
+        )
+
+
 class FlowSerializer(serializers.Serializer):
     period = PeriodField()
     moneys = serializers.ListSerializer(child=MoneySerializer())
@@ -124,6 +193,15 @@ class FlowEvolutionOutputSerializer(serializers.Serializer):
     data = serializers.ListSerializer(child=FlowEvolutionDataSerializer(), source="*")
 
 
+class TagFlowsSerializer(serializers.Serializer):
+    tag_value = serializers.CharField()
+    flows = serializers.ListSerializer(child=FlowSerializer())
+
+
+class TagFlowEvolutionOutputSerializer(serializers.Serializer):
+    data = serializers.ListSerializer(child=TagFlowsSerializer(), source="*")
+
+
 class BalanceEvolutionReportDataSerializer(serializers.Serializer):
     date = serializers.DateField()
     account = _new_account_field()
@@ -136,11 +214,24 @@ class BalanceEvolutionOutputSerializer(serializers.Serializer):
 
 class BalanceEvolutionInputSerializer(serializers.Serializer):
     accounts = _new_account_list_serializer()
-    dates = serializers.ListSerializer(child=serializers.DateField())
+    # Either a list of dates or a series of dates
+    dates = serializers.ListSerializer(child=serializers.DateField(), required=False)
+    date_series = DateSeriesSerializer(required=False)
     currency_opts = CurrencyOptsSerializer(default=None)
 
+    def validate(self, data):
+        if ("dates" in data) == ("date_series" in data):
+            raise serializers.ValidationError("Exactly one of dates or date_series is required")
+        return data
+
     def create(self, data):
-        created_data = {"accounts": data["accounts"], "dates": data["dates"]}
+        created_data = {"accounts": data["accounts"]}
+        if "date_series" in data:
+            date_series = self.fields["date_series"].create(data["date_series"])
+            created_data["dates"] = date_series.get_dates()
+            created_data["date_series"] = date_series
+        else:
+            created_data["dates"] = data["dates"]
         if data["currency_opts"] is not None:
             created_data["currency_opts"] = self._create_currency_opts(data)
         return BalanceEvolutionInput(**created_data)
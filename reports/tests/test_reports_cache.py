@@ -0,0 +1,207 @@
+from datetime import date
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+import attr
+from django.test import override_settings
+
+import reports.cache as sut
+from accounts.tests.factories import AccountTestFactory
+from common.testutils import PacsTestCase, get_response_json
+from currencies.currency_converter import CurrencyPricePortifolio, DateAndPrice
+from currencies.tests.factories import CurrencyTestFactory
+from movements.models import LedgerVersion
+from movements.tests.factories import TransactionTestFactory
+from reports.reports import BalanceEvolutionQuery, DateSeries, DateStep
+from reports.view_models import BalanceEvolutionInput, CurrencyOpts
+
+
+class TestGetInputsHash(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.populate_currencies()
+        self.accounts = AccountTestFactory.create_batch(2)
+        self.currency = CurrencyTestFactory()
+
+    def make_inputs(self, price=Decimal("1.5"), accounts=None):
+        prices = [DateAndPrice(date(2020, 1, 1), price)]
+        portifolio = CurrencyPricePortifolio(self.currency, prices)
+        currency_opts = CurrencyOpts([portifolio], self.currency)
+        return BalanceEvolutionInput(accounts or self.accounts, [date(2020, 1, 1)], currency_opts)
+
+    def test_same_for_equivalent_inputs(self):
+        assert sut.get_inputs_hash(self.make_inputs()) == sut.get_inputs_hash(
+            self.make_inputs(price=Decimal("1.50000"))
+        )
+
+    def test_differs_for_different_inputs(self):
+        hashes = {
+            sut.get_inputs_hash(self.make_inputs()),
+            sut.get_inputs_hash(self.make_inputs(price=Decimal("1.6"))),
+            sut.get_inputs_hash(self.make_inputs(accounts=self.accounts[::-1])),
+            sut.get_inputs_hash(attr.evolve(self.make_inputs(), dates=[date(2020, 1, 2)])),
+            sut.get_inputs_hash(BalanceEvolutionInput(self.accounts, [date(2020, 1, 1)])),
+        }
+        assert len(hashes) == 5
+
+
+class TestReportCache(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.inputs = ["foo"]
+        self.compute_fn = Mock(side_effect=[{"a": 1}, {"a": 2}])
+
+    def test_caches_result(self):
+        cache = sut.ReportCache("foo")
+        assert cache.get_or_compute(self.inputs, self.compute_fn) == {"a": 1}
+        assert cache.get_or_compute(self.inputs, self.compute_fn) == {"a": 1}
+        assert self.compute_fn.call_count == 1
+
+    def test_recomputes_when_ledger_version_changes(self):
+        cache = sut.ReportCache("foo")
+        assert cache.get_or_compute(self.inputs, self.compute_fn) == {"a": 1}
+        LedgerVersion.objects.bump()
+        assert cache.get_or_compute(self.inputs, self.compute_fn) == {"a": 2}
+
+    def test_keyed_by_name_and_inputs(self):
+        assert sut.ReportCache("foo").get_or_compute(self.inputs, self.compute_fn) == {"a": 1}
+        assert sut.ReportCache("bar").get_or_compute(self.inputs, self.compute_fn) == {"a": 2}
+        self.compute_fn.side_effect = [{"a": 3}]
+        assert sut.ReportCache("foo").get_or_compute(["bar"], self.compute_fn) == {"a": 3}
+
+    def test_disabled_with_zero_timeout(self):
+        with override_settings(REPORTS_CACHE_TIMEOUT=0):
+            cache = sut.ReportCache("foo")
+        cache.get_or_compute(self.inputs, self.compute_fn)
+        cache.get_or_compute(self.inputs, self.compute_fn)
+        assert self.compute_fn.call_count == 2
+
+    def test_streams_and_caches_result(self):
+        cache = sut.ReportCache("foo")
+        stream_fn = Mock(side_effect=lambda: iter([b"a", b"b"]))
+        assert list(cache.get_or_stream(self.inputs, stream_fn)) == [b"a", b"b"]
+        assert list(cache.get_or_stream(self.inputs, stream_fn)) == [b"ab"]
+        assert stream_fn.call_count == 1
+
+    def test_does_not_cache_streamed_results_larger_than_max_size(self):
+        cache = sut.ReportCache("foo", max_size=3)
+        stream_fn = Mock(side_effect=lambda: iter([b"ab", b"cd"]))
+        assert list(cache.get_or_stream(self.inputs, stream_fn)) == [b"ab", b"cd"]
+        assert list(cache.get_or_stream(self.inputs, stream_fn)) == [b"ab", b"cd"]
+        assert stream_fn.call_count == 2
+
+
+class TestBalanceEvolutionReportCache(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.populate_currencies()
+        self.accounts = AccountTestFactory.create_batch(2)
+        self.dates = [date(2019, 1, 1), date(2019, 2, 1), date(2019, 3, 1)]
+        for date_ in [date(2018, 12, 1), date(2019, 1, 15), date(2019, 2, 15)]:
+            TransactionTestFactory(
+                date_=date_,
+                movements_specs__0__account=self.accounts[0],
+                movements_specs__1__account=self.accounts[1],
+            )
+
+    def make_inputs(self, dates):
+        return BalanceEvolutionInput(self.accounts, dates)
+
+    def test_get_keys_for_prefixes(self):
+        keys = sut.BalanceEvolutionReportCache.get_keys(self.make_inputs(self.dates), 1)
+        prefix_keys = sut.BalanceEvolutionReportCache.get_keys(self.make_inputs(self.dates[:2]), 1)
+        unsorted_keys = sut.BalanceEvolutionReportCache.get_keys(
+            self.make_inputs(self.dates[::-1]), 1
+        )
+        assert len(set(keys)) == 3
+        assert keys[1:] == prefix_keys
+        assert keys == unsorted_keys
+        assert keys[0] not in sut.BalanceEvolutionReportCache.get_keys(
+            self.make_inputs(self.dates), 2
+        )
+
+    def test_get_keys_ignores_date_series(self):
+        date_series = DateSeries(self.dates[0], self.dates[-1], DateStep.MONTH)
+        inputs = attr.evolve(self.make_inputs(self.dates), date_series=date_series)
+        assert sut.BalanceEvolutionReportCache.get_keys(
+            inputs, 1
+        ) == sut.BalanceEvolutionReportCache.get_keys(self.make_inputs(self.dates), 1)
+
+    def test_reuses_report_of_prefix(self):
+        cache = sut.BalanceEvolutionReportCache()
+        prefix_report = cache.run(self.make_inputs(self.dates[:2]))
+        with patch.object(sut, "BalanceEvolutionQuery", wraps=BalanceEvolutionQuery) as m_query:
+            report = cache.run(self.make_inputs(self.dates))
+        assert m_query.call_args[1]["prefix_report"] == prefix_report
+        assert report == BalanceEvolutionQuery(self.accounts, self.dates).run()
+
+    def test_returns_cached_report(self):
+        cache = sut.BalanceEvolutionReportCache()
+        report = cache.run(self.make_inputs(self.dates))
+        with patch.object(sut, "BalanceEvolutionQuery") as m_query:
+            assert cache.run(self.make_inputs(self.dates)) == report
+        assert m_query.call_count == 0
+
+    def test_ignores_prefix_of_other_ledger_version(self):
+        cache = sut.BalanceEvolutionReportCache()
+        cache.run(self.make_inputs(self.dates[:2]))
+        TransactionTestFactory(
+            date_=date(2019, 1, 20),
+            movements_specs__0__account=self.accounts[0],
+            movements_specs__1__account=self.accounts[1],
+        )
+        report = cache.run(self.make_inputs(self.dates))
+        assert report == BalanceEvolutionQuery(self.accounts, self.dates).run()
+
+    def test_disabled_with_zero_timeout(self):
+        with override_settings(REPORTS_CACHE_TIMEOUT=0):
+            cache = sut.BalanceEvolutionReportCache()
+        cache.run(self.make_inputs(self.dates[:2]))
+        with patch.object(sut, "BalanceEvolutionQuery", wraps=BalanceEvolutionQuery) as m_query:
+            cache.run(self.make_inputs(self.dates))
+        assert "prefix_report" not in m_query.call_args[1]
+
+    def test_streams_reports_larger_than_max_items(self):
+        # Only the prefix of 2 dates fits
+        cache = sut.BalanceEvolutionReportCache(max_items=4)
+        prefix_report = cache.run(self.make_inputs(self.dates[:2]))
+        inputs = self.make_inputs(self.dates)
+        with patch.object(sut, "BalanceEvolutionQuery", wraps=BalanceEvolutionQuery) as m_query:
+            with patch.object(BalanceEvolutionQuery, "run") as m_run:
+                data = cache.iter_data(inputs)
+                assert next(data).date == self.dates[0]
+        assert m_run.call_count == 0
+        assert m_query.call_args[1]["prefix_report"] == prefix_report
+        assert list(data) == BalanceEvolutionQuery(self.accounts, self.dates).run().data[1:]
+        assert sut.cache.get(cache.get_keys(inputs, LedgerVersion.objects.get_version())[0]) is None
+
+
+class TestReportViewsAreCached(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.populate_currencies()
+        self.accounts = AccountTestFactory.create_batch(2)
+        self.data = {"accounts": [x.pk for x in self.accounts], "dates": ["2020-01-01"]}
+
+    def post(self):
+        resp = self.client.post("/reports/balance-evolution/", self.data)
+        assert resp.status_code == 200
+        return get_response_json(resp)
+
+    def test_repeated_requests_use_cache(self):
+        first = self.post()
+        with patch.object(BalanceEvolutionQuery, "run") as run:
+            assert self.post() == first
+        assert run.call_count == 0
+
+    def test_writes_invalidate_cache(self):
+        first = self.post()
+        TransactionTestFactory(
+            date_="2019-01-01",
+            movements_specs__0__account=self.accounts[0],
+            movements_specs__1__account=self.accounts[1],
+        )
+        assert self.post() != first
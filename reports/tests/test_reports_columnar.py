@@ -0,0 +1,248 @@
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.test import APITransactionTestCase
+
+import reports.columnar as sut
+from accounts.management.commands.populate_accounts import (
+    account_populator,
+    account_type_populator,
+)
+from accounts.models import AccTypeEnum
+from accounts.tests.factories import AccountTestFactory
+from common.testutils import PacsTestCase
+from currencies.management.commands.populate_currencies import currency_populator
+from currencies.money import Money
+from currencies.tests.factories import CurrencyTestFactory
+from movements.models import LedgerVersion
+from movements.tests.factories import TransactionTestFactory
+from reports.reports import (
+    BalanceEvolutionQuery,
+    DateSeries,
+    FlowEvolutionQuery,
+    Period,
+    PeriodSeries,
+)
+
+np = pytest.importorskip("numpy")
+
+
+def currency_conversion_fn(money, date_):
+    # Depends on the date, so that it must happen per date
+    return Money(money.quantity * date_.day, money.currency)
+
+
+def sorted_columns(ledger):
+    """The columns of a ledger, in a canonical order."""
+    order = np.lexsort((ledger.movement_ids, ledger.dates))
+    return {x: getattr(ledger, x)[order].tolist() for x in sut._COLUMNS + ["lfts"]}
+
+
+class TestIsEnabled(PacsTestCase):
+    def test_sql(self):
+        with self.settings(REPORTS_ENGINE=sut.SQL):
+            assert sut.is_enabled() is False
+
+    def test_columnar(self):
+        with self.settings(REPORTS_ENGINE=sut.COLUMNAR):
+            assert sut.is_enabled() is True
+
+    def test_columnar_without_numpy(self):
+        with self.settings(REPORTS_ENGINE=sut.COLUMNAR), patch.object(sut, "np", None):
+            with pytest.raises(ImproperlyConfigured):
+                sut.is_enabled()
+
+    def test_unknown(self):
+        with self.settings(REPORTS_ENGINE="foo"):
+            with pytest.raises(ValueError):
+                sut.is_enabled()
+
+
+class TestIntegrationColumnarEngine(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        sut.reset()
+        self.populate_accounts()
+        self.currencies = CurrencyTestFactory.create_batch(2)
+        branch = AccountTestFactory(acc_type=AccTypeEnum.BRANCH)
+        leafs = AccountTestFactory.create_batch(2, parent=branch)
+        other = AccountTestFactory()
+        self.accounts = [branch, *leafs, other]
+        transaction_dates = [
+            date(2019, 12, 31),
+            date(2020, 1, 1),
+            date(2020, 1, 15),
+            date(2020, 1, 1),
+            date(2020, 2, 1),
+            date(2020, 3, 31),
+            date(2020, 4, 1),
+        ]
+        quantities = ["9999999999.99999", "0.00001", "-7.5", "3", "0.00001", "10", "-2"]
+        for i, (date_, quantity) in enumerate(zip(transaction_dates, quantities)):
+            currency = self.currencies[i % 2]
+            TransactionTestFactory(
+                date_=date_,
+                movements_specs__0__account=leafs[i % 2],
+                movements_specs__0__money=Money(quantity, currency),
+                movements_specs__1__account=other if i % 3 else leafs[(i + 1) % 2],
+                movements_specs__1__money=Money(-Decimal(quantity), currency),
+            )
+        self.dates = [date(2019, 12, 1), date(2020, 1, 1), date(2020, 2, 15), date(2020, 5, 1)]
+        self.periods = [
+            Period.from_strings("2020-01-01", "2020-01-31"),
+            # Overlaps with the first one
+            Period.from_strings("2020-01-15", "2020-03-31"),
+            Period.from_strings("2021-01-01", "2021-01-31"),
+        ]
+
+    def tearDown(self):
+        sut.reset()
+        super().tearDown()
+
+    def assert_same_as_sql(self, run_query):
+        exp = run_query()
+        with self.settings(REPORTS_ENGINE=sut.COLUMNAR):
+            with patch("reports.reports._execute_query") as m_execute_query:
+                result = run_query()
+        assert m_execute_query.call_count == 0
+        assert result == exp
+        return result
+
+    def test_balance_evolution(self):
+        self.assert_same_as_sql(lambda: BalanceEvolutionQuery(self.accounts, self.dates).run())
+
+    def test_balance_evolution_sums_exactly(self):
+        report = self.assert_same_as_sql(
+            lambda: BalanceEvolutionQuery(self.accounts[1:2], self.dates[2:3]).run()
+        )
+        moneys = report.data[0].balance.get_moneys()
+        assert Decimal("9999999992.50000") in [x.quantity for x in moneys]
+
+    def test_balance_evolution_with_prefix_report(self):
+        prefix_report = BalanceEvolutionQuery(self.accounts, self.dates[:2]).run()
+        self.assert_same_as_sql(
+            lambda: BalanceEvolutionQuery(
+                self.accounts, self.dates, prefix_report=prefix_report
+            ).run()
+        )
+
+    def test_balance_evolution_with_date_series(self):
+        series = DateSeries(date(2019, 12, 31), date(2020, 4, 30), "week")
+        self.assert_same_as_sql(
+            lambda: BalanceEvolutionQuery(
+                self.accounts, series.get_dates(), date_series=series
+            ).run()
+        )
+
+    def test_balance_evolution_with_currency_conversion(self):
+        self.assert_same_as_sql(
+            lambda: BalanceEvolutionQuery(self.accounts, self.dates, currency_conversion_fn).run()
+        )
+
+    def test_flow_evolution(self):
+        self.assert_same_as_sql(lambda: FlowEvolutionQuery(self.accounts, self.periods).run())
+
+    def test_flow_evolution_with_currency_conversion(self):
+        self.assert_same_as_sql(
+            lambda: FlowEvolutionQuery(
+                self.accounts, self.periods, currency_conversion_fn=currency_conversion_fn
+            ).run()
+        )
+
+    def test_flow_evolution_with_period_series(self):
+        series = PeriodSeries(date(2019, 12, 1), date(2020, 4, 30), "month")
+        for fn in [None, currency_conversion_fn]:
+            kwargs = {"currency_conversion_fn": fn} if fn else {}
+            self.assert_same_as_sql(
+                lambda: FlowEvolutionQuery(
+                    self.accounts, series.get_periods(), period_series=series, **kwargs
+                ).run()
+            )
+
+    def test_loads_again_if_the_version_changes(self):
+        with self.settings(REPORTS_ENGINE=sut.COLUMNAR):
+            ledger = sut.get_ledger()
+            assert sut.get_ledger() is ledger
+            TransactionTestFactory(date_=date(2020, 1, 2))
+            # Not committed, so the write is not applied but the version changed
+            new_ledger = sut.get_ledger()
+        assert new_ledger.version == LedgerVersion.objects.get_version() != ledger.version
+        assert len(new_ledger.movement_ids) == len(ledger.movement_ids) + 2
+        self.assert_same_as_sql(lambda: BalanceEvolutionQuery(self.accounts, self.dates).run())
+
+
+# Writes are applied once committed
+class TestIntegrationColumnarLedgerWrites(APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        sut.reset()
+        account_type_populator()
+        account_populator()
+        currency_populator()
+        branch = AccountTestFactory(acc_type=AccTypeEnum.BRANCH)
+        self.accounts = [branch, *AccountTestFactory.create_batch(3, parent=branch)]
+        self.transactions = [
+            TransactionTestFactory(
+                date_=date_,
+                movements_specs__0__account=self.accounts[1 + i % 3],
+                movements_specs__1__account=self.accounts[1 + (i + 1) % 3],
+            )
+            for i, date_ in enumerate(["2019-01-01", "2019-02-01", "2019-03-01", "2019-04-01"])
+        ]
+        self.settings_override = self.settings(REPORTS_ENGINE=sut.COLUMNAR)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        sut.reset()
+        super().tearDown()
+
+    def assert_same_as_loaded(self, ledger):
+        assert ledger.version == LedgerVersion.objects.get_version()
+        assert sorted_columns(ledger) == sorted_columns(sut.ColumnarLedger.load())
+
+    def test_applies_writes(self):
+        sut.get_ledger()
+        one, two, three, four = self.transactions
+        TransactionTestFactory(
+            date_="2019-02-15",
+            movements_specs__0__account=self.accounts[1],
+            movements_specs__1__account=self.accounts[2],
+        )
+        one.set_date(date(2019, 3, 15))
+        two.delete()
+        movement = three.movement_set.first()
+        movement.quantity = Decimal("12.34")
+        movement.save()
+        new_account = AccountTestFactory(parent=self.accounts[0])
+        TransactionTestFactory(
+            date_="2019-01-15",
+            movements_specs__0__account=new_account,
+            movements_specs__1__account=self.accounts[3],
+        )
+
+        with patch.object(sut.ColumnarLedger, "load") as m_load:
+            ledger = sut.get_ledger()
+        assert m_load.call_count == 0
+        self.assert_same_as_loaded(ledger)
+        assert len(ledger.movement_ids) == 10
+
+    def test_loads_again_after_a_write_it_did_not_see(self):
+        ledger = sut.get_ledger()
+        LedgerVersion.objects.bump()
+        TransactionTestFactory(date_="2019-02-15")
+        new_ledger = sut.get_ledger()
+        assert new_ledger is not ledger
+        self.assert_same_as_loaded(new_ledger)
+
+    def test_loads_again_after_too_many_writes(self):
+        sut.get_ledger()
+        with patch.object(sut, "MAX_PENDING_WRITES", 1):
+            TransactionTestFactory(date_="2019-02-15")
+        with patch.object(sut.ColumnarLedger, "load", wraps=sut.ColumnarLedger.load) as m_load:
+            ledger = sut.get_ledger()
+        assert m_load.call_count == 1
+        self.assert_same_as_loaded(ledger)
@@ -0,0 +1,116 @@
+import pickle
+import sqlite3
+from datetime import date
+from unittest.mock import Mock
+
+import pytest
+from rest_framework.test import APITransactionTestCase
+
+import reports.executors as sut
+from accounts.management.commands.populate_accounts import (
+    account_populator,
+    account_type_populator,
+)
+from accounts.models import AccTypeEnum
+from accounts.tests.factories import AccountTestFactory
+from currencies.management.commands.populate_currencies import currency_populator
+from movements.tests.factories import TransactionTestFactory
+from reports.reports import BalanceEvolutionQuery, FlowEvolutionQuery, Period
+
+
+class TestGetReportExecutor:
+    def test_serial(self):
+        assert isinstance(sut.get_report_executor(sut.SERIAL), sut.SerialReportExecutor)
+
+    def test_pools_are_reused(self):
+        one = sut.get_report_executor(sut.THREADS, 2)
+        two = sut.get_report_executor(sut.THREADS, 2)
+        assert isinstance(one, sut.PoolReportExecutor)
+        assert one == two
+
+    def test_pickles_as_serial(self):
+        executor = sut.get_report_executor(sut.PROCESSES, 1)
+        assert isinstance(pickle.loads(pickle.dumps(executor)), sut.SerialReportExecutor)
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            sut.get_report_executor("foo")
+
+    def test_processes_are_spawned(self):
+        pool = sut.get_report_executor(sut.PROCESSES, 1)._pool
+        assert pool._mp_context.get_start_method() == "spawn"
+
+    def test_shutdown_pools(self):
+        executor = sut.get_report_executor(sut.THREADS, 1)
+        sut.shutdown_pools()
+        assert executor._pool._shutdown
+        assert sut.get_report_executor(sut.THREADS, 1) != executor
+
+
+class TestSerialReportExecutor:
+    def test_map(self):
+        assert sut.SerialReportExecutor().map(lambda x, y: x + y, [1, 2], [3, 4]) == [4, 6]
+
+    def test_imap_is_lazy(self):
+        fn = Mock(side_effect=lambda x: x * 2)
+        results = sut.SerialReportExecutor().imap(fn, [1, 2])
+        assert fn.call_count == 0
+        assert list(results) == [2, 4]
+
+
+# Pool workers read through their own connection, so the data must be committed.
+class TestPoolReportExecutor(APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        account_type_populator()
+        account_populator()
+        currency_populator()
+        branch = AccountTestFactory(acc_type=AccTypeEnum.BRANCH)
+        self.accounts = [branch, *AccountTestFactory.create_batch(3, parent=branch)]
+        self.dates = [date(2019, 1, 1), date(2019, 6, 1), date(2020, 1, 1)]
+        for i, dt in enumerate(["2018-12-01", "2019-02-01", "2019-07-01", "2019-12-31"]):
+            TransactionTestFactory(
+                date_=dt,
+                movements_specs__0__account=self.accounts[1 + i % 3],
+                movements_specs__1__account=self.accounts[1 + (i + 1) % 3],
+            )
+
+    def test_worker_reads_with_read_only_connection(self):
+        def count_and_delete(_):
+            count = next(sut.execute_query("SELECT COUNT(*) FROM movements_movement"))[0]
+            with pytest.raises(sqlite3.OperationalError, match="readonly"):
+                next(sut.execute_query("DELETE FROM movements_movement"))
+            return count
+
+        executor = sut.get_report_executor(sut.THREADS, 1)
+        assert executor.map(count_and_delete, [None]) == [8]
+
+    def test_shutdown_closes_read_only_connections(self):
+        sut.shutdown_pools()
+        executor = sut.get_report_executor(sut.THREADS, 1)
+        executor.map(lambda _: next(sut.execute_query("SELECT 1")), [None])
+        [read_only_connection] = sut._read_only_connections
+        sut.shutdown_pools()
+        assert sut._read_only_connections == []
+        with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+            read_only_connection.execute("SELECT 1")
+
+    def test_balance_evolution_is_the_same_as_serial(self):
+        exp = BalanceEvolutionQuery(
+            self.accounts, self.dates, executor=sut.SerialReportExecutor()
+        ).run()
+        for mode in (sut.THREADS, sut.PROCESSES):
+            executor = sut.get_report_executor(mode, 2)
+            assert BalanceEvolutionQuery(self.accounts, self.dates, executor=executor).run() == exp
+
+    def test_flow_evolution_is_the_same_as_serial(self):
+        periods = [Period(self.dates[i], self.dates[i + 1]) for i in range(2)]
+        exp = FlowEvolutionQuery(self.accounts, periods, executor=sut.SerialReportExecutor()).run()
+        for mode in (sut.THREADS, sut.PROCESSES):
+            executor = sut.get_report_executor(mode, 2)
+            assert FlowEvolutionQuery(self.accounts, periods, executor=executor).run() == exp
+
+    def test_uses_settings_by_default(self):
+        with self.settings(REPORTS_EXECUTION_MODE=sut.THREADS, REPORTS_EXECUTION_WORKERS=3):
+            query = BalanceEvolutionQuery(self.accounts, self.dates)
+        assert query._executor == sut.get_report_executor(sut.THREADS, 3)
@@ -0,0 +1,81 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+from unittest.mock import Mock, patch
+
+from rest_framework.response import Response
+
+import reports.profiling as sut
+from accounts.tests.factories import AccountTestFactory
+from common.testutils import PacsTestCase, get_response_json
+
+
+class TestProfiled(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.populate_currencies()
+        self.profile_dir = tempfile.mkdtemp()
+        self.settings_override = self.settings(REPORTS_PROFILE_DIR=self.profile_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.profile_dir)
+        super().tearDown()
+
+    def post_report(self, **extra):
+        data = {"accounts": [AccountTestFactory().pk], "dates": ["2020-01-01"]}
+        resp = self.client.post("/reports/balance-evolution/", data, **extra)
+        assert resp.status_code == 200
+        return resp
+
+    def test_disabled_without_feature_toggle(self):
+        resp = self.post_report()
+        assert sut.PROFILE_ID_HEADER not in resp
+        assert os.listdir(self.profile_dir) == []
+
+    def test_disabled_without_profile_dir(self):
+        with self.settings(REPORTS_PROFILE_DIR=""):
+            resp = self.post_report(HTTP_PACS_FEATURE_TOGGLES="profile_reports")
+        assert sut.PROFILE_ID_HEADER not in resp
+
+    def test_saves_profile_and_inputs(self):
+        resp = self.post_report(HTTP_PACS_FEATURE_TOGGLES="profile_reports")
+        profile_id = resp[sut.PROFILE_ID_HEADER]
+        assert "-balance-evolution-" in profile_id
+        # Saved once streamed
+        assert os.listdir(self.profile_dir) == []
+        get_response_json(resp)
+        files = sorted(os.listdir(self.profile_dir))
+        assert files == [f"{profile_id}.json", f"{profile_id}.pstats"]
+
+        stats = pstats.Stats(os.path.join(self.profile_dir, f"{profile_id}.pstats"))
+        assert any(func[2] == "run" for func in stats.stats)
+
+        with open(os.path.join(self.profile_dir, f"{profile_id}.json")) as f:
+            inputs = json.load(f)
+        assert inputs["method"] == "POST"
+        assert inputs["path"] == "/reports/balance-evolution/"
+        assert inputs["data"]["dates"] == ["2020-01-01"]
+        assert inputs["feature_toggles"]["profile_reports"] is True
+        assert inputs["duration"] > 0
+
+    def test_keeps_view_arguments(self):
+        view = Mock(return_value=Response())
+        request = Mock(method="GET", path="/foo", data={}, query_params=Mock(dict=dict))
+        with self.settings(REPORTS_PROFILE_DIR=""):
+            sut.profiled("foo")(view)(request, 1, foo=2)
+        view.assert_called_once_with(request, 1, foo=2)
+
+    def test_saves_profile_of_not_streamed_responses(self):
+        view = Mock(return_value=Response())
+        request = Mock(method="GET", path="/foo", data={}, query_params=Mock(dict=dict))
+        with patch.object(sut, "is_profiling_enabled", return_value=True), patch.object(
+            sut, "_get_request_inputs", return_value={}
+        ):
+            resp = sut.profiled("foo")(view)(request)
+        assert len(os.listdir(self.profile_dir)) == 2
+        assert "-foo-" in resp[sut.PROFILE_ID_HEADER]
@@ -0,0 +1,73 @@
+import os
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from accounts.models import AccTypeEnum
+from accounts.tests.factories import AccountTestFactory
+from common.testutils import ReportsReplicaTestCase, get_response_json
+from movements.tests.factories import TransactionTestFactory
+
+
+class TestReportsReadFromReplica(ReportsReplicaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.accounts = AccountTestFactory.create_batch(2, acc_type=AccTypeEnum.LEAF)
+        self.make_transaction("2019-06-01")
+        self.refresh_replica()
+
+    def make_transaction(self, date_):
+        return TransactionTestFactory(
+            date_=date_,
+            movements_specs__0__account=self.accounts[0],
+            movements_specs__1__account=self.accounts[1],
+        )
+
+    def post_balance_evolution(self):
+        data = {
+            "accounts": [x.pk for x in self.accounts],
+            "dates": ["2019-01-01", "2020-01-01"],
+        }
+        resp = self.client.post("/reports/balance-evolution/", data)
+        assert resp.status_code == 200
+        return get_response_json(resp)
+
+    def get_journal(self):
+        resp = self.client.get(f"/accounts/{self.accounts[0].pk}/journal/")
+        assert resp.status_code == 200, resp.data
+        return resp.json()
+
+    def test_balance_evolution_reads_replica(self):
+        before = self.post_balance_evolution()
+        self.make_transaction("2019-07-01")
+        assert self.post_balance_evolution() == before
+        self.refresh_replica()
+        assert self.post_balance_evolution() != before
+
+    def test_journal_reads_replica(self):
+        self.make_transaction("2019-07-01")
+        assert len(self.get_journal()["transactions"]) == 1
+        self.refresh_replica()
+        assert len(self.get_journal()["transactions"]) == 2
+
+    def test_crud_reads_primary(self):
+        transaction = self.make_transaction("2019-07-01")
+        resp = self.client.get(f"/transactions/{transaction.pk}/")
+        assert resp.status_code == 200
+        assert len(self.client.get("/transactions/").json()) == 2
+
+    def test_refreshes_stale_replica_lazily(self):
+        self.make_transaction("2019-07-01")
+        with override_settings(REPORTS_DB_SNAPSHOT_INTERVAL=60):
+            # Just refreshed, so still fresh
+            assert len(self.get_journal()["transactions"]) == 1
+            past = time.time() - 61
+            os.utime(self.replica_file, (past, past))
+            assert len(self.get_journal()["transactions"]) == 2
+
+    def test_refresh_reports_db_command(self):
+        self.make_transaction("2019-07-01")
+        call_command("refresh_reports_db", stdout=StringIO())
+        assert len(self.get_journal()["transactions"]) == 2
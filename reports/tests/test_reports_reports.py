@@ -11,16 +11,24 @@ from common.models import list_to_queryset
 from common.testutils import PacsTestCase
 from currencies.money import Balance, Money
 from currencies.tests.factories import CurrencyTestFactory
+from movements.models import TransactionTag
 from movements.tests.factories import TransactionTestFactory
+from reports.executors import execute_query
 from reports.reports import (
     AccountFlows,
     BalanceEvolutionQuery,
     BalanceEvolutionReport,
     BalanceEvolutionReportData,
+    CalendarStep,
+    DateSeries,
+    DateStep,
     Flow,
     FlowEvolutionQuery,
     Period,
+    PeriodSeries,
     SqlAlchemyLoader,
+    TagFlowEvolutionQuery,
+    TagFlows,
 )
 
 from .factories import PeriodTestFactory
@@ -28,14 +36,20 @@ from .factories import PeriodTestFactory
 A_DAY = timedelta(days=1)
 
 
+@patch("reports.reports.event")
 @patch("reports.reports.create_engine")
 @patch("reports.reports.MetaData")
 class TestSqlAlchemyLoader(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        # Other tests may have loaded (and cached) the real engine
+        SqlAlchemyLoader.reset_cache()
+
     def tearDown(self):
         super().tearDown()
         SqlAlchemyLoader.reset_cache()
 
-    def test_returns_meta(self, m_MetaData, m_create_engine):
+    def test_returns_meta(self, m_MetaData, m_create_engine, m_event):
         meta, engine = SqlAlchemyLoader.get_meta_and_engine()
         # MetaData was called to generate meta
         assert m_MetaData.call_args_list == [call()]
@@ -43,14 +57,23 @@ class TestSqlAlchemyLoader(PacsTestCase):
         # MetaData.bind was called with this engine
         assert meta.reflect.call_args_list == [call(bind=engine)]
 
-    def test_returns_engine(self, m_MetaData, m_create_engine):
+    def test_returns_engine(self, m_MetaData, m_create_engine, m_event):
         meta, engine = SqlAlchemyLoader.get_meta_and_engine()
         assert m_create_engine.call_args_list == [
             call(f'sqlite:///{settings.DATABASES["default"]["TEST"]["NAME"]}')
         ]
         assert engine is m_create_engine.return_value
 
-    def test_caches_result(self, m_MetaData, m_create_engine):
+    def test_applies_pragmas_on_connect(self, m_MetaData, m_create_engine, m_event):
+        meta, engine = SqlAlchemyLoader.get_meta_and_engine()
+        [(args, _)] = m_event.listen.call_args_list
+        assert args[:2] == (engine, "connect")
+        dbapi_connection = Mock()
+        with patch("reports.reports.apply_pragmas") as apply_pragmas:
+            args[2](dbapi_connection, Mock())
+        assert apply_pragmas.call_args_list == [call(dbapi_connection)]
+
+    def test_caches_result(self, m_MetaData, m_create_engine, m_event):
         m_MetaData.side_effect = [Mock(), Mock()]
         m_create_engine.side_effect = [Mock(), Mock()]
         one = SqlAlchemyLoader.get_meta_and_engine()
@@ -195,6 +218,54 @@ class TestIntegrationBalanceEvolutionQuery(PacsTestCase):
         )
         assert exp == result
 
+    def test_iter_data_yields_one_account_at_a_time(self):
+        accounts = AccountTestFactory.create_batch(2)
+        query = BalanceEvolutionQuery(accounts, [date(2019, 1, 1)])
+        with patch.object(query, "_get_report_data_for", wraps=query._get_report_data_for) as m:
+            data = query.iter_data()
+            assert next(data).account == accounts[0]
+            assert m.call_count == 1
+            assert [x.account for x in data] == [accounts[1]]
+        assert BalanceEvolutionReport(list(query.iter_data())) == query.run()
+
+    def test_with_prefix_report(self):
+        currency = CurrencyTestFactory.create()
+        accounts = AccountTestFactory.create_batch(2)
+        dates = [date(2019, 1, 1), date(2019, 2, 1), date(2019, 3, 1), date(2019, 4, 1)]
+        for i, date_ in enumerate([date(2018, 12, 1), date(2019, 1, 15), date(2019, 3, 1)]):
+            TransactionTestFactory.create(
+                date_=date_,
+                movements_specs__0__account=accounts[0],
+                movements_specs__0__money=Money(Decimal(i + 1), currency),
+                movements_specs__1__account=accounts[1],
+                movements_specs__1__money=Money(-Decimal(i + 1), currency),
+            )
+
+        prefix_report = BalanceEvolutionQuery(accounts, dates[:2]).run()
+        with patch("reports.reports._execute_query", wraps=execute_query) as m_execute_query:
+            report = BalanceEvolutionQuery(accounts, dates, prefix_report=prefix_report).run()
+
+        assert report == BalanceEvolutionQuery(accounts, dates).run()
+        # Only the movements after the prefix are queried
+        str_query = m_execute_query.call_args[0][0]
+        assert "movements_transaction.date > '2019-02-01'" in str_query
+        assert "movements_transaction.date <= '2019-01-01'" not in str_query
+
+    def test_with_prefix_report_for_all_dates_does_not_query(self):
+        account = AccountTestFactory.create()
+        dates = [date(2019, 1, 1)]
+        prefix_report = BalanceEvolutionQuery([account], dates).run()
+        with patch("reports.reports._execute_query") as m_execute_query:
+            report = BalanceEvolutionQuery([account], dates, prefix_report=prefix_report).run()
+        assert report == prefix_report
+        assert m_execute_query.call_count == 0
+
+    def test_with_prefix_report_for_other_dates_raises(self):
+        account = AccountTestFactory.create()
+        prefix_report = BalanceEvolutionQuery([account], [date(2019, 1, 2)]).run()
+        with self.assertRaises(ValueError):
+            BalanceEvolutionQuery([account], [date(2019, 1, 1)], prefix_report=prefix_report)
+
 
 class TestIntegrationFlowEvolutionQuery(PacsTestCase):
     def setUp(self):
@@ -262,6 +333,35 @@ class TestIntegrationFlowEvolutionQuery(PacsTestCase):
         ]
 
 
+class TestIntegrationQuantityPrecision(PacsTestCase):
+    # Sqlite sums the decimal column as floats, which would give 0.00011
+    QUANTITIES = ["9999999999.99999", "-9999999999.99998"] * 12
+    EXPECTED = Decimal("0.00012")
+
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.currency = CurrencyTestFactory()
+        self.account = AccountTestFactory()
+        for quantity in self.QUANTITIES:
+            TransactionTestFactory(
+                date_=date(2019, 1, 1),
+                movements_specs__0__account=self.account,
+                movements_specs__0__money=Money(quantity, self.currency),
+                movements_specs__1__money=Money(-Decimal(quantity), self.currency),
+            )
+
+    def test_balance_evolution_sums_exactly(self):
+        query = BalanceEvolutionQuery(accounts=[self.account], dates=[date(2019, 1, 1)])
+        [data] = query.run().data
+        assert data.balance.get_for_currency(self.currency).quantity == self.EXPECTED
+
+    def test_flow_evolution_sums_exactly(self):
+        periods = [Period.from_strings("2019-01-01", "2019-01-31")]
+        [account_flows] = FlowEvolutionQuery(accounts=[self.account], periods=periods).run()
+        assert [x.quantity for x in account_flows.flows[0].moneys] == [self.EXPECTED]
+
+
 class TestPeriod:
     def test_from_strings(self):
         date_str_one = "2019-01-01"
@@ -270,3 +370,284 @@ class TestPeriod:
         date_two = date(2019, 12, 31)
         period = Period.from_strings(date_str_one, date_str_two)
         assert period == Period(date_one, date_two)
+
+
+class TestDateSeries:
+    def test_daily(self):
+        series = DateSeries(date(2019, 12, 30), date(2020, 1, 2), "day")
+        assert series.get_dates() == [
+            date(2019, 12, 30),
+            date(2019, 12, 31),
+            date(2020, 1, 1),
+            date(2020, 1, 2),
+        ]
+
+    def test_weekly(self):
+        series = DateSeries(date(2020, 1, 1), date(2020, 1, 21), "week")
+        assert series.get_dates() == [date(2020, 1, 1), date(2020, 1, 8), date(2020, 1, 15)]
+
+    def test_monthly_keeps_day_of_start(self):
+        series = DateSeries(date(2019, 12, 31), date(2020, 4, 30), "month")
+        assert series.get_dates() == [
+            date(2019, 12, 31),
+            date(2020, 1, 31),
+            date(2020, 2, 29),
+            date(2020, 3, 31),
+            date(2020, 4, 30),
+        ]
+
+    def test_single_date(self):
+        series = DateSeries(date(2020, 1, 1), date(2020, 1, 1), DateStep.MONTH)
+        assert series.get_dates() == [date(2020, 1, 1)]
+
+    def test_count(self):
+        for start, end in [
+            (date(2020, 1, 1), date(2020, 1, 1)),
+            (date(2020, 1, 2), date(2020, 1, 1)),
+            (date(2019, 12, 30), date(2020, 1, 2)),
+            (date(2020, 1, 1), date(2020, 1, 21)),
+            (date(2020, 1, 1), date(2020, 1, 22)),
+            (date(2019, 12, 31), date(2020, 4, 30)),
+            (date(2019, 12, 31), date(2020, 4, 29)),
+            (date(2020, 1, 30), date(2020, 2, 29)),
+            (date(2020, 1, 15), date(2021, 3, 14)),
+        ]:
+            for step in DateStep:
+                series = DateSeries(start, end, step)
+                assert series.count() == len(series.get_dates()), series
+
+
+class TestIntegrationBalanceEvolutionQueryWithDateSeries(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.populate_currencies()
+        self.accounts = AccountTestFactory.create_batch(2)
+        # Dates around the ones of the series
+        transaction_dates = [
+            date(2019, 11, 1),
+            date(2019, 12, 31),
+            date(2020, 1, 1),
+            date(2020, 1, 7),
+            date(2020, 1, 8),
+            date(2020, 2, 29),
+            date(2020, 3, 1),
+            date(2020, 3, 30),
+            date(2020, 3, 31),
+            date(2020, 4, 1),
+        ]
+        for date_ in transaction_dates:
+            TransactionTestFactory(
+                date_=date_,
+                movements_specs__0__account=self.accounts[0],
+                movements_specs__1__account=self.accounts[1],
+            )
+
+    def assert_same_as_with_dates(self, date_series):
+        dates = date_series.get_dates()
+        with patch("reports.reports._execute_query", wraps=execute_query) as m_execute_query:
+            report = BalanceEvolutionQuery(self.accounts, dates, date_series=date_series).run()
+        assert "CASE" not in m_execute_query.call_args[0][0]
+        assert report == BalanceEvolutionQuery(self.accounts, dates).run()
+
+    def test_daily(self):
+        self.assert_same_as_with_dates(DateSeries(date(2019, 12, 31), date(2020, 3, 31), "day"))
+
+    def test_weekly(self):
+        self.assert_same_as_with_dates(DateSeries(date(2020, 1, 1), date(2020, 3, 31), "week"))
+
+    def test_monthly(self):
+        self.assert_same_as_with_dates(DateSeries(date(2019, 12, 31), date(2020, 3, 31), "month"))
+        self.assert_same_as_with_dates(DateSeries(date(2019, 12, 7), date(2020, 3, 31), "month"))
+
+    def test_with_prefix_report(self):
+        date_series = DateSeries(date(2019, 12, 31), date(2020, 3, 31), "week")
+        dates = date_series.get_dates()
+        prefix_date_series = attr.evolve(date_series, end=dates[5])
+        prefix_report = BalanceEvolutionQuery(
+            self.accounts, prefix_date_series.get_dates(), date_series=prefix_date_series
+        ).run()
+        report = BalanceEvolutionQuery(
+            self.accounts, dates, date_series=date_series, prefix_report=prefix_report
+        ).run()
+        assert report == BalanceEvolutionQuery(self.accounts, dates).run()
+
+    def test_dates_must_be_the_ones_of_the_series(self):
+        date_series = DateSeries(date(2020, 1, 1), date(2020, 1, 2), "day")
+        with self.assertRaises(ValueError):
+            BalanceEvolutionQuery(self.accounts, [date(2020, 1, 1)], date_series=date_series)
+
+
+class TestPeriodSeries:
+    def test_monthly(self):
+        series = PeriodSeries(date(2020, 1, 15), date(2020, 3, 10), "month")
+        assert series.get_periods() == [
+            Period(date(2020, 1, 15), date(2020, 1, 31)),
+            Period(date(2020, 2, 1), date(2020, 2, 29)),
+            Period(date(2020, 3, 1), date(2020, 3, 10)),
+        ]
+
+    def test_yearly(self):
+        series = PeriodSeries(date(2019, 1, 1), date(2020, 12, 31), CalendarStep.YEAR)
+        assert series.get_periods() == [
+            Period(date(2019, 1, 1), date(2019, 12, 31)),
+            Period(date(2020, 1, 1), date(2020, 12, 31)),
+        ]
+
+    def test_get_key(self):
+        series = PeriodSeries(date(2019, 1, 1), date(2019, 1, 1), "month")
+        assert series.get_key(date(2019, 2, 3)) == "2019-02"
+
+
+class TestIntegrationFlowEvolutionQueryWithPeriodSeries(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.populate_currencies()
+        self.accounts = AccountTestFactory.create_batch(2)
+        transaction_dates = [
+            date(2019, 12, 31),
+            date(2020, 1, 1),
+            date(2020, 1, 15),
+            date(2020, 1, 31),
+            date(2020, 2, 1),
+            date(2020, 2, 1),
+            date(2020, 3, 31),
+            date(2020, 4, 1),
+        ]
+        currency = CurrencyTestFactory()
+        for date_ in transaction_dates:
+            TransactionTestFactory(
+                date_=date_,
+                movements_specs__0__account=self.accounts[0],
+                movements_specs__0__money=Money(Decimal(1), currency),
+                movements_specs__1__account=self.accounts[1],
+                movements_specs__1__money=Money(Decimal(-1), currency),
+            )
+
+    def run_query(self, period_series, **kwargs):
+        periods = period_series.get_periods()
+        with patch("reports.reports._execute_query", wraps=execute_query) as m_execute_query:
+            flows = FlowEvolutionQuery(
+                self.accounts, periods, period_series=period_series, **kwargs
+            ).run()
+        assert "CASE" not in m_execute_query.call_args[0][0]
+        assert flows == FlowEvolutionQuery(self.accounts, periods, **kwargs).run()
+        return flows, list(execute_query(m_execute_query.call_args[0][0]))
+
+    def test_monthly(self):
+        flows, rows = self.run_query(PeriodSeries(date(2020, 1, 1), date(2020, 3, 31), "month"))
+        assert [len(x.moneys) for x in flows[0].flows] == [1, 1, 1]
+        # One row per period and currency
+        assert len(rows) == 3
+
+    def test_yearly(self):
+        self.run_query(PeriodSeries(date(2019, 6, 1), date(2020, 3, 31), "year"))
+
+    def test_with_currency_conversion(self):
+        # Converts using the date, so the conversion must happen per date
+        def currency_conversion_fn(money, date_):
+            return Money(money.quantity * date_.day, money.currency)
+
+        flows, rows = self.run_query(
+            PeriodSeries(date(2020, 1, 1), date(2020, 3, 31), "month"),
+            currency_conversion_fn=currency_conversion_fn,
+        )
+        # One row per date and currency
+        assert len(rows) == 5
+
+    def test_periods_must_be_the_ones_of_the_series(self):
+        period_series = PeriodSeries(date(2020, 1, 1), date(2020, 2, 1), "month")
+        with self.assertRaises(ValueError):
+            FlowEvolutionQuery(
+                self.accounts, period_series.get_periods()[:1], period_series=period_series
+            )
+
+
+class TestIntegrationTagFlowEvolutionQuery(PacsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.populate_currencies()
+        self.currency = CurrencyTestFactory()
+        self.current_account = AccountTestFactory()
+        self.expenses = AccountTestFactory(acc_type=AccTypeEnum.BRANCH)
+        self.food = AccountTestFactory(parent=self.expenses)
+        self.hotels = AccountTestFactory(parent=self.expenses)
+
+    def create_expense(self, date_, account, quantity, tags):
+        transaction = TransactionTestFactory(
+            date_=date_,
+            movements_specs__0__account=self.current_account,
+            movements_specs__0__money=Money(Decimal(-quantity), self.currency),
+            movements_specs__1__account=account,
+            movements_specs__1__money=Money(Decimal(quantity), self.currency),
+        )
+        transaction.set_tags([TransactionTag(name=name, value=value) for name, value in tags])
+
+    def create_expenses(self):
+        self.create_expense(date(2020, 1, 10), self.food, 10, [("trip-to", "Brussels")])
+        self.create_expense(date(2020, 1, 11), self.hotels, 100, [("trip-to", "Brussels")])
+        self.create_expense(date(2020, 2, 1), self.food, 20, [("trip-to", "Brussels")])
+        self.create_expense(date(2020, 2, 2), self.hotels, 50, [("trip-to", "Paris")])
+        # Other tags and no tags
+        self.create_expense(date(2020, 1, 12), self.food, 1, [("with", "friends")])
+        self.create_expense(date(2020, 1, 13), self.food, 2, [])
+
+    def moneys(self, quantity):
+        return [Money(Decimal(quantity), self.currency)]
+
+    def test_flows_per_tag_value_and_period(self):
+        self.create_expenses()
+        periods = [
+            Period(date(2020, 1, 1), date(2020, 1, 31)),
+            Period(date(2020, 2, 1), date(2020, 2, 29)),
+        ]
+        flows = TagFlowEvolutionQuery("trip-to", self.expenses, periods).run()
+        assert flows == [
+            TagFlows(
+                "Brussels",
+                [Flow(periods[0], self.moneys(110)), Flow(periods[1], self.moneys(20))],
+            ),
+            TagFlows("Paris", [Flow(periods[0], []), Flow(periods[1], self.moneys(50))]),
+        ]
+
+    def test_only_movements_of_the_account(self):
+        self.create_expenses()
+        periods = [Period(date(2020, 1, 1), date(2020, 12, 31))]
+        flows = TagFlowEvolutionQuery("trip-to", self.food, periods).run()
+        assert flows == [TagFlows("Brussels", [Flow(periods[0], self.moneys(30))])]
+
+    def test_movements_outside_periods_are_ignored(self):
+        self.create_expenses()
+        periods = [Period(date(2020, 1, 11), date(2020, 1, 31))]
+        flows = TagFlowEvolutionQuery("trip-to", self.expenses, periods).run()
+        assert flows == [TagFlows("Brussels", [Flow(periods[0], self.moneys(100))])]
+
+    def test_with_period_series(self):
+        self.create_expenses()
+        period_series = PeriodSeries(date(2020, 1, 5), date(2020, 2, 15), "month")
+        periods = period_series.get_periods()
+        with patch("reports.reports._execute_query", wraps=execute_query) as m_execute_query:
+            flows = TagFlowEvolutionQuery(
+                "trip-to", self.expenses, periods, period_series=period_series
+            ).run()
+        assert "CASE" not in m_execute_query.call_args[0][0]
+        assert flows == TagFlowEvolutionQuery("trip-to", self.expenses, periods).run()
+        assert [len(x.flows) for x in flows] == [2, 2]
+
+    def test_with_currency_conversion(self):
+        self.create_expenses()
+
+        def currency_conversion_fn(money, date_):
+            return Money(money.quantity * date_.day, money.currency)
+
+        periods = [Period(date(2020, 1, 1), date(2020, 1, 31))]
+        flows = TagFlowEvolutionQuery(
+            "trip-to", self.expenses, periods, currency_conversion_fn=currency_conversion_fn
+        ).run()
+        assert flows == [TagFlows("Brussels", [Flow(periods[0], self.moneys(10 * 10 + 100 * 11))])]
+
+    def test_empty(self):
+        periods = [Period(date(2020, 1, 1), date(2020, 1, 31))]
+        assert TagFlowEvolutionQuery("trip-to", self.expenses, periods).run() == []
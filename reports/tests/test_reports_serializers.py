@@ -1,5 +1,5 @@
 from copy import copy
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from unittest.mock import MagicMock, Mock, call, patch, sentinel
 
@@ -11,11 +11,12 @@ from currencies.models import Currency
 from currencies.money import Money
 from currencies.serializers import BalanceSerializer
 from movements.tests.factories import TransactionTestFactory
-from reports.reports import Period
+from reports.reports import CalendarStep, DateSeries, DateStep, Period, PeriodSeries
 from reports.serializers import (
     BalanceEvolutionInputSerializer,
     CurrencyOptsSerializer,
     CurrencyPricePortifolioSerializer,
+    DateSeriesSerializer,
     FlowEvolutionInputSerializer,
     FlowEvolutionOutputSerializer,
     PeriodField,
@@ -145,6 +146,30 @@ class TestFlowEvolutionInputSerializer:
             assert serializer.is_valid() is False
         assert "periods" in serializer.errors
 
+    def test_period_series(self):
+        period_series = {"start": "2019-01-15", "end": "2019-02-28", "step": "month"}
+        data = self.get_data(period_series=period_series)
+        data.pop("periods")
+        serializer = FlowEvolutionInputSerializer(data=data)
+        with self.patch_get_queryset():
+            serializer.is_valid(True)
+            inputs = serializer.save()
+        assert inputs.period_series == PeriodSeries(
+            date(2019, 1, 15), date(2019, 2, 28), CalendarStep.MONTH
+        )
+        assert inputs.periods == [
+            Period(date(2019, 1, 15), date(2019, 1, 31)),
+            Period(date(2019, 2, 1), date(2019, 2, 28)),
+        ]
+
+    def test_requires_periods_or_period_series(self):
+        period_series = {"start": "2019-01-01", "end": "2019-02-28", "step": "year"}
+        for data in [self.get_data(period_series=period_series), {"accounts": [12]}]:
+            serializer = FlowEvolutionInputSerializer(data=data)
+            with self.patch_get_queryset():
+                assert serializer.is_valid() is False
+            assert "non_field_errors" in serializer.errors
+
 
 class TestFlowEvolutionOutputSerializer(PacsTestCase):
     @staticmethod
@@ -201,6 +226,49 @@ class TestBalanceEvolutionInputSerializer:
         )
         assert inputs == exp_inputs
 
+    def test_date_series(self):
+        date_series = {"start": "2020-01-31", "end": "2020-03-31", "step": "month"}
+        data = {"date_series": date_series, "accounts": [1]}
+        with self.patch_get_queryset() as get_queryset:
+            serializer = BalanceEvolutionInputSerializer(data=data)
+            assert serializer.is_valid(), serializer.errors
+            inputs = serializer.save()
+        assert inputs == BalanceEvolutionInput(
+            accounts=[get_queryset().get(pk=1)],
+            dates=[date(2020, 1, 31), date(2020, 2, 29), date(2020, 3, 31)],
+            date_series=DateSeries(date(2020, 1, 31), date(2020, 3, 31), DateStep.MONTH),
+        )
+
+    def test_requires_dates_or_date_series(self):
+        date_series = {"start": "2020-01-01", "end": "2020-01-02", "step": "day"}
+        for data in [
+            {"accounts": [1]},
+            {"accounts": [1], "dates": ["2020-01-01"], "date_series": date_series},
+        ]:
+            with self.patch_get_queryset():
+                serializer = BalanceEvolutionInputSerializer(data=data)
+                assert not serializer.is_valid()
+            assert "non_field_errors" in serializer.errors
+
+
+class TestDateSeriesSerializer:
+    def test_invalid(self):
+        for data in [
+            {"start": "2020-01-02", "end": "2020-01-01", "step": "day"},
+            {"start": "2020-01-01", "end": "2020-01-02", "step": "year"},
+            {"start": "1900-01-01", "end": "2020-01-01", "step": "day"},
+        ]:
+            assert not DateSeriesSerializer(data=data).is_valid()
+
+    def test_limits_dates_without_building_them(self):
+        max_dates = DateSeriesSerializer.MAX_DATES
+        end = date(2000, 1, 1) + (max_dates - 1) * timedelta(days=1)
+        with patch.object(DateSeries, "get_dates") as get_dates:
+            for (days, valid) in [(0, True), (1, False)]:
+                data = {"start": "2000-01-01", "end": end + timedelta(days=days), "step": "day"}
+                assert DateSeriesSerializer(data=data).is_valid() == valid
+        assert get_dates.call_count == 0
+
 
 class TestCurrencyPricePortifolioSerializer:
     @staticmethod
@@ -1,12 +1,15 @@
+import json
 from datetime import date
 from decimal import Decimal
 from unittest.mock import Mock, call, patch, sentinel
 
+from django.test import override_settings
 from django.urls.base import resolve
+from rest_framework.renderers import JSONRenderer
 
 import common.utils as utils
 from accounts.tests.factories import AccountTestFactory
-from common.testutils import PacsTestCase
+from common.testutils import PacsTestCase, get_response_json
 from currencies.currency_converter import (
     UnkownCurrencyForConversion,
     UnkownDateForCurrencyConversion,
@@ -14,6 +17,7 @@ from currencies.currency_converter import (
 from currencies.models import Currency
 from currencies.money import Balance, Money
 from currencies.tests.factories import CurrencyTestFactory
+from movements.models import TransactionTag
 from movements.tests.factories import TransactionTestFactory
 from reports.reports import BalanceEvolutionReport, BalanceEvolutionReportData
 from reports.serializers import BalanceEvolutionOutputSerializer
@@ -88,10 +92,9 @@ class TestBalanceEvolutionViewSpecPost(PacsTestCase):
         ]
         exp_report = BalanceEvolutionReport(exp_report_data)
         serialized_exp_report = BalanceEvolutionOutputSerializer(exp_report).data
-        with patch("reports.views.Response") as Response:
-            result = BalanceEvolutionViewSpec.post(request)
-        assert Response.call_args_list == [call(serialized_exp_report)]
-        assert result == Response()
+        result = BalanceEvolutionViewSpec.post(request)
+        assert result.streaming
+        assert get_response_json(result) == json.loads(JSONRenderer().render(serialized_exp_report))
 
     def test_with_currency_opts(self):
         currency_from = Currency.objects.get(code="EUR")
@@ -134,10 +137,54 @@ class TestBalanceEvolutionViewSpecPost(PacsTestCase):
         ]
         exp_report = BalanceEvolutionReport(exp_balance_report_data)
         exp_serialized = BalanceEvolutionOutputSerializer(exp_report).data
-        with patch("reports.views.Response") as Response:
-            result = BalanceEvolutionViewSpec.post(request)
-        assert Response.call_args_list == [call(exp_serialized)]
-        assert result == Response()
+        result = BalanceEvolutionViewSpec.post(request)
+        assert result.streaming
+        assert get_response_json(result) == json.loads(JSONRenderer().render(exp_serialized))
+
+    def test_returns_400_if_unkown_date(self):
+        currency = Currency.objects.get(code="EUR")
+        account = AccountTestFactory()
+        for date_ in (date(2018, 1, 1), date(2018, 1, 2)):
+            TransactionTestFactory(
+                movements_specs__0__money=Money(Decimal("2"), currency),
+                movements_specs__0__account=account,
+                date_=date_,
+            )
+        # No prices for the second date
+        price = {"date": "2018-01-01", "price": 1}
+        data = {
+            "dates": ["2018-01-01", "2018-01-02"],
+            "accounts": [account.pk],
+            "currency_opts": {
+                "price_portifolio": [
+                    {"currency": currency.get_code(), "prices": [price]},
+                    {"currency": "BRL", "prices": [price]},
+                ],
+                "convert_to": "BRL",
+            },
+        }
+        for timeout in (0, 3600):
+            with self.settings(REPORTS_CACHE_TIMEOUT=timeout):
+                resp = self.client.post("/reports/balance-evolution/", data, format="json")
+            assert resp.status_code == 400
+            assert resp.json() == {"detail": UnkownDateForCurrencyConversion.default_detail}
+
+    def test_with_date_series(self):
+        account = AccountTestFactory()
+        TransactionTestFactory(movements_specs__0__account=account, date_=date(2020, 1, 10))
+        date_series = {"start": "2020-01-01", "end": "2020-01-31", "step": "week"}
+        resp = self.client.post(
+            "/reports/balance-evolution/", {"accounts": [account.pk], "date_series": date_series}
+        )
+        data = get_response_json(resp)["data"]
+        assert [x["date"] for x in data] == [
+            "2020-01-01",
+            "2020-01-08",
+            "2020-01-15",
+            "2020-01-22",
+            "2020-01-29",
+        ]
+        assert [len(x["balance"]) for x in data] == [0, 0, 1, 1, 1]
 
 
 class TestFlowEvolutionViewSpecPost:
@@ -157,10 +204,13 @@ class TestFlowEvolutionViewSpecPost:
     def patch_response():
         return patch("reports.views.Response")
 
+    @override_settings(REPORTS_CACHE_TIMEOUT=0)
     def run(self):
-        with self.patch_serialize_inptus() as _serialize_inputs, self.patch_run_query() as _run_query, self.patch_serializer_report() as _serialize_report, self.patch_response() as Response:
-
-            self.resp = FlowEvolutionViewSpec.post(sentinel.request)
+        with self.patch_serialize_inptus() as _serialize_inputs:
+            with self.patch_run_query() as _run_query:
+                with self.patch_serializer_report() as _serialize_report:
+                    with self.patch_response() as Response:
+                        self.resp = FlowEvolutionViewSpec.post(sentinel.request)
 
         self._serialize_inputs = _serialize_inputs
         self._run_query = _run_query
@@ -223,6 +273,7 @@ class TestFlowEvolutionViewSpecRunQuery:
             accounts = sentinel.accounts
             periods = sentinel.periods
             currency_opts = sentinel.currency_opts
+            period_series = sentinel.period_series
 
         inputs = Inputs()
         with self.patch_flow_evolution_query() as FlowEvolutionQuery:
@@ -233,6 +284,7 @@ class TestFlowEvolutionViewSpecRunQuery:
                 accounts=Inputs.accounts,
                 periods=Inputs.periods,
                 currency_conversion_fn=get_converter_fn(),
+                period_series=Inputs.period_series,
             )
         ]
         assert FlowEvolutionQuery.return_value.run.call_args_list == [call()]
@@ -276,3 +328,56 @@ class TestFlowEvolutionView(PacsTestCase):
             resp = self.client.post(self.endpoint, {})
         assert resp.status_code == UnkownDateForCurrencyConversion.status_code
         assert resp.json() == {"detail": msg}
+
+
+class TestTagFlowEvolutionView(PacsTestCase):
+
+    endpoint = "/reports/tag-flow-evolution/"
+
+    def setUp(self):
+        super().setUp()
+        self.populate_accounts()
+        self.populate_currencies()
+
+    def test_returns_flows_per_tag_value(self):
+        currency = CurrencyTestFactory()
+        accounts = AccountTestFactory.create_batch(2)
+        transaction = TransactionTestFactory(
+            date_=date(2020, 1, 10),
+            movements_specs__0__account=accounts[0],
+            movements_specs__0__money=Money(Decimal(-10), currency),
+            movements_specs__1__account=accounts[1],
+            movements_specs__1__money=Money(Decimal(10), currency),
+        )
+        transaction.set_tags([TransactionTag(name="trip-to", value="Brussels")])
+        data = {
+            "tag_name": "trip-to",
+            "account": accounts[1].pk,
+            "period_series": {"start": "2020-01-01", "end": "2020-02-29", "step": "month"},
+        }
+        resp = self.client.post(self.endpoint, data, format="json")
+        assert resp.status_code == 200, resp.json()
+        assert resp.json() == {
+            "data": [
+                {
+                    "tag_value": "Brussels",
+                    "flows": [
+                        {
+                            "period": ["2020-01-01", "2020-01-31"],
+                            "moneys": [{"currency": currency.pk, "quantity": "10.00000"}],
+                        },
+                        {"period": ["2020-02-01", "2020-02-29"], "moneys": []},
+                    ],
+                }
+            ]
+        }
+
+    def test_returns_400_for_invalid_tag_name(self):
+        data = {
+            "tag_name": "trip to",
+            "account": AccountTestFactory().pk,
+            "periods": [["2020-01-01", "2020-01-31"]],
+        }
+        resp = self.client.post(self.endpoint, data, format="json")
+        assert resp.status_code == 400
+        assert "tag_name" in resp.json()
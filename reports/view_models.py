@@ -1,17 +1,20 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import TYPE_CHECKING, List, Union
+from typing import TYPE_CHECKING, List, Optional, Union
 
 import attr
 
-from currencies.currency_converter import CurrencyPricePortifolioConverter
+from currencies.currency_converter import (
+    CurrencyConversionFn,
+    CurrencyPricePortifolioConverter,
+)
 
 if TYPE_CHECKING:
     from accounts.models import Account
     from currencies.currency_converter import CurrencyPricePortifolio
     from currencies.models import Currency
-    from reports.reports import Period
+    from reports.reports import DateSeries, Period, PeriodSeries
 
 
 NOINPUT = object()
@@ -24,7 +27,7 @@ class CurrencyOpts:
 
     def as_currency_conversion_fn(self):
         converter = CurrencyPricePortifolioConverter(price_portifolio_list=self.price_portifolio)
-        return lambda m, d: converter.convert(m, self.convert_to, d)
+        return CurrencyConversionFn(converter, self.convert_to)
 
 
 @attr.s(frozen=True)
@@ -32,6 +35,17 @@ class FlowEvolutionInput:
     periods: List[Period] = attr.ib()
     accounts: List[Account] = attr.ib()
     currency_opts: CurrencyOpts = attr.ib()
+    # The series `periods` were generated from, if any
+    period_series: Optional[PeriodSeries] = attr.ib(default=None)
+
+
+@attr.s(frozen=True)
+class TagFlowEvolutionInput:
+    tag_name: str = attr.ib()
+    account: Account = attr.ib()
+    periods: List[Period] = attr.ib()
+    currency_opts: Optional[CurrencyOpts] = attr.ib()
+    period_series: Optional[PeriodSeries] = attr.ib(default=None)
 
 
 @attr.s(frozen=True)
@@ -39,9 +53,13 @@ class BalanceEvolutionInput:
     accounts: List[Account] = attr.ib()
     dates: List[date] = attr.ib()
     currency_opts: Union[CurrencyOpts, NOINPUT] = attr.ib(default=NOINPUT)
+    # The series `dates` were generated from, if any
+    date_series: Optional[DateSeries] = attr.ib(default=None)
 
     def as_dict(self):
         out = {"accounts": self.accounts, "dates": self.dates}
         if self.currency_opts is not NOINPUT:
             out["currency_conversion_fn"] = self.currency_opts.as_currency_conversion_fn()
+        if self.date_series is not None:
+            out["date_series"] = self.date_series
         return out
@@ -1,27 +1,46 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Callable, List, Optional
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional
 
 import attr
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
-from currencies.currency_converter import CurrencyPricePortifolioConverter
-
-from .reports import BalanceEvolutionQuery, BalanceEvolutionReport, FlowEvolutionQuery
+from common.streaming import iter_json_list, streaming_json_response
+from currencies.currency_converter import (
+    CurrencyConversionFn,
+    CurrencyPricePortifolioConverter,
+)
+from pacs.db.routers import iter_in_reports_db, use_reports_db
+
+from .cache import BalanceEvolutionReportCache, ReportCache
+from .profiling import profiled
+from .reports import (
+    BalanceEvolutionReportData,
+    FlowEvolutionQuery,
+    TagFlowEvolutionQuery,
+    no_currency_conversion,
+)
 from .serializers import (
     BalanceEvolutionInputSerializer,
-    BalanceEvolutionOutputSerializer,
+    BalanceEvolutionReportDataSerializer,
     FlowEvolutionInputSerializer,
     FlowEvolutionOutputSerializer,
+    TagFlowEvolutionInputSerializer,
+    TagFlowEvolutionOutputSerializer,
+)
+from .view_models import (
+    BalanceEvolutionInput,
+    CurrencyOpts,
+    FlowEvolutionInput,
+    TagFlowEvolutionInput,
 )
-from .view_models import BalanceEvolutionInput, CurrencyOpts, FlowEvolutionInput
 
 if TYPE_CHECKING:
     from datetime import date
 
     from currencies.money import Money
-    from reports.reports import AccountFlows
+    from reports.reports import AccountFlows, TagFlows
 
 
 # Balance evolution
@@ -33,22 +52,38 @@ class BalanceEvolutionViewSpec:
         return serializer.save()
 
     @classmethod
-    def _gen_report(cls, inputs: BalanceEvolutionInput) -> BalanceEvolutionReport:
-        return BalanceEvolutionQuery(**inputs.as_dict()).run()
+    def _iter_report_data(
+        cls, inputs: BalanceEvolutionInput
+    ) -> Iterator[BalanceEvolutionReportData]:
+        return BalanceEvolutionReportCache().iter_data(inputs)
+
+    @classmethod
+    def _stream(cls, inputs: BalanceEvolutionInput) -> Iterator[bytes]:
+        """Yields the json of the report, serializing the data as it is
+        computed. Same as serializing it with `BalanceEvolutionOutputSerializer`."""
+        data = iter_in_reports_db(lambda: cls._iter_report_data(inputs))
+        yield from iter_json_list(
+            "data", (BalanceEvolutionReportDataSerializer(x).data for x in data)
+        )
 
     @classmethod
     def post(cls, request):
         inputs = cls._serialize_inputs(request)
-        report = cls._gen_report(inputs)
-        data = BalanceEvolutionOutputSerializer(report).data
-        return Response(data)
+        content = ReportCache("balance_evolution_json").get_or_stream(
+            inputs, lambda: cls._stream(inputs)
+        )
+        return streaming_json_response(content)
 
 
-balance_evolution_view = api_view(["POST"])(BalanceEvolutionViewSpec.post)
+balance_evolution_view = api_view(["POST"])(
+    profiled("balance-evolution")(BalanceEvolutionViewSpec.post)
+)
 
 
 # Flow evolution
 class FlowEvolutionViewSpec:
+    report_name = "flow_evolution"
+
     @staticmethod
     def _serialize_inputs(request) -> FlowEvolutionInput:
         serializer = FlowEvolutionInputSerializer(data=request.data)
@@ -62,6 +97,7 @@ class FlowEvolutionViewSpec:
             accounts=inputs.accounts,
             periods=inputs.periods,
             currency_conversion_fn=currency_conversion_fn,
+            period_series=inputs.period_series,
         )
         return query.run()
 
@@ -75,19 +111,57 @@ class FlowEvolutionViewSpec:
         currency_opts: Optional[CurrencyOpts],
     ) -> Callable[[Money, date], Money]:
         if currency_opts is None:
-            return lambda m, _: m
+            return no_currency_conversion
         dest_currency = currency_opts.convert_to
         converter = CurrencyPricePortifolioConverter(
             price_portifolio_list=currency_opts.price_portifolio
         )
-        return lambda m, d: converter.convert(m, dest_currency, d)
+        return CurrencyConversionFn(converter, dest_currency)
+
+    @classmethod
+    def _compute(cls, inputs: FlowEvolutionInput):
+        with use_reports_db():
+            report = cls._run_query(inputs)
+        return cls._serialize_report(report)
 
     @classmethod
     def post(cls, request):
         inputs = cls._serialize_inputs(request)
-        report = cls._run_query(inputs)
-        serialized_report = cls._serialize_report(report)
+        serialized_report = ReportCache(cls.report_name).get_or_compute(
+            inputs, lambda: cls._compute(inputs)
+        )
         return Response(serialized_report)
 
 
-flow_evolution_view = api_view(["POST"])(FlowEvolutionViewSpec.post)
+flow_evolution_view = api_view(["POST"])(profiled("flow-evolution")(FlowEvolutionViewSpec.post))
+
+
+# Flow evolution per tag value
+class TagFlowEvolutionViewSpec(FlowEvolutionViewSpec):
+    report_name = "tag_flow_evolution"
+
+    @staticmethod
+    def _serialize_inputs(request) -> TagFlowEvolutionInput:
+        serializer = TagFlowEvolutionInputSerializer(data=request.data)
+        serializer.is_valid(True)
+        return serializer.save()
+
+    @classmethod
+    def _run_query(cls, inputs: TagFlowEvolutionInput) -> List[TagFlows]:
+        query = TagFlowEvolutionQuery(
+            tag_name=inputs.tag_name,
+            account=inputs.account,
+            periods=inputs.periods,
+            currency_conversion_fn=cls._get_converter_fn(inputs.currency_opts),
+            period_series=inputs.period_series,
+        )
+        return query.run()
+
+    @staticmethod
+    def _serialize_report(report: List[TagFlows]):
+        return TagFlowEvolutionOutputSerializer(report).data
+
+
+tag_flow_evolution_view = api_view(["POST"])(
+    profiled("tag-flow-evolution")(TagFlowEvolutionViewSpec.post)
+)
@@ -20,6 +20,7 @@ BUILD_SOURCES = [
     "featuretoggles",
     "invoke.yaml",
     "manage.py",
+    "metrics",
     "movements",
     "pacs",
     "pacs_auth",
@@ -29,6 +30,7 @@ BUILD_SOURCES = [
 ]
 DOCKER_CMD = os.environ.get("PACS_DOCKER_CMD", "docker")
 PYTHON = "python3.7"
+BENCH_RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
 
 
 #
@@ -118,11 +120,20 @@ def prepare_virtualenv(c, path, force=False):
     _new_venv(c, path)
 
 
-@pacstask(help={"dev": "Install dev requirements", "deploy": "Install deploy requirements"})
-def requirements(c, dev=False, deploy=False):
+@pacstask(
+    help={
+        "dev": "Install dev requirements",
+        "deploy": "Install deploy requirements",
+        "asgi": "Install the requirements to serve pacs.asgi",
+    }
+)
+def requirements(c, dev=False, deploy=False, asgi=False):
     """Installs requirements for pacs"""
     cmd = "pip install -r requirements/base_frozen.txt"
 
+    if asgi:
+        cmd += " -r requirements/asgi.txt"
+
     if dev:
         cmd += " -r requirements/development.txt"
 
@@ -189,6 +200,14 @@ def populate_db(c):
     _populate_db(c)
 
 
+@pacstask()
+def startup(c):
+    """Migrates, collects static files and populates the db, skipping what is
+    already done (see pacs/startup.py)"""
+    with c.cd(ROOT_DIR):
+        c.run(f"{PYTHON} -m pacs.startup", pty=True)
+
+
 @pacstask()
 def runserver(c):
     """Runs the development server"""
@@ -236,6 +255,36 @@ def build(c, build_dir="./build", dist_dir="./dist", tag_latest=False):
     c.run(f"{DOCKER_CMD} build {tags_opts} --build-arg 'VERSION={version}' -f docker/Dockerfile .")
 
 
+@pacstask(
+    help={
+        "transactions": "Number of transactions of the synthetic ledger.",
+        "seed": "Seed for the synthetic ledger.",
+        "repeat": "Number of times each request is timed.",
+        "output": "Where to store the json results. Defaults to benchmarks/results/<version>.json",
+        "compare": "json results of a previous run to compare with.",
+    }
+)
+def bench(c, transactions=10000, seed=0, repeat=5, output=None, compare=None):
+    """Times the main endpoints against a synthetic ledger, storing the results as json"""
+    db_file = os.path.join(tempfile.gettempdir(), f"pacs-bench-{transactions}-{seed}.sqlite3")
+    if output is None:
+        version = c.run("git describe --tags --always --dirty").stdout.strip()
+        output = os.path.join(BENCH_RESULTS_DIR, f"{version}.json")
+    with c.prefix(f"export PACS_DB_FILE='{db_file}.tmp' PACS_DEBUG=0"):
+        # The ledger is generated once per (transactions, seed) and reused
+        if not os.path.exists(db_file):
+            c.run(f"rm -f '{db_file}.tmp'")
+            c.run_manage("migrate --no-input")
+            _populate_db(c)
+            c.run(f"{PYTHON} -m benchmarks.ledger --transactions {transactions} --seed {seed}")
+            c.run(f"mv '{db_file}.tmp' '{db_file}'")
+    with c.prefix(f"export PACS_DB_FILE='{db_file}' PACS_DEBUG=0"):
+        cmd = f"{PYTHON} -m benchmarks.endpoints --repeat {repeat} --output '{output}'"
+        if compare:
+            cmd += f" --compare '{compare}'"
+        c.run(cmd, pty=True)
+
+
 @pacstask()
 def lint(c):
     c.run("isort .")